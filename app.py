@@ -1,21 +1,139 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import (Flask, Request, Response, render_template, request, redirect, url_for, flash, session, jsonify,
+                   current_app, stream_with_context, g, abort)
 import os
+import copy
+import csv
+import io
+import json
+import queue
+import hashlib
+import secrets
+import shutil
+import tempfile
+import time
 import yaml
 from werkzeug.utils import secure_filename
-from patent_analyzer_core import PatentAnalyzer, get_default_config_yaml_str, DEFAULT_REQUIREMENTS
+from patent_analyzer_core import (get_default_config_yaml_str, DEFAULT_REQUIREMENTS, get_rule_plan,
+                                  compile_config_text, ConfigError)
+from result_cache import AnalysisResultCache, make_cache_key
+from result_store import ResultStore, DirectoryResultStore
+from job_queue import JobManager, QueueFullError, JOB_DONE, JOB_TIMEOUT, WAIT_POLL_SECONDS
+import metrics
 import logging
 
-logging.basicConfig(level=logging.DEBUG,
+# 默认 INFO; 排查问题时可设 PATENT_LOG_LEVEL=DEBUG
+logging.basicConfig(level=getattr(logging, os.environ.get('PATENT_LOG_LEVEL', 'INFO').upper(), logging.INFO),
                     format='%(asctime)s %(levelname)s %(name)s %(module)s %(funcName)s L%(lineno)d: %(message)s')
 
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS_DOC = {'txt', 'docx'}
 ALLOWED_EXTENSIONS_CONFIG = {'yaml', 'yml'}
 
+class SpooledUploadFile(tempfile.SpooledTemporaryFile):
+    """上传文件的接收缓冲: 不超过阈值时保存在内存, 超过后才落到临时文件;
+    写入的同时计算 SHA-256, 上传接收完毕即得到文档哈希。"""
+
+    def __init__(self, max_size, dir=None):
+        super().__init__(max_size=max_size, mode='w+b', dir=dir)
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.sha256.update(data)
+        return super().write(data)
+
+    @property
+    def spilled(self):
+        """内容是否已写入磁盘上的临时文件。"""
+        return self._rolled
+
+
+class SpoolingRequest(Request):
+    # 流式响应在请求上下文弹出 (会关闭上传文件) 之后才开始迭代; 置为 True 时由响应生成器自行关闭文件
+    keep_files_open = False
+
+    def close(self):
+        if not self.keep_files_open:
+            super().close()
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        threshold = current_app.config['UPLOAD_SPILL_THRESHOLD']
+        # 整个请求体超过阈值 (例如一次上传几十个文档) 时每个文件都直接落盘,
+        # 这样单个请求占用的接收缓冲内存不超过阈值, 与文件个数无关
+        if total_content_length is None or total_content_length > threshold:
+            threshold = 1
+        return SpooledUploadFile(max_size=threshold, dir=current_app.config['UPLOAD_SPILL_DIR'])
+
+
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['SECRET_KEY'] = 'dev_secret_key_CHANGE_IN_PRODUCTION'
+app.request_class = SpoolingRequest
+# 未设置 PATENT_SECRET_KEY 时每次启动随机生成 (重启后旧会话失效); 多个 worker 时须设置该变量
+# 或以 preload 方式启动 (gunicorn.conf.py 的默认设置), 各 worker 才会使用同一个密钥
+app.config['SECRET_KEY'] = os.environ.get('PATENT_SECRET_KEY') or secrets.token_hex(32)
+app.config['SECRET_KEY_FROM_ENV'] = bool(os.environ.get('PATENT_SECRET_KEY'))
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+# 上传文件直接在内存中分析; 超过该大小 (字节) 时才写入 UPLOAD_SPILL_DIR (默认系统临时目录) 下的匿名临时文件,
+# 提交分析时再复制为有名字的临时文件, 以路径交给分析进程 (不经内存), 任务结束后删除
+app.config['UPLOAD_SPILL_THRESHOLD'] = int(os.environ.get('PATENT_UPLOAD_SPILL_THRESHOLD', 4 * 1024 * 1024))
+app.config['UPLOAD_SPILL_DIR'] = os.environ.get('PATENT_UPLOAD_SPILL_DIR') or None
+# 分析结果缓存: 内存层容量 (字节) 与可选的磁盘层目录 (设置后重启仍可命中)
+app.config['RESULT_CACHE_MAX_BYTES'] = int(os.environ.get('PATENT_RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+app.config['RESULT_CACHE_DIR'] = os.environ.get('PATENT_RESULT_CACHE_DIR') or None
+
+# 服务端结果存储: 会话中只保存结果 ID, 结果按 TTL 过期并限制总内存占用
+app.config['RESULT_STORE_TTL_SECONDS'] = int(os.environ.get('PATENT_RESULT_STORE_TTL_SECONDS', 6 * 3600))
+app.config['RESULT_STORE_MAX_BYTES'] = int(os.environ.get('PATENT_RESULT_STORE_MAX_BYTES', 64 * 1024 * 1024))
+# 设置后结果保存在该目录 (多个 worker 进程共享), 否则保存在本进程内存中
+app.config['RESULT_STORE_DIR'] = os.environ.get('PATENT_RESULT_STORE_DIR') or None
+
+# 后台分析任务: 工作进程数、排队上限 (超出返回 429)、单个任务执行超时 (秒, 不含排队时间)、
+# 排队等待超时 (秒, 0 为不限)、执行方式 (process/thread)
+app.config['JOB_WORKERS'] = int(os.environ.get('PATENT_JOB_WORKERS', 0)) or None
+app.config['JOB_QUEUE_LIMIT'] = int(os.environ.get('PATENT_JOB_QUEUE_LIMIT', 0)) or None
+app.config['JOB_TIMEOUT_SECONDS'] = float(os.environ.get('PATENT_JOB_TIMEOUT_SECONDS', 120))
+app.config['JOB_QUEUE_TIMEOUT_SECONDS'] = float(os.environ.get('PATENT_JOB_QUEUE_TIMEOUT_SECONDS', 0)) or None
+app.config['JOB_EXECUTOR'] = os.environ.get('PATENT_JOB_EXECUTOR', 'process')
+# 多文件批量接口: 请求体上限, 以及同一批次同时在分析中的文档数 (默认等于工作进程数)
+app.config['BATCH_MAX_CONTENT_LENGTH'] = int(os.environ.get('PATENT_BATCH_MAX_CONTENT_LENGTH', 512 * 1024 * 1024))
+app.config['BATCH_MAX_IN_FLIGHT'] = int(os.environ.get('PATENT_BATCH_MAX_IN_FLIGHT', 0)) or None
+
+def make_result_cache(config):
+    return AnalysisResultCache(max_memory_bytes=config['RESULT_CACHE_MAX_BYTES'], disk_dir=config['RESULT_CACHE_DIR'])
+
+def make_job_manager(config):
+    return JobManager(max_workers=config['JOB_WORKERS'], max_pending=config['JOB_QUEUE_LIMIT'],
+                      job_timeout=config['JOB_TIMEOUT_SECONDS'], executor=config['JOB_EXECUTOR'],
+                      queue_timeout=config['JOB_QUEUE_TIMEOUT_SECONDS'])
+
+def make_result_store(config):
+    if config['RESULT_STORE_DIR']:
+        return DirectoryResultStore(config['RESULT_STORE_DIR'], ttl_seconds=config['RESULT_STORE_TTL_SECONDS'],
+                                    max_memory_bytes=config['RESULT_STORE_MAX_BYTES'])
+    return ResultStore(ttl_seconds=config['RESULT_STORE_TTL_SECONDS'], max_memory_bytes=config['RESULT_STORE_MAX_BYTES'])
+
+result_cache = make_result_cache(app.config)
+result_store = make_result_store(app.config)
+job_manager = make_job_manager(app.config)
+
+metrics.REGISTRY.callback('patent_jobs_total', '已结束或被拒绝的分析任务数', lambda: {
+    (outcome,): job_manager.stats()[outcome] for outcome in ('completed', 'failed', 'timed_out', 'rejected')
+}, ('outcome',), kind='counter')
+metrics.REGISTRY.callback('patent_jobs_pending', '排队和执行中的分析任务数', lambda: job_manager.stats()['pending'])
+metrics.REGISTRY.callback('patent_result_cache_lookups_total', '结果缓存查询次数', lambda: {
+    ('hit',): result_cache.stats()['hits'], ('miss',): result_cache.stats()['misses'],
+}, ('result',), kind='counter')
+metrics.REGISTRY.callback('patent_result_cache_bytes', '结果缓存内存层占用 (字节)', lambda: result_cache.stats()['memory_bytes'])
+metrics.REGISTRY.callback('patent_result_store_entries', '服务端结果存储中的条目数', lambda: result_store.stats()['entries'])
+
+@app.before_request
+def start_request_timer():
+    if metrics.is_enabled():
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_request_time(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, request.endpoint or 'unknown', request.method)
+    return response
 
 def to_yaml_filter(value, indent=None, default_flow_style=False, allow_unicode=True, sort_keys=False):
     try:
@@ -32,21 +150,244 @@ def to_yaml_filter(value, indent=None, default_flow_style=False, allow_unicode=T
 
 app.jinja_env.filters['toyaml'] = to_yaml_filter
 
-if not os.path.exists(UPLOAD_FOLDER):
-    try:
-        os.makedirs(UPLOAD_FOLDER)
-        app.logger.info(f"'{UPLOAD_FOLDER}' directory created at {os.path.abspath(UPLOAD_FOLDER)}.")
-    except OSError as e:
-        app.logger.error(f"Error creating uploads directory '{UPLOAD_FOLDER}': {e}", exc_info=True)
-
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
+def upload_size_and_sha256(file_storage, chunk_size=64 * 1024):
+    """返回上传文件的字节数与 SHA-256。SpooledUploadFile 在接收时已算好哈希;
+    其他流 (例如自定义的 request_class) 则补读一遍。读完后流回到开头。"""
+    stream = file_storage.stream
+    size = stream.seek(0, os.SEEK_END)
+    digest = getattr(stream, 'sha256', None)
+    if digest is None:
+        digest = hashlib.sha256()
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            digest.update(chunk)
+    stream.seek(0)
+    return size, digest.hexdigest()
+
+def secure_document_filename(original_filename):
+    base, ext = os.path.splitext(original_filename)
+    secure_base = secure_filename(base)
+    if not secure_base:
+        secure_base = "uploaded_patent_file"
+    return f"{secure_base}{ext.lower()}"
+
+def resolve_config_from_request():
+    """按 上传的配置文件 > 文本框配置 > 默认配置 的优先级确定本次使用的配置。
+
+    返回 (config_data, config_source, notices), notices 为需要提示用户的 (消息, 类别) 列表。
+    """
+    notices = []
+    config_data = None
+    config_source = "默认配置 (未提供有效自定义配置)"
+    config_file_upload = request.files.get('config_file')
+    if config_file_upload and config_file_upload.filename != '':
+        if allowed_file(config_file_upload.filename, ALLOWED_EXTENSIONS_CONFIG):
+            try:
+                config_data, _ = compile_config_text(config_file_upload.stream.read())
+                config_source = f"上传的配置文件 ({config_file_upload.filename})"
+                notices.append((f'已使用上传的配置文件: {config_file_upload.filename}', 'info'))
+            except ConfigError as e:
+                notices.append((f'上传的配置文件 ({config_file_upload.filename}) 无效: {e}', 'warning'))
+            except Exception as e:
+                notices.append((f'处理上传的配置文件 ({config_file_upload.filename}) 失败: {e}', 'warning'))
+                app.logger.error(f"Error processing uploaded config '{config_file_upload.filename}': {e}", exc_info=True)
+        else:
+            notices.append((f'上传的配置文件类型不支持 ({config_file_upload.filename})', 'warning'))
+
+    custom_config_text = request.form.get('custom_config_text', '').strip()
+    if config_data is None and custom_config_text:
+        try:
+            # 文本框默认填入的就是默认配置, 解析与校验结果按文本缓存, 不必每次重新解析 YAML
+            config_data, _ = compile_config_text(custom_config_text)
+            config_source = "文本框自定义配置"
+            notices.append(('已使用文本框中的自定义配置。', 'info'))
+        except ConfigError as e:
+            notices.append((f'文本框中的配置无效: {e}', 'warning'))
+            if config_source == "默认配置 (未提供有效自定义配置)": # only update if not already set by uploaded file error
+                config_source = "默认配置 (文本框内容无效)"
+        except Exception as e:
+            notices.append((f'解析文本框中的自定义配置失败: {e}.', 'warning'))
+            app.logger.error(f"YAML parsing error for textarea config: {e}", exc_info=True)
+            if config_source == "默认配置 (未提供有效自定义配置)":
+                 config_source = "默认配置 (文本框解析失败)"
+
+    if config_data is None:
+        config_data = copy.deepcopy(DEFAULT_REQUIREMENTS)
+        if config_source == "默认配置 (未提供有效自定义配置)":
+             notices.append(('未使用有效的自定义配置，已采用系统默认配置。', 'info'))
+    return config_data, config_source, notices
+
+def submit_analysis(file_storage, filename, config_data, count_mode, notify=None):
+    """提交一个上传文档的分析任务并返回任务 ID; 命中结果缓存时直接登记为已完成的任务。
+
+    队列已满时抛出 QueueFullError。notify 见 JobManager.submit。
+    """
+    _, document_sha256 = upload_size_and_sha256(file_storage)
+    cache_key = make_cache_key(document_sha256, config_data, count_mode)
+    cached_result = result_cache.get(cache_key)
+    if cached_result is not None:
+        app.logger.info("命中分析结果缓存: %s (sha256=%s)", filename, document_sha256[:12])
+        cached_result['文件名'] = filename
+        # 缓存中的阶段耗时属于当初那次分析, 本次请求并没有做这些工作; 命中次数由结果缓存的统计计入指标
+        cached_result.pop('阶段耗时', None)
+        return job_manager.add_finished(filename, cached_result, notify=notify)
+
+    def on_done(result):
+        result_cache.put(cache_key, result)
+        metrics.observe_analysis(result)
+
+    stream = file_storage.stream
+    if not getattr(stream, 'spilled', False):
+        return job_manager.submit(stream.read(), filename, config_data, count_mode, on_done=on_done, notify=notify)
+    # 已落盘的大文件不读入内存, 复制为有名字的临时文件后把路径交给分析进程, 任务结束时删除
+    with tempfile.NamedTemporaryFile(dir=app.config['UPLOAD_SPILL_DIR'], prefix='patent_upload_',
+                                     suffix=os.path.splitext(filename)[1], delete=False) as document_file:
+        shutil.copyfileobj(stream, document_file, 1024 * 1024)
+    stream.seek(0)
+    try:
+        return job_manager.submit(document_file.name, filename, config_data, count_mode, on_done=on_done,
+                                  notify=notify, delete_document=True)
+    except BaseException:
+        os.remove(document_file.name)
+        raise
+
+def iter_batch_records(uploads, config_data, count_mode, max_in_flight):
+    """并发分析多个上传文档, 按完成顺序逐个产出结果记录。
+
+    同一时刻最多 max_in_flight 个文档被提交分析 (已落盘的文档以临时文件路径交给分析进程, 不读入内存),
+    其余文档留在接收缓冲 (临时文件) 中, 每个文档提交后即关闭其缓冲; 结果产出后不在任务表中保留。
+    """
+    finished = queue.Queue()
+    in_flight = {}  # job_id -> 序号
+    pending = list(enumerate(uploads))
+    pending.reverse()
+
+    def take_finished(block):
+        try:
+            job_id = finished.get(timeout=WAIT_POLL_SECONDS) if block else finished.get_nowait()
+        except queue.Empty:
+            # 定期查询状态: 记录任务开始执行的时间, 线程池模式下超时的任务不会自行结束, 需在这里判定
+            for job_id in list(in_flight):
+                job_manager.get(job_id)
+            return None
+        record = job_manager.pop(job_id) or {"job_id": job_id, "status": JOB_TIMEOUT, "ok": False}
+        record["index"] = in_flight.pop(job_id)
+        return record
+
+    try:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_in_flight:
+                index, file_storage = pending[-1]
+                filename = secure_document_filename(file_storage.filename or '')
+                if not allowed_file(file_storage.filename or '', ALLOWED_EXTENSIONS_DOC):
+                    error = f"专利文件类型不支持: {file_storage.filename}. 仅支持 .txt, .docx"
+                elif upload_size_and_sha256(file_storage)[0] == 0:
+                    error = f"专利文件为空: {filename}"
+                else:
+                    error = None
+                if error is not None:
+                    pending.pop()
+                    file_storage.close()
+                    yield {"index": index, "filename": filename, "status": "rejected", "ok": False, "error": error}
+                    continue
+                try:
+                    job_id = submit_analysis(file_storage, filename, config_data, count_mode, notify=finished)
+                except QueueFullError:
+                    if not in_flight:
+                        time.sleep(0.2)  # 队列被其他请求占满, 稍后重试
+                    break
+                pending.pop()
+                file_storage.close()
+                in_flight[job_id] = index
+
+            record = take_finished(block=bool(in_flight))
+            if record is not None:
+                yield record
+    finally:
+        # 客户端中途断开时剩余文档不再分析; 已提交的任务中尚未开始的取消, 已在分析的不再保留在任务表中
+        for _, file_storage in pending:
+            file_storage.close()
+        for job_id in in_flight:
+            job_manager.cancel(job_id)
+
+def batch_csv_columns(config_data):
+    sections = [name for name in get_rule_plan(config_data).config if name != '总字数']
+    return ['序号', '文件名', '状态', '统计模式', '总字数'] + sections + ['不符合项', '错误']
+
+def batch_csv_row(record, columns):
+    result = record.get('result') or {}
+    section_counts = result.get('各部分', {})
+    row = {
+        '序号': record['index'],
+        '文件名': record.get('filename', ''),
+        '状态': record['status'],
+        '统计模式': result.get('统计模式', ''),
+        '总字数': result.get('总字数', ''),
+        '不符合项': ';'.join(item['name'] for item in result.get('检查结果', []) if item.get('status_bool') is False),
+        '错误': record.get('error', ''),
+    }
+    for name in columns[5:-2]:
+        row[name] = section_counts.get(name, {}).get('字数', '')
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([row[name] for name in columns])
+    return buffer.getvalue()
+
+def build_plain_text_report(analysis_result_data):
+    plain_text_lines = []
+    plain_text_lines.append("专利文档字数分析报告")
+    plain_text_lines.append("=" * 22) #
+    plain_text_lines.append(f"文件名: {analysis_result_data.get('文件名', 'N/A')}")
+    plain_text_lines.append(f"统计模式: {analysis_result_data.get('统计模式', 'N/A')}")
+    plain_text_lines.append(f"总字数: {analysis_result_data.get('总字数', 'N/A')}")
+    plain_text_lines.append(f"配置来源: {analysis_result_data.get('config_source', 'N/A')}")
+    plain_text_lines.append("\n--- 各部分字数统计 ---")
+    if analysis_result_data.get('各部分'):
+        for section, data in sorted(analysis_result_data['各部分'].items()):
+            line = f"- {section} (原文标题: '{data.get('原始内容标题', section)}'): {data.get('字数', 'N/A')} 字"
+            if data.get('聚合字数'):
+                line += f" (由子部分聚合: {', '.join(data.get('包含子部分', []))})"
+            plain_text_lines.append(line)
+    else:
+        plain_text_lines.append("  未能识别并提取任何特定章节。")
+    claims = analysis_result_data.get('各权利要求')
+    if claims:
+        plain_text_lines.append(f"\n--- 各权利要求字数 (共 {len(claims['编号'])} 项) ---")
+        plain_text_lines.append(", ".join(f"{number}: {count}" for number, count in zip(claims['编号'], claims['字数'])))
+
+    plain_text_lines.append("\n--- 字数要求检查 ---")
+    if analysis_result_data.get('检查结果'):
+        for item in sorted(analysis_result_data['检查结果'], key=lambda x: (isinstance(x.get("status_bool"), bool) and not x.get("status_bool"), x.get('name','Z'))): # Sort by fail first, then name
+            status_prefix = ""
+            if item.get('status_bool') is True: status_prefix = "✓ 符合:"
+            elif item.get('status_bool') is False: status_prefix = "✗ 不符合:"
+            elif item.get('status_str') == '未识别' or '未识别' in item.get('status_str', ''): status_prefix = "? 未识别:"
+            elif item.get('status_str') == '信息': status_prefix = "ℹ️ 信息:"
+            else: status_prefix = f"✗ {item.get('status_str', '状态未知')}:"
+            plain_text_lines.append(f"{status_prefix} {item.get('message', '无消息')}")
+            plain_text_lines.append(f"    详细: 实际: {item.get('actual', 'N/A')} | 目标: {item.get('expected_str', 'N/A')}")
+    else:
+        plain_text_lines.append("  没有配置或执行任何字数要求检查。")
+
+    plain_text_lines.append("\n--- 应用的配置详情 ---")
+    try:
+        applied_config_yaml = yaml.dump(
+            analysis_result_data.get('applied_config', {}),
+            allow_unicode=True, sort_keys=False, indent=2
+        )
+        plain_text_lines.append(applied_config_yaml)
+    except Exception as e_yaml_dump:
+        app.logger.error(f"纯文本报告中转换配置到YAML失败: {e_yaml_dump}", exc_info=True)
+        plain_text_lines.append("  (无法显示配置详情)")
+    return "\n".join(plain_text_lines)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
-        app.logger.info("POST request received on /")
+        app.logger.debug("POST request received on /")
         if 'patent_file' not in request.files:
             flash('未选择专利文件', 'error')
             return redirect(request.url)
@@ -60,133 +401,60 @@ def index():
             flash(f'专利文件类型不支持 (原始文件名: {patent_file_from_form.filename}). 仅支持 .txt, .docx', 'error')
             return redirect(request.url)
 
-        original_filename = patent_file_from_form.filename
-        base, ext = os.path.splitext(original_filename)
-        secure_base = secure_filename(base)
-        if not secure_base:
-            secure_base = "uploaded_patent_file"
-        final_patent_filename = f"{secure_base}{ext.lower()}"
-        patent_filepath = os.path.join(app.config['UPLOAD_FOLDER'], final_patent_filename)
+        final_patent_filename = secure_document_filename(patent_file_from_form.filename)
 
         try:
-            patent_file_from_form.save(patent_filepath)
+            patent_size, _ = upload_size_and_sha256(patent_file_from_form)
         except Exception as e:
-            flash(f'保存专利文件失败: {e}', 'error')
-            app.logger.error(f"保存专利文件 '{patent_filepath}' 失败: {e}", exc_info=True)
+            flash(f'读取专利文件失败: {e}', 'error')
+            app.logger.error(f"读取上传的专利文件 '{final_patent_filename}' 失败: {e}", exc_info=True)
             return redirect(request.url)
 
-        if not os.path.exists(patent_filepath) or os.path.getsize(patent_filepath) == 0:
-            flash(f'专利文件保存后未找到或为空: {final_patent_filename}', 'error')
-            if os.path.exists(patent_filepath):
-                try: os.remove(patent_filepath)
-                except Exception: pass
+        if patent_size == 0:
+            flash(f'专利文件为空: {final_patent_filename}', 'error')
             return redirect(request.url)
 
-        config_data = None
-        config_source = "默认配置 (未提供有效自定义配置)"
-        config_file_upload = request.files.get('config_file')
-        if config_file_upload and config_file_upload.filename != '':
-            if allowed_file(config_file_upload.filename, ALLOWED_EXTENSIONS_CONFIG):
-                try:
-                    config_data_from_file = yaml.safe_load(config_file_upload.stream)
-                    if isinstance(config_data_from_file, dict):
-                        config_data = config_data_from_file
-                        config_source = f"上传的配置文件 ({config_file_upload.filename})"
-                        flash(f'已使用上传的配置文件: {config_file_upload.filename}', 'info')
-                    else:
-                        flash(f'上传的配置文件 ({config_file_upload.filename}) 内容不是有效的YAML字典。', 'warning')
-                except Exception as e:
-                    flash(f'处理上传的配置文件 ({config_file_upload.filename}) 失败: {e}', 'warning')
-                    app.logger.error(f"Error processing uploaded config '{config_file_upload.filename}': {e}", exc_info=True)
-            else:
-                flash(f'上传的配置文件类型不支持 ({config_file_upload.filename})', 'warning')
-
-        custom_config_text = request.form.get('custom_config_text', '').strip()
-        if config_data is None and custom_config_text:
-            try:
-                config_data_from_text = yaml.safe_load(custom_config_text)
-                if isinstance(config_data_from_text, dict):
-                    config_data = config_data_from_text
-                    config_source = "文本框自定义配置"
-                    flash('已使用文本框中的自定义配置。', 'info')
-                else:
-                    flash('文本框中的配置内容不是有效的YAML字典。', 'warning')
-                    if config_source == "默认配置 (未提供有效自定义配置)": # only update if not already set by uploaded file error
-                        config_source = "默认配置 (文本框内容无效)"
-            except Exception as e:
-                flash(f'解析文本框中的自定义配置失败: {e}.', 'warning')
-                app.logger.error(f"YAML parsing error for textarea config: {e}", exc_info=True)
-                if config_source == "默认配置 (未提供有效自定义配置)":
-                     config_source = "默认配置 (文本框解析失败)"
-
-
-        if config_data is None:
-            config_data = DEFAULT_REQUIREMENTS.copy()
-            if config_source == "默认配置 (未提供有效自定义配置)":
-                 flash('未使用有效的自定义配置，已采用系统默认配置。', 'info')
-
+        config_data, config_source, notices = resolve_config_from_request()
+        for message, category in notices:
+            flash(message, category)
 
         count_mode = request.form.get('count_mode', 'chinese')
-        app.logger.info(f"配置来源: '{config_source}', 统计模式: '{count_mode}'")
+        app.logger.info("配置来源: '%s', 统计模式: '%s'", config_source, count_mode)
 
-        analysis_result_data = None
         try:
-            analyzer = PatentAnalyzer(patent_filepath, config_data=config_data, count_mode=count_mode)
-            analysis_result_data = analyzer.analyze()
+            # 表单提交与 /api/analyze 共用同一个后台任务队列, 这里同步等待任务结束
+            job_id = submit_analysis(patent_file_from_form, final_patent_filename, config_data, count_mode)
+            job = job_manager.wait(job_id)
+            job_manager.pop(job_id)  # 结果只在本请求中使用, 不在任务表中保留
+            if job['status'] != JOB_DONE:
+                if job.get('error_type') == 'QueueTimeoutError':
+                    flash('服务器繁忙：排队等待超时，请稍后重试。', 'error')
+                elif job['status'] == JOB_TIMEOUT:
+                    flash(f"分析超时 (超过 {app.config['JOB_TIMEOUT_SECONDS']:.0f} 秒)，请稍后重试或拆分文档。", 'error')
+                elif job.get('error_type') in ('ValueError', 'FileNotFoundError'):
+                    flash(f"分析失败：{job.get('error')}", 'error')
+                else:
+                    flash(f"分析时发生未知错误，详情请查看服务器日志。错误类型: {job.get('error_type', job['status'])}", 'error')
+                app.logger.error(f"分析任务 {job_id} 未成功: {job['status']} {job.get('error_type')}: {job.get('error')}")
+                return redirect(request.url)
+
+            analysis_result_data = job['result']
             analysis_result_data['config_source'] = config_source
             analysis_result_data['applied_config'] = config_data
+            report_timings = metrics.stage_timings()
+            with metrics.timed_stage(report_timings, 'report'):
+                analysis_result_data['plain_text_report'] = build_plain_text_report(analysis_result_data)
+            if report_timings is not None:
+                analysis_result_data.setdefault('阶段耗时', {}).update(report_timings)
+                metrics.observe_stages(report_timings)
 
-            # --- 生成纯文本报告 ---
-            plain_text_lines = []
-            plain_text_lines.append("专利文档字数分析报告")
-            plain_text_lines.append("=" * 22) #
-            plain_text_lines.append(f"文件名: {analysis_result_data.get('文件名', 'N/A')}")
-            plain_text_lines.append(f"统计模式: {analysis_result_data.get('统计模式', 'N/A')}")
-            plain_text_lines.append(f"总字数: {analysis_result_data.get('总字数', 'N/A')}")
-            plain_text_lines.append(f"配置来源: {analysis_result_data.get('config_source', 'N/A')}")
-            plain_text_lines.append("\n--- 各部分字数统计 ---")
-            if analysis_result_data.get('各部分'):
-                for section, data in sorted(analysis_result_data['各部分'].items()):
-                    line = f"- {section} (原文标题: '{data.get('原始内容标题', section)}'): {data.get('字数', 'N/A')} 字"
-                    if data.get('聚合字数'):
-                        line += f" (由子部分聚合: {', '.join(data.get('包含子部分', []))})"
-                    plain_text_lines.append(line)
-            else:
-                plain_text_lines.append("  未能识别并提取任何特定章节。")
-
-            plain_text_lines.append("\n--- 字数要求检查 ---")
-            if analysis_result_data.get('检查结果'):
-                for item in sorted(analysis_result_data['检查结果'], key=lambda x: (isinstance(x.get("status_bool"), bool) and not x.get("status_bool"), x.get('name','Z'))): # Sort by fail first, then name
-                    status_prefix = ""
-                    if item.get('status_bool') is True: status_prefix = "✓ 符合:"
-                    elif item.get('status_bool') is False: status_prefix = "✗ 不符合:"
-                    elif item.get('status_str') == '未识别' or '未识别' in item.get('status_str', ''): status_prefix = "? 未识别:"
-                    elif item.get('status_str') == '信息': status_prefix = "ℹ️ 信息:"
-                    else: status_prefix = f"✗ {item.get('status_str', '状态未知')}:"
-                    plain_text_lines.append(f"{status_prefix} {item.get('message', '无消息')}")
-                    plain_text_lines.append(f"    详细: 实际: {item.get('actual', 'N/A')} | 目标: {item.get('expected_str', 'N/A')}")
-            else:
-                plain_text_lines.append("  没有配置或执行任何字数要求检查。")
-
-            plain_text_lines.append("\n--- 应用的配置详情 ---")
-            try:
-                applied_config_yaml = yaml.dump(
-                    analysis_result_data.get('applied_config', {}),
-                    allow_unicode=True, sort_keys=False, indent=2
-                )
-                plain_text_lines.append(applied_config_yaml)
-            except Exception as e_yaml_dump:
-                app.logger.error(f"纯文本报告中转换配置到YAML失败: {e_yaml_dump}", exc_info=True)
-                plain_text_lines.append("  (无法显示配置详情)")
-            analysis_result_data['plain_text_report'] = "\n".join(plain_text_lines)
-            # --- 纯文本报告生成结束 ---
-
-            session['analysis_result'] = analysis_result_data
-            return redirect(url_for('show_results'))
-
-        except FileNotFoundError as fnf_err:
-            flash(f'分析失败：文件处理错误 ({fnf_err})。', 'error')
-            app.logger.error(f"分析时文件未找到: {fnf_err}", exc_info=True)
+            result_id = result_store.save(analysis_result_data)
+            session['analysis_result_id'] = result_id
+            return redirect(url_for('show_result', result_id=result_id))
+
+        except QueueFullError as qf_err:
+            flash(f'服务器繁忙：{qf_err}', 'error')
+            app.logger.warning(f"分析队列已满，拒绝请求: {final_patent_filename}")
         except ValueError as ve_err:
             flash(f'分析失败：{ve_err}', 'error')
             app.logger.error(f"分析时发生值错误: {ve_err}", exc_info=True)
@@ -194,25 +462,167 @@ def index():
             app.logger.error(f"分析时发生未知错误: {e_err}", exc_info=True)
             flash(f'分析时发生未知错误，详情请查看服务器日志。错误类型: {type(e_err).__name__}', 'error')
         finally:
-            if os.path.exists(patent_filepath):
-                 try: os.remove(patent_filepath)
-                 except Exception as e_rem: app.logger.warning(f"删除临时专利文件 '{patent_filepath}' 失败: {e_rem}")
+            patent_file_from_form.close() # 释放内存缓冲或溢出的临时文件
 
         return redirect(request.url)
 
     default_config_str = get_default_config_yaml_str()
     return render_template('index.html', default_config_str=default_config_str)
 
+@app.route('/api/analyze', methods=['POST'])
+def api_analyze():
+    """提交分析任务, 立即返回任务 ID (202); 队列已满时返回 429。"""
+    patent_file = request.files.get('patent_file')
+    if patent_file is None or patent_file.filename == '':
+        return jsonify({"error": "未选择专利文件 (字段 patent_file)"}), 400
+    if not allowed_file(patent_file.filename, ALLOWED_EXTENSIONS_DOC):
+        return jsonify({"error": f"专利文件类型不支持: {patent_file.filename}. 仅支持 .txt, .docx"}), 400
+    filename = secure_document_filename(patent_file.filename)
+    if upload_size_and_sha256(patent_file)[0] == 0:
+        return jsonify({"error": f"专利文件为空: {filename}"}), 400
+
+    config_data, config_source, notices = resolve_config_from_request()
+    count_mode = request.form.get('count_mode', 'chinese')
+    try:
+        job_id = submit_analysis(patent_file, filename, config_data, count_mode)
+    except QueueFullError as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    finally:
+        patent_file.close()
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for('api_job_status', job_id=job_id),
+        "config_source": config_source,
+        "messages": [message for message, _ in notices],
+    }), 202
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def api_analyze_batch():
+    """一次上传多个文档 (字段 patent_files, 可重复), 并发分析, 每完成一个就输出一行结果。
+
+    输出格式由 format 参数 (表单或查询字符串) 指定: ndjson (默认) 或 csv。
+    """
+    request.max_content_length = current_app.config['BATCH_MAX_CONTENT_LENGTH']
+    uploads = [f for f in request.files.getlist('patent_files') + request.files.getlist('patent_file')
+               if f.filename]
+    if not uploads:
+        return jsonify({"error": "未选择专利文件 (字段 patent_files)"}), 400
+    output_format = (request.values.get('format') or 'ndjson').lower()
+    if output_format not in ('ndjson', 'csv'):
+        return jsonify({"error": f"不支持的输出格式: {output_format}. 仅支持 ndjson, csv"}), 400
+
+    config_data, config_source, _ = resolve_config_from_request()
+    count_mode = request.form.get('count_mode', 'chinese')
+    max_in_flight = current_app.config['BATCH_MAX_IN_FLIGHT'] or job_manager.max_workers
+    app.logger.info("批量分析: %d 个文档, 配置来源: '%s', 格式: %s", len(uploads), config_source, output_format)
+
+    request.keep_files_open = True
+    records = iter_batch_records(uploads, config_data, count_mode, max_in_flight)
+    if output_format == 'csv':
+        columns = batch_csv_columns(config_data)
+
+        def generate():
+            yield '\ufeff'  # BOM, 便于 Excel 正确识别 UTF-8
+            header = io.StringIO()
+            csv.writer(header).writerow(columns)
+            yield header.getvalue()
+            for record in records:
+                yield batch_csv_row(record, columns)
+        mimetype = 'text/csv'
+    else:
+        def generate():
+            for record in records:
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+        mimetype = 'application/x-ndjson'
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['X-Accel-Buffering'] = 'no'  # 反向代理不要缓冲, 逐行送达
+    if output_format == 'csv':
+        response.headers['Content-Disposition'] = 'attachment; filename=batch_results.csv'
+    return response
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "任务不存在或已过期", "job_id": job_id}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/stats')
+def api_job_stats():
+    return jsonify(job_manager.stats())
+
 @app.route('/results')
 def show_results():
-    result_data = session.get('analysis_result', None)
+    result_id = session.get('analysis_result_id')
+    if result_id:
+        return redirect(url_for('show_result', result_id=result_id))
+    flash('没有可显示的分析结果。请先上传文件进行分析。', 'info')
+    return redirect(url_for('index'))
+
+@app.route('/results/<result_id>')
+def show_result(result_id):
+    result_data = result_store.load(result_id)
     if result_data:
-        # session.pop('analysis_result', None) # Optional: clear after display
-        return render_template('results.html', result=result_data)
-    else:
-        flash('没有可显示的分析结果。请先上传文件进行分析。', 'info')
-        return redirect(url_for('index'))
+        share_url = url_for('show_result', result_id=result_id, _external=True)
+        return render_template('results.html', result=result_data, share_url=share_url)
+    if session.get('analysis_result_id') == result_id:
+        session.pop('analysis_result_id', None)
+    flash('分析结果不存在或已过期。请重新上传文件进行分析。', 'info')
+    return redirect(url_for('index'))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics.is_enabled():
+        abort(404)
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+def warm_up():
+    """预先编译默认规则计划、章节标题正则和默认配置文本, 并导入解析 .docx / YAML 用到的模块。
+
+    在 gunicorn preload 的主进程中执行一次, fork 出的 worker (及其分析进程) 直接共享这些结果。
+    """
+    import zipfile, xml.etree.ElementTree, docx  # noqa: F401 (patent_analyzer_core 中按需导入)
+    compile_config_text(get_default_config_yaml_str())
+    get_rule_plan(None)
+    get_rule_plan(DEFAULT_REQUIREMENTS)
+
+def warm_up_worker():
+    """在每个 Web worker 进程 fork 之后调用: 启动该 worker 的分析进程池。
+
+    进程池、线程等资源不能在 fork 之前创建, 因此不放在 create_app() 中。
+    """
+    started = job_manager.warm_up()
+    app.logger.info("worker %d 预热完成: %d 个分析进程", os.getpid(), started)
+
+def create_app(config=None):
+    """WSGI 应用工厂 (见 wsgi.py / gunicorn.conf.py)。
+
+    config 中的键覆盖环境变量给出的配置; 结果缓存、结果存储和任务管理器随之按新配置重建。
+    可以在 fork 之前 (preload) 调用: 这里不启动任何进程或线程 (进程池在预热或提交第一个任务时才创建)。
+    """
+    global result_cache, result_store, job_manager
+    if config:
+        app.config.update(config)
+        result_cache = make_result_cache(app.config)
+        result_store = make_result_store(app.config)
+        job_manager.shutdown(wait=False)
+        job_manager = make_job_manager(app.config)
+    if not app.config['SECRET_KEY_FROM_ENV']:
+        app.logger.warning("未设置 PATENT_SECRET_KEY, 已使用随机密钥 (重启后会话失效)。")
+    warm_up()
+    return app
 
 if __name__ == '__main__':
-    app.logger.info(f"Flask 应用启动中... UPLOAD_FOLDER is {os.path.abspath(app.config['UPLOAD_FOLDER'])}")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # 开发服务器 (单进程、自动重载); 生产环境请使用 gunicorn -c gunicorn.conf.py wsgi:app
+    create_app()
+    app.logger.info("Flask 开发服务器启动中... 上传文件超过 %d 字节时写入临时目录 %s",
+                    app.config['UPLOAD_SPILL_THRESHOLD'], app.config['UPLOAD_SPILL_DIR'] or tempfile.gettempdir())
+    # 调试模式会启用 Werkzeug 交互式调试器 (可执行任意代码), 默认关闭, 只应在本机开发时用 PATENT_DEBUG=1 打开
+    app.run(debug=os.environ.get('PATENT_DEBUG', '0') == '1', host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""批量分析专利文档的命令行入口。
+
+用法示例:
+    python batch_analyze.py drafts/ "archive/**/*.docx" --workers 8 --output results.jsonl
+
+每个文档分析完成后立即输出一行 JSON (JSON Lines), 全部结束后在 stderr 打印
+吞吐量统计和失败列表。单个文档失败不会中断整个批次。
+
+--bundle 把每个输入文件视为多件申请的合订文件: 边读边拆分成单件申请 (见
+patent_analyzer_core.iter_bundle_documents), 各件并行分析, 按原顺序逐件输出, 记录中的
+application 为申请在文件中的序号。
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import yaml
+
+from corpus_store import CorpusStore
+from patent_analyzer_core import (PatentAnalyzer, create_analyzer, COUNT_MODES, compile_config_text,
+                                  iter_bundle_documents)
+
+SUPPORTED_EXTENSIONS = (".txt", ".docx")
+CORPUS_FLUSH_EVERY = 1000
+
+# 工作进程内的分析参数, 由 _init_worker 设置, 避免每个任务重复传递配置
+_worker_config_data = None
+_worker_count_mode = "chinese"
+
+
+def collect_input_files(inputs):
+    """将目录、通配符和文件路径展开为去重后的 .txt/.docx 文件列表 (保持输入顺序)。"""
+    seen = set()
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = sorted(
+                os.path.join(root, name)
+                for root, _dirs, names in os.walk(item)
+                for name in names
+            )
+        elif glob.has_magic(item):
+            candidates = sorted(glob.glob(item, recursive=True))
+        else:
+            candidates = [item]
+        for path in candidates:
+            if not path.lower().endswith(SUPPORTED_EXTENSIONS) or not os.path.isfile(path):
+                continue
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                files.append(path)
+    return files
+
+
+def load_config_file(config_path):
+    if not config_path:
+        return None
+    with open(config_path, "rb") as f:
+        text = f.read()
+    try:
+        config_data, _ = compile_config_text(text)  # 在分派任务之前完成校验
+    except ValueError as e:
+        raise ValueError(f"配置文件 '{config_path}' 无效: {e}") from e
+    return config_data
+
+
+def _init_worker(config_data, count_mode):
+    global _worker_config_data, _worker_count_mode
+    _worker_config_data = config_data
+    _worker_count_mode = count_mode
+
+
+def analyze_file(path):
+    """分析单个文件; 任何异常都转成失败记录返回, 不向上抛出。"""
+    start = time.perf_counter()
+    record = {"path": path, "ok": False}
+    try:
+        record["bytes"] = os.path.getsize(path)
+        analyzer = create_analyzer(path, config_data=_worker_config_data, count_mode=_worker_count_mode)
+        record["result"] = analyzer.analyze()
+        record["ok"] = True
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed_s"] = round(time.perf_counter() - start, 6)
+    return record
+
+
+def iter_results(files, config_data=None, count_mode="chinese", workers=None, chunksize=None):
+    """按完成顺序逐个产出各文件的分析记录。workers 为 1 时在当前进程内顺序执行。"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(files) <= 1:
+        _init_worker(config_data, count_mode)
+        for path in files:
+            yield analyze_file(path)
+        return
+    if not chunksize:
+        chunksize = max(1, min(16, len(files) // (workers * 4)))
+    with Pool(workers, initializer=_init_worker, initargs=(config_data, count_mode)) as pool:
+        yield from pool.imap_unordered(analyze_file, files, chunksize=chunksize)
+
+
+def analyze_bundle_document(task):
+    """分析合订文件中拆分出的一件申请; 任何异常都转成失败记录返回。"""
+    path, document = task
+    start = time.perf_counter()
+    record = {"path": path, "application": document.index, "label": document.label, "ok": False}
+    try:
+        analyzer = PatentAnalyzer.from_paragraphs(document.paragraphs, os.path.basename(path),
+                                                  config_data=_worker_config_data, count_mode=_worker_count_mode,
+                                                  paragraph_headings=document.paragraph_headings)
+        record["result"] = analyzer.analyze()
+        record["ok"] = True
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed_s"] = round(time.perf_counter() - start, 6)
+    return record
+
+
+def _iter_bundle_tasks(files, config_data, separator, failures):
+    for path in files:
+        try:
+            for document in iter_bundle_documents(path, config_data=config_data, separator=separator):
+                yield path, document
+        except Exception as e: # 拆分出错时已产出的申请照常分析, 其余记为该文件的失败
+            failures.append({"path": path, "application": None, "ok": False,
+                             "error": f"拆分合订文件失败: {type(e).__name__}: {e}"})
+
+
+def iter_bundle_results(files, config_data=None, count_mode="chinese", workers=None, separator=None):
+    """逐件产出合订文件中各件申请的分析记录 (按文件和申请的先后顺序, 拆分失败的文件最后产出)。
+
+    主进程顺序读取并拆分文件, 工作进程并行分析; 同时在途的申请最多为工作进程数的两倍,
+    所以内存占用与合订文件的大小和申请件数无关。
+    """
+    workers = workers or os.cpu_count() or 1
+    split_failures = []
+    tasks = _iter_bundle_tasks(files, config_data, separator, split_failures)
+    if workers == 1:
+        _init_worker(config_data, count_mode)
+        for task in tasks:
+            yield analyze_bundle_document(task)
+    else:
+        with Pool(workers, initializer=_init_worker, initargs=(config_data, count_mode)) as pool:
+            in_flight = deque()
+            for task in tasks:
+                in_flight.append(pool.apply_async(analyze_bundle_document, (task,)))
+                if len(in_flight) >= workers * 2:
+                    yield in_flight.popleft().get()
+            while in_flight:
+                yield in_flight.popleft().get()
+    yield from split_failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量分析专利文档 (.txt/.docx) 并输出 JSON Lines。")
+    parser.add_argument("inputs", nargs="+", help="目录 (递归查找)、通配符 (支持 **) 或文件路径")
+    parser.add_argument("-c", "--config", help="YAML 字数要求配置文件 (默认使用内置配置)")
+    parser.add_argument("-m", "--count-mode", choices=COUNT_MODES, default="chinese", help="字数统计模式")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="工作进程数 (默认 CPU 核数)")
+    parser.add_argument("--chunksize", type=int, default=None, help="每次分派给工作进程的文件数")
+    parser.add_argument("-o", "--output", help="结果输出文件 (默认 stdout)")
+    parser.add_argument("--corpus", help="同时把结果追加到该目录的字数统计库 (见 corpus_store.py)")
+    parser.add_argument("--bundle", action="store_true", help="输入文件是多件申请的合订文件, 拆分后逐件分析")
+    parser.add_argument("--separator", help="合订文件中分隔各件申请的行 (正则, 默认按重复出现的一级标题拆分)")
+    parser.add_argument("--log-level", default="ERROR", choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+                        help="日志级别 (默认 ERROR, 失败文档汇总在结束时打印)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers 必须大于 0")
+    if args.separator and not args.bundle:
+        parser.error("--separator 只能与 --bundle 一起使用")
+    if args.separator:
+        try:
+            re.compile(args.separator)
+        except re.error as e:
+            parser.error(f"--separator 不是有效的正则: {e}")
+
+    try:
+        config_data = load_config_file(args.config)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        parser.error(f"无法加载配置文件: {e}")
+
+    files = collect_input_files(args.inputs)
+    if not files:
+        print("未找到任何 .txt 或 .docx 文件。", file=sys.stderr)
+        return 1
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    corpus = CorpusStore(args.corpus) if args.corpus else None
+    start = time.perf_counter()
+    total_bytes = 0
+    failures = []
+    done = 0
+    if args.bundle:
+        records = iter_bundle_results(files, config_data, args.count_mode, args.workers, args.separator)
+        total_bytes = sum(os.path.getsize(path) for path in files)
+    else:
+        records = iter_results(files, config_data, args.count_mode, args.workers, args.chunksize)
+    try:
+        for record in records:
+            done += 1
+            total_bytes += record.get("bytes", 0)
+            if not record["ok"]:
+                failures.append(record)
+            elif corpus is not None:
+                source = record["path"] if not args.bundle else f"{record['path']}#{record['application']}"
+                corpus.append(record["result"], config_data, source=source)
+                if len(corpus) % CORPUS_FLUSH_EVERY == 0:
+                    corpus.flush()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if corpus is not None:
+            corpus.close()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    print(f"\n完成 {done} 个文档 (成功 {done - len(failures)}, 失败 {len(failures)}), 用时 {elapsed:.2f} s", file=sys.stderr)
+    print(f"吞吐量: {done / elapsed:.1f} 文档/s, {total_bytes / (1024 * 1024) / elapsed:.2f} MB/s", file=sys.stderr)
+    if failures:
+        print("失败列表:", file=sys.stderr)
+        for record in failures:
+            where = record["path"] if not record.get("application") else f"{record['path']}#{record['application']}"
+            print(f"  {where}: {record['error']}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""比较流式 DOCX 读取与 python-docx 读取的耗时和峰值内存 (RSS)。
+
+用法:
+    python benchmarks/bench_docx_reader.py [文件.docx ...] [--paragraphs N] [--repeat N]
+
+未指定文件时会先生成一个含 N 个段落的临时 .docx。每种读取方式在独立子进程中运行,
+以便分别测得峰值 RSS。仅支持提供 resource 模块的平台 (Linux / macOS)。
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+READERS = ("stream", "python-docx")
+
+
+def _peak_rss_kb():
+    # Linux 上 ru_maxrss 会继承 fork 时父进程的峰值, 优先读取 exec 后重新计数的 VmHWM
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS 以字节为单位
+
+
+def run_reader(reader, path):
+    """在当前进程中读取一次 path, 返回耗时与峰值 RSS (读取前后)。"""
+    import patent_analyzer_core as core
+
+    rss_before = _peak_rss_kb()
+    start = time.perf_counter()
+    if reader == "stream":
+        paragraphs = [text for text in core.iter_docx_paragraphs(path) if text.strip()]
+    else:
+        paragraphs = [text for text in core.read_docx_paragraphs_python_docx(path) if text.strip()]
+    wall = time.perf_counter() - start
+    return {
+        "reader": reader,
+        "wall_s": wall,
+        "peak_rss_kb": _peak_rss_kb(),
+        "rss_growth_kb": _peak_rss_kb() - rss_before,
+        "paragraphs": len(paragraphs),
+        "chars": sum(map(len, paragraphs)),
+    }
+
+
+def make_docx(path, paragraph_count, seed=0):
+    from docx import Document
+
+    rng = random.Random(seed)
+    alphabet = [chr(rng.randint(0x4e00, 0x9fff)) for _ in range(2000)] + list("，。；：、（）abc 0123")
+    doc = Document()
+    for _ in range(paragraph_count):
+        doc.add_paragraph("".join(rng.choice(alphabet) for _ in range(rng.randint(20, 300))))
+    doc.save(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="待测 .docx 文件")
+    parser.add_argument("--paragraphs", type=int, default=20000, help="未指定文件时生成的段落数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复次数 (取最快一次)")
+    parser.add_argument("--run", nargs=2, metavar=("READER", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        print(json.dumps(run_reader(*args.run)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = args.files
+        if not files:
+            generated = os.path.join(tmp_dir, f"synthetic_{args.paragraphs}.docx")
+            make_docx(generated, args.paragraphs)
+            files = [generated]
+
+        for path in files:
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{os.path.basename(path)} ({size_mb:.1f} MB)")
+            results = {}
+            for reader in READERS:
+                runs = []
+                for _ in range(args.repeat):
+                    out = subprocess.run([sys.executable, __file__, "--run", reader, path],
+                                         check=True, capture_output=True, text=True).stdout
+                    runs.append(json.loads(out))
+                results[reader] = min(runs, key=lambda r: r["wall_s"])
+            if results["stream"]["paragraphs"] != results["python-docx"]["paragraphs"]:
+                print("  警告: 两种方式读取到的段落数不一致")
+            for reader, r in results.items():
+                print(f"  {reader:<12} {r['wall_s']:8.3f} s  峰值 RSS {r['peak_rss_kb'] / 1024:8.1f} MB"
+                      f"  (读取期间增长 {r['rss_growth_kb'] / 1024:.1f} MB)  {r['paragraphs']} 段")
+            speedup = results["python-docx"]["wall_s"] / max(results["stream"]["wall_s"], 1e-9)
+            print(f"  流式读取提速 {speedup:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
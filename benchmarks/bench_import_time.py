@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""冷启动耗时基准: 导入 patent_analyzer_core、以及用 patent_check.py 检查一个 .txt 文档。
+
+每项在新的解释器进程中运行 --repeat 次, 取最快一次减去空解释器 (python -c pass) 的耗时。
+同时确认只导入核心模块时没有加载 docx / lxml / yaml / flask。超出 --budget-ms (导入)
+或 --check-budget-ms (检查一个文档) 时以退出码 1 结束, 可用于 CI。
+
+运行前先生成字节码 (python -m compileall -q .), 否则测到的是编译源码的时间;
+设置了 PYTHONDONTWRITEBYTECODE 的环境尤其如此。
+
+用法示例:
+    python benchmarks/bench_import_time.py --budget-ms 60 --check-budget-ms 150
+"""
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+HEAVY_MODULES = ("docx", "lxml", "yaml", "flask", "werkzeug")
+
+
+def run_timed(args, repeat, ok_codes=(0,)):
+    """在新进程中运行 repeat 次, 返回 (最快, 中位数) 秒。"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(args, cwd=REPO_ROOT, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+        if completed.returncode not in ok_codes:
+            raise RuntimeError(f"命令失败 (退出码 {completed.returncode}): {' '.join(args)}")
+    return min(timings), statistics.median(timings)
+
+
+def loaded_heavy_modules():
+    code = ("import sys, patent_analyzer_core; "
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return output.split()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="冷启动 (导入与短时命令行调用) 耗时基准")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=60.0, help="导入 patent_analyzer_core 的耗时上限 (毫秒)")
+    parser.add_argument("--check-budget-ms", type=float, default=150.0,
+                        help="patent_check.py 检查一个 5k 字 .txt 文档的耗时上限 (毫秒)")
+    args = parser.parse_args(argv)
+
+    compileall.compile_dir(REPO_ROOT, maxlevels=0, quiet=1)
+    from synthetic_patents import generate_file
+    sample = generate_file(tempfile.gettempdir(), 5000, "txt")
+
+    python = sys.executable
+    baseline, _ = run_timed([python, "-c", "pass"], args.repeat)
+    import_fastest, import_median = run_timed([python, "-c", "import patent_analyzer_core"], args.repeat)
+    check_fastest, check_median = run_timed([python, "patent_check.py", "-q", sample], args.repeat,
+                                             ok_codes=(0, 1))  # 合成文档有不通过的检查项
+    import_ms = (import_fastest - baseline) * 1000
+    check_ms = (check_fastest - baseline) * 1000
+
+    print(f"空解释器:       {baseline * 1000:8.1f} ms")
+    print(f"导入核心模块:   {import_ms:8.1f} ms (中位数 {(import_median - baseline) * 1000:.1f} ms, "
+          f"上限 {args.budget_ms:g} ms)")
+    print(f"检查 5k .txt:    {check_ms:8.1f} ms (中位数 {(check_median - baseline) * 1000:.1f} ms, "
+          f"上限 {args.check_budget_ms:g} ms)")
+
+    failures = []
+    heavy = loaded_heavy_modules()
+    if heavy:
+        failures.append(f"导入核心模块时加载了: {', '.join(heavy)}")
+    if import_ms > args.budget_ms:
+        failures.append(f"导入耗时 {import_ms:.1f} ms 超过上限 {args.budget_ms:g} ms")
+    if check_ms > args.check_budget_ms:
+        failures.append(f"检查耗时 {check_ms:.1f} ms 超过上限 {args.check_budget_ms:g} ms")
+    for message in failures:
+        print(message, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""批量重新检查基准: N 个文档的章节字数按一份配置重新检查。
+
+对比逐文档的 RulePlan.check_items (生成全部文字结果) 与按列的 RulePlan.check_columns
+(只得到通过/不通过位矩阵), 并确认两者的结论一致。字数为随机生成, 约 10% 的章节未识别。
+check_columns 超过 --budget-s 秒时以退出码 1 结束。
+
+用法示例:
+    python benchmarks/bench_rescore.py -n 100000 [-c 新配置.yaml] [--budget-s 2]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from patent_analyzer_core import compile_config_text, get_rule_plan  # noqa: E402
+
+# 随机字数的中位数, 大致与真实申请相当
+TYPICAL_COUNTS = {"总字数": 10000, "权利要求书": 1800, "说明书摘要": 250, "说明书": 8000, "技术领域": 150,
+                  "背景技术": 600, "发明内容": 1000, "具体实施方式": 3800, "有益效果": 500, "附图说明": 250}
+
+
+def random_columns(sections, rows, seed=0):
+    rng = random.Random(seed)
+    columns = {}
+    for name in sections:
+        typical = TYPICAL_COUNTS.get(name, 1000)
+        columns[name] = array("q", (-1 if rng.random() < 0.1 else int(rng.uniform(0.3, 1.7) * typical)
+                                    for _ in range(rows)))
+    columns["总字数"] = array("q", (abs(v) for v in columns["总字数"]))  # 总字数总是存在
+    return columns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量重新检查基准")
+    parser.add_argument("-n", "--rows", type=int, default=100000, help="文档数 (默认 100000)")
+    parser.add_argument("-c", "--config", help="字数要求配置文件 (默认使用内置配置)")
+    parser.add_argument("--budget-s", type=float, default=2.0, help="check_columns 的耗时上限 (秒)")
+    args = parser.parse_args(argv)
+
+    if args.config:
+        with open(args.config, "rb") as f:
+            _, plan = compile_config_text(f.read())
+    else:
+        plan = get_rule_plan(None)
+    sections = set(plan.sections) | set(plan.aggregate_parts or ()) | {"说明书"}
+    columns = random_columns(sorted(sections), args.rows)
+
+    start = time.perf_counter()
+    matrix = plan.check_columns(columns, rows=args.rows)
+    columns_s = time.perf_counter() - start
+    start = time.perf_counter()
+    passed_masks, failed_masks = matrix.row_masks()
+    masks_s = time.perf_counter() - start
+
+    documents = []
+    for row in range(args.rows):
+        actual_counts = {name: column[row] for name, column in columns.items() if column[row] >= 0}
+        found = [name for name in plan.aggregate_parts or () if name in actual_counts]
+        if found:  # 与 analyze() 的说明书聚合相同
+            actual_counts["说明书"] = sum(actual_counts[name] for name in found)
+        documents.append(actual_counts)
+    start = time.perf_counter()
+    for actual_counts in documents:
+        plan.check_items(actual_counts)
+    per_document_s = time.perf_counter() - start
+    mismatches = sum(plan.check_vector(plan.count_vector(actual_counts)) != (passed_masks[row], failed_masks[row])
+                     for row, actual_counts in enumerate(documents))
+
+    print(f"文档数: {args.rows}, 检查项: {len(plan.rules)}")
+    print(f"逐文档 check_items:   {per_document_s:8.3f} s")
+    print(f"按列 check_columns:   {columns_s:8.3f} s ({per_document_s / max(columns_s, 1e-9):.0f}x, 上限 {args.budget_s:g} s)")
+    print(f"  逐文档位图 row_masks: {masks_s:6.3f} s")
+    print(f"有不通过项的文档: {len(matrix.failed_rows())}, 结论不一致: {mismatches}")
+    if mismatches or columns_s > args.budget_s:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
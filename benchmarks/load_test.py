@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""对 Web 服务做并发上传压测。
+
+用法示例:
+    python benchmarks/load_test.py sample.docx --url http://127.0.0.1:5000 -c 16 -n 200 --mode api
+    python benchmarks/load_test.py --spawn gunicorn --web-workers 2 --mode form -c 16 -n 400 --vary
+
+--mode form: 向 / 提交表单, 再打开重定向到的结果页 (同步路径);
+--mode api:  向 /api/analyze 提交后轮询 /api/jobs/<id> 直到任务结束。
+不指定文件时上传合成的 .txt 与 .docx 文档 (轮流)。--spawn 在本机空闲端口上启动服务
+(gunicorn.conf.py 或 werkzeug 多线程服务器), 压测结束后停止。
+结束时打印吞吐量、成功/失败/429 次数和延迟分位数 (p50/p99)。服务端用 PATENT_JOB_EXECUTOR=thread
+和 process 分别启动, 即可对比线程池与进程池的效果。
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def encode_multipart(fields, files):
+    """fields: {name: value}; files: {name: (filename, bytes)}。返回 (body, content_type)。"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8"))
+    for name, (filename, data) in files.items():
+        header = (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                  f'Content-Type: application/octet-stream\r\n\r\n')
+        parts.append(header.encode("utf-8") + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _post(url, body, content_type, timeout):
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": content_type}, method="POST")
+    try:
+        with _opener.open(req, timeout=timeout) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def _post_form(url, body, content_type, timeout):
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": content_type}, method="POST")
+    try:
+        with _opener.open(req, timeout=timeout) as resp:
+            return resp.status, resp.headers.get("Location")
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get("Location")
+
+
+def one_request(args, body, content_type):
+    """执行一次完整的分析请求, 返回 (结果, 耗时秒)。结果为 ok / rejected / failed。"""
+    start = time.perf_counter()
+    if args.mode == "form":
+        status, location = _post_form(args.url.rstrip("/") + "/", body, content_type, args.timeout)
+        # 成功时重定向到 /results/<id>; 失败时带 flash 消息重定向回 /
+        if status != 302 or "/results/" not in (location or ""):
+            return "failed", time.perf_counter() - start
+        # 结果页可能由另一个 worker 处理, 打不开说明结果存储没有在 worker 之间共享
+        try:
+            with urllib.request.urlopen(urllib.parse.urljoin(args.url, location), timeout=args.timeout) as resp:
+                ok = resp.status == 200 and resp.url.split("?")[0].rstrip("/").endswith(location.rstrip("/"))
+        except urllib.error.HTTPError:
+            ok = False
+        return ("ok" if ok else "failed"), time.perf_counter() - start
+
+    status, payload = _post(args.url.rstrip("/") + "/api/analyze", body, content_type, args.timeout)
+    if status == 429:
+        return "rejected", time.perf_counter() - start
+    if status != 202:
+        return "failed", time.perf_counter() - start
+    status_url = args.url.rstrip("/") + json.loads(payload)["status_url"]
+    deadline = start + args.timeout
+    while time.perf_counter() < deadline:
+        with urllib.request.urlopen(status_url, timeout=args.timeout) as resp:
+            job = json.loads(resp.read())
+        if job["status"] in ("done", "failed", "timeout"):
+            return ("ok" if job["status"] == "done" else "failed"), time.perf_counter() - start
+        time.sleep(args.poll_interval)
+    return "failed", time.perf_counter() - start
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def default_documents():
+    """合成的 50k 字 .txt 与 .docx 文档 (缓存在系统临时目录)。"""
+    sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+    from synthetic_patents import generate_file
+    directory = os.path.join(tempfile.gettempdir(), "patent_bench_docs")
+    os.makedirs(directory, exist_ok=True)
+    return [generate_file(directory, 50000, fmt) for fmt in ("txt", "docx")]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(kind, web_workers, web_threads, startup_timeout=60.0):
+    """在本机空闲端口上启动服务, 返回 (进程, URL)。"""
+    port = _free_port()
+    env = dict(os.environ, PATENT_BIND=f"127.0.0.1:{port}", PATENT_WEB_WORKERS=str(web_workers),
+               PATENT_WEB_THREADS=str(web_threads), PATENT_ACCESS_LOG="")
+    env.setdefault("PATENT_LOG_LEVEL", "WARNING")
+    env.setdefault("PATENT_SECRET_KEY", "load-test")
+    if web_workers > 1:
+        env.setdefault("PATENT_RESULT_STORE_DIR", tempfile.mkdtemp(prefix="patent_results_"))
+    if kind == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"]
+    else:
+        command = [sys.executable, "-c", "from werkzeug.serving import run_simple; from wsgi import app; "
+                   f"run_simple('127.0.0.1', {port}, app, threaded=True)"]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + startup_timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务启动失败 (退出码 {process.returncode}): {' '.join(command)}")
+        try:
+            with urllib.request.urlopen(url + "/", timeout=1):
+                return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"服务在 {startup_timeout:.0f} s 内未就绪")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="并发上传压测")
+    parser.add_argument("files", nargs="*", help="轮流上传的 .txt/.docx 文件 (默认使用合成的 .txt 和 .docx 文档)")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--mode", choices=("form", "api"), default="api")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-n", "--requests", type=int, default=100)
+    parser.add_argument("-m", "--count-mode", default="chinese")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--vary", action="store_true",
+                        help="每次请求在文档名后追加序号并改变配置, 避免命中结果缓存")
+    parser.add_argument("--spawn", choices=("gunicorn", "werkzeug"), help="在本机启动服务后再压测 (忽略 --url)")
+    parser.add_argument("--web-workers", type=int, default=1, help="--spawn 时的 worker 进程数")
+    parser.add_argument("--web-threads", type=int, default=8, help="--spawn 时每个 worker 的线程数")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        server, args.url = spawn_server(args.spawn, args.web_workers, args.web_threads)
+    try:
+        return run_load(args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def run_load(args):
+    documents = [(os.path.basename(path), open(path, "rb").read()) for path in args.files or default_documents()]
+    bodies = []
+    for i in range(args.requests):
+        filename, data = documents[i % len(documents)]
+        fields = {"count_mode": args.count_mode}
+        if args.vary:
+            fields["custom_config_text"] = f"说明书摘要:\n  max: {300 + i}\n"
+        bodies.append(encode_multipart(fields, {"patent_file": (filename, data)}))
+
+    outcomes = {"ok": 0, "rejected": 0, "failed": 0}
+    latencies = []
+    lock = threading.Lock()
+
+    def task(i):
+        outcome, elapsed = one_request(args, *bodies[i])
+        with lock:
+            outcomes[outcome] += 1
+            if outcome == "ok":
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(task, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"模式: {args.mode}, 并发: {args.concurrency}, 请求: {args.requests}, 用时 {elapsed:.2f} s")
+    print(f"成功 {outcomes['ok']}, 拒绝(429) {outcomes['rejected']}, 失败 {outcomes['failed']}")
+    print(f"吞吐量: {outcomes['ok'] / elapsed:.1f} 文档/s ({args.requests / elapsed:.1f} 请求/s)")
+    if latencies:
+        print(f"延迟 (s): 平均 {statistics.mean(latencies):.3f}, p50 {percentile(latencies, 50):.3f}, "
+              f"p95 {percentile(latencies, 95):.3f}, p99 {percentile(latencies, 99):.3f}, 最大 {latencies[-1]:.3f}")
+    return 0 if outcomes["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
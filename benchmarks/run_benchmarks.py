@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""分阶段基准测试: 加载、章节提取、完整分析, 以及经 Flask 测试客户端的端到端请求。
+
+只通过公开接口 (PatentAnalyzer(...) / extract_sections() / analyze() 和网页表单) 计时,
+因此同一个脚本可以在任何历史版本 (包括最初版本) 上运行, 用来比较改动前后的耗时。
+
+用法示例:
+    python benchmarks/run_benchmarks.py -o bench.json                      # 默认: 50k 字符, 标题写法 0
+    python benchmarks/run_benchmarks.py -o new.json --baseline bench.json --threshold 0.1
+    python benchmarks/run_benchmarks.py --full -o full.json                # 完整矩阵 (5k-5M 字符, 全部标题写法)
+    python benchmarks/run_benchmarks.py --sizes 5M --variant all           # 自选大小与写法
+
+文档由 synthetic_patents.py 生成并缓存在 --data-dir 中, 结果键为 阶段/格式[/模式]/大小/v写法编号。
+每项取 --repeat 次中最快的一次 (同时记录中位数)。指定 --baseline 时逐项比较最快耗时,
+任一项比基线慢超过 threshold (且绝对差超过 --min-delta 秒) 即以退出码 1 结束, 可用于 CI。
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from patent_analyzer_core import PatentAnalyzer
+from synthetic_patents import VARIANT_COUNT, generate_file, parse_size
+
+# 最初版本就支持的三种统计模式 (COUNT_MODES 常量是后来才有的)
+COUNT_MODES = ("chinese", "word", "all")
+
+
+def time_call(func, repeat, setup=None):
+    """调用 func repeat 次, 返回 (最快, 中位数) 秒。给出 setup 时每次先调用 setup() (不计时),
+    并把其返回值传给 func。"""
+    timings = []
+    for _ in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+def bench_document(path, fmt, repeat):
+    """对一个文档分阶段计时, 返回 {阶段键: (最快, 中位数)}。每次都用新的分析器, 不复用上一次的结果。"""
+    results = {}
+    results[f"load/{fmt}"] = time_call(lambda: PatentAnalyzer(path), repeat)
+    results[f"extract/{fmt}"] = time_call(lambda analyzer: analyzer.extract_sections(), repeat,
+                                          setup=lambda: PatentAnalyzer(path))
+    for mode in COUNT_MODES:
+        results[f"analyze/{fmt}/{mode}"] = time_call(lambda analyzer: analyzer.analyze(), repeat,
+                                                     setup=lambda mode=mode: PatentAnalyzer(path, count_mode=mode))
+        results[f"total/{fmt}/{mode}"] = time_call(lambda mode=mode: PatentAnalyzer(path, count_mode=mode).analyze(),
+                                                   repeat)
+    return results
+
+
+def bench_e2e(path, fmt, repeat):
+    """经 Flask 测试客户端提交表单到 index() 并打开结果页 (有结果缓存的版本每次先清空缓存)。"""
+    import app as app_module
+
+    app_module.app.config["MAX_CONTENT_LENGTH"] = None
+    client = app_module.app.test_client()
+    with open(path, "rb") as f:
+        data = f.read()
+
+    def clear_cache():
+        cache = getattr(app_module, "result_cache", None)
+        if cache is not None:
+            cache.clear()
+
+    def request_once():
+        response = client.post("/", data={"patent_file": (io.BytesIO(data), f"bench.{fmt}"), "count_mode": "chinese"},
+                               content_type="multipart/form-data")
+        location = response.headers.get("Location", "")
+        if response.status_code != 302 or "/results" not in location:
+            raise RuntimeError(f"端到端请求失败: {response.status_code} {location}")
+        client.get(location)
+
+    return {f"e2e/{fmt}": time_call(lambda _: request_once(), repeat, setup=clear_cache)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_delta):
+    """返回比基线慢超过阈值的项目列表 [(键, 基线, 当前)]。"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        before, after = previous["min_s"], current["min_s"]
+        if after > before * (1 + threshold) and after - before > min_delta:
+            regressions.append((key, before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="专利分析分阶段基准测试")
+    parser.add_argument("--sizes", nargs="+", help="文档字符数 (默认 50k; --full 时为 5k 50k 500k 5M)")
+    parser.add_argument("--formats", nargs="+", choices=("txt", "docx"), default=["txt", "docx"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variant", help=f"标题写法编号 (0-{VARIANT_COUNT - 1}) 或 all (默认 0; --full 时为 all)")
+    parser.add_argument("--full", action="store_true", help="完整矩阵: 全部大小和标题写法 (耗时较长)")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "patent_bench_docs"),
+                        help="合成文档缓存目录")
+    parser.add_argument("--no-e2e", action="store_true", help="跳过 Flask 端到端测试")
+    parser.add_argument("-o", "--output", help="结果 JSON 文件")
+    parser.add_argument("--baseline", help="用于比较的基线结果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="允许的相对变慢比例 (默认 0.10)")
+    parser.add_argument("--min-delta", type=float, default=0.0005, help="忽略小于该秒数的绝对差")
+    args = parser.parse_args(argv)
+
+    # 只测代码本身的耗时, 不计日志输出
+    logging.disable(logging.INFO)
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    sizes = args.sizes or (["5k", "50k", "500k", "5M"] if args.full else ["50k"])
+    variant = args.variant or ("all" if args.full else "0")
+    variants = range(VARIANT_COUNT) if variant == "all" else [int(variant)]
+    results = {}
+    for size in sizes:
+        chars = parse_size(size)
+        for variant in variants:
+            for fmt in args.formats:
+                path = generate_file(args.data_dir, chars, fmt, args.seed, variant)
+                print(f"{os.path.basename(path)} ({os.path.getsize(path) / 1024:.0f} KB)", file=sys.stderr)
+                timings = bench_document(path, fmt, args.repeat)
+                if not args.no_e2e:
+                    timings.update(bench_e2e(path, fmt, args.repeat))
+                for key, (fastest, median) in timings.items():
+                    results[f"{key}/{size}/v{variant}"] = {"min_s": fastest, "median_s": median, "repeat": args.repeat}
+                    print(f"  {key:<24} 最快 {fastest * 1000:10.3f} ms  中位数 {median * 1000:10.3f} ms",
+                          file=sys.stderr)
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "seed": args.seed,
+            "variants": list(variants),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n以下项目比基线慢超过 {args.threshold:.0%}:", file=sys.stderr)
+            for key, before, after in regressions:
+                print(f"  {key:<32} {before * 1000:10.3f} ms -> {after * 1000:10.3f} ms ({after / before - 1:+.0%})",
+                      file=sys.stderr)
+            return 1
+        print(f"\n与基线相比没有超过 {args.threshold:.0%} 的变慢。", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""生成用于基准测试的合成专利文档 (.txt / .docx)。
+
+文档结构与真实申请文件相近: 标题、说明书摘要、权利要求书 (带编号的多项权利要求)、
+说明书各部分, 正文为汉字为主、夹杂标点、英文术语、数字和附图标记的句子。
+章节标题轮流使用 COMMON_SECTIONS_PATTERNS 中每个模式对应的写法 (variant 参数),
+同一 seed 生成的文档完全相同, 便于跨版本比较。
+
+用法示例:
+    python benchmarks/synthetic_patents.py out/ --sizes 5k 50k 500k 5M --formats txt docx --variant all
+"""
+import argparse
+import os
+import random
+import re
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# 只依赖最初版本就有的 COMMON_SECTIONS_PATTERNS, 生成器可以在任何历史版本上运行
+from patent_analyzer_core import COMMON_SECTIONS_PATTERNS
+
+# 每个章节的标题写法, 依次对应 COMMON_SECTIONS_PATTERNS 中的各个模式,
+# 末尾追加字间带空格的写法 (模式中的 \s* 允许)
+HEADING_VARIANTS = {
+    "权利要求书": ["权利要求书", "权利要求", "权 利 要 求 书"],
+    "说明书摘要": ["说明书摘要", "摘要", "说 明 书 摘 要"],
+    "技术领域": ["技术领域", "一、技术领域", "1. 技术领域", "技 术 领 域"],
+    "背景技术": ["背景技术", "二、背景技术", "2. 背景技术", "背 景 技 术"],
+    "发明内容": ["发明内容", "三、发明内容", "3. 发明内容", "发 明 内 容"],
+    "具体实施方式": ["具体实施方式", "四、具体实施方式", "4. 具体实施方式", "具 体 实 施 方 式"],
+    "有益效果": ["有益效果", "五、有益效果", "5. 有益效果", "有 益 效 果"],
+    "附图说明": ["附图说明", "六、附图说明", "6. 附图说明", "附 图 说 明"],
+    "说明书": ["说明书", "说 明 书"],
+}
+VARIANT_COUNT = max(len(v) for v in HEADING_VARIANTS.values())
+
+# 文档中的章节顺序及其占正文字数的比例
+SECTION_LAYOUT = (
+    ("说明书摘要", 0.03),
+    ("权利要求书", 0.15),
+    ("说明书", 0.0),
+    ("技术领域", 0.02),
+    ("背景技术", 0.10),
+    ("发明内容", 0.15),
+    ("有益效果", 0.05),
+    ("附图说明", 0.03),
+    ("具体实施方式", 0.47),
+)
+
+_COMMON_HAN = ("一种装置方法系统包括设置连接固定位于所述第一二三个部件结构模块单元控制信号数据处理"
+               "通过用于实现提高效率降低成本安全可靠稳定运行检测传感器电路板外壳支架转轴电机驱动"
+               "其特征在于还具有以及并且根据如图所示本发明实施例中优选地进一步技术方案领域背景")
+_TERMS = ("CPU", "LED", "PCB", "USB", "Wi-Fi", "PLC", "MOSFET", "IoT", "GPS", "API")
+_PUNCT = "，，，。；、：（）"
+
+
+def _check_heading_variants():
+    """确认每种标题写法都能被识别为对应章节 (识别规则改动后及时发现)。
+
+    按原有规则判断: 主章节优先, 其余章节按 COMMON_SECTIONS_PATTERNS 中的顺序, 逐个模式 re.fullmatch。
+    """
+    main_keys = ["权利要求书", "说明书摘要", "说明书"]
+    ordered_keys = main_keys + [key for key in COMMON_SECTIONS_PATTERNS if key not in main_keys]
+    for section, variants in HEADING_VARIANTS.items():
+        for text in variants:
+            matched = next((key for key in ordered_keys
+                            if any(re.fullmatch(pattern, text.strip(), re.IGNORECASE)
+                                   for pattern in COMMON_SECTIONS_PATTERNS[key])), None)
+            if matched != section:
+                raise AssertionError(f"标题写法 '{text}' 未被识别为 '{section}'")
+    missing = set(COMMON_SECTIONS_PATTERNS) - set(HEADING_VARIANTS)
+    if missing:
+        raise AssertionError(f"缺少以下章节的标题写法: {sorted(missing)}")
+
+
+def _sentence(rng, length):
+    parts = []
+    size = 0
+    while size < length:
+        roll = rng.random()
+        if roll < 0.80:
+            piece = "".join(rng.choices(_COMMON_HAN, k=rng.randint(4, 16)))
+        elif roll < 0.86:
+            piece = rng.choice(_TERMS)
+        elif roll < 0.92:
+            piece = f"（{rng.randint(1, 300)}）"  # 附图标记
+        else:
+            piece = f"{rng.randint(1, 999)}{rng.choice(('mm', '℃', '%', 'V', ''))}"
+        parts.append(piece)
+        parts.append(rng.choice(_PUNCT))
+        size += len(piece) + 1
+    parts[-1] = "。"
+    return "".join(parts)
+
+
+def _paragraphs(rng, budget, min_len=40, max_len=400):
+    paragraphs = []
+    while budget > 0:
+        length = min(budget, rng.randint(min_len, max_len))
+        paragraphs.append(_sentence(rng, max(length, 8)))
+        budget -= length
+    return paragraphs
+
+
+def _claims(rng, budget):
+    claims = []
+    number = 1
+    while budget > 0 or number == 1:
+        length = min(max(budget, 30), rng.randint(60, 300))
+        prefix = "一种" if number == 1 else f"根据权利要求{rng.randint(1, number - 1)}所述的装置，"
+        separator = rng.choice((".", "．", "、"))
+        claims.append(f"{number}{separator}{prefix}{_sentence(rng, length)}")
+        budget -= length
+        number += 1
+    return claims
+
+
+def generate_paragraphs(target_chars, seed=0, variant=0):
+    """生成总长度约为 target_chars 字符的专利文档段落列表。"""
+    _check_heading_variants()
+    rng = random.Random(f"{seed}:{target_chars}:{variant}")
+    paragraphs = ["一种" + "".join(rng.choices(_COMMON_HAN, k=12))]
+    for section, share in SECTION_LAYOUT:
+        variants = HEADING_VARIANTS[section]
+        paragraphs.append(variants[variant % len(variants)])
+        budget = int(target_chars * share)
+        if section == "说明书摘要":
+            paragraphs.extend(_paragraphs(rng, min(budget, 300), 80, 300))
+        elif section == "权利要求书":
+            paragraphs.extend(_claims(rng, budget))
+        elif budget:
+            paragraphs.extend(_paragraphs(rng, budget))
+    return paragraphs
+
+
+def write_txt(paragraphs, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(paragraphs))
+        f.write("\n")
+
+
+def write_docx(paragraphs, path):
+    from docx import Document
+
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(path)
+
+
+WRITERS = {"txt": write_txt, "docx": write_docx}
+
+
+def parse_size(text):
+    """解析 5k / 500K / 5M / 12000 形式的字符数。"""
+    text = text.strip().lower()
+    multiplier = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    number = text[:-1] if multiplier != 1 else text
+    return int(float(number) * multiplier)
+
+
+def generate_file(out_dir, target_chars, fmt, seed=0, variant=0):
+    """生成一个文档并返回其路径 (已存在则直接返回, 内容由参数唯一确定)。"""
+    path = os.path.join(out_dir, f"patent_{target_chars}_v{variant}_s{seed}.{fmt}")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        WRITERS[fmt](generate_paragraphs(target_chars, seed, variant), tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成合成专利文档")
+    parser.add_argument("out_dir", help="输出目录")
+    parser.add_argument("--sizes", nargs="+", default=["5k", "50k", "500k", "5M"], help="目标字符数")
+    parser.add_argument("--formats", nargs="+", choices=tuple(WRITERS), default=list(WRITERS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variant", default="0", help=f"标题写法编号 (0-{VARIANT_COUNT - 1}) 或 all")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    variants = range(VARIANT_COUNT) if args.variant == "all" else [int(args.variant)]
+    for size in args.sizes:
+        for variant in variants:
+            for fmt in args.formats:
+                path = generate_file(args.out_dir, parse_size(size), fmt, args.seed, variant)
+                print(f"{path}\t{os.path.getsize(path)} 字节")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""按列存储的文档字数与检查结果库, 用于对大量历史申请做统计查询。
+
+每个分析结果追加为一行: 每个章节一列 (int64, 未识别为 -1), 另有配置编号、统计模式,
+以及每行一对检查位图 (通过 / 不通过, 第 i 位对应该配置 RulePlan.rules[i])。
+数据保存在一个目录中:
+
+    meta.json        行数、章节列表、配置列表 (指纹、检查项名称、合并后的配置)、统计模式列表
+    sections/<n>.i64 第 n 个章节的列
+    config.u16 / mode.u8 / passed.u64 / failed.u64
+    docs.jsonl       每行的文件名等元数据
+
+列文件只追加; meta.json 中的行数是权威值, 写入中断时多出的尾部数据在下次打开时被忽略。
+同一目录同一时间只应有一个写入者。查询时整列读入 array, 10 万行的百分位、失败率
+查询在几毫秒到几十毫秒内完成。
+
+rescore() 用另一份配置按列重新检查已存的字数 (RulePlan.check_columns), 不需要重新分析文档,
+可用于评估修改字数要求的影响。
+
+用法示例:
+    python batch_analyze.py drafts/ --corpus corpus/
+    python corpus_store.py corpus/ --percentile 具体实施方式 50 95 --ratio 具体实施方式 权利要求书 --failure-rates
+    python corpus_store.py corpus/ --rescore 新配置.yaml --show-failed 20
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from array import array
+from collections import Counter
+from itertools import compress
+
+from patent_analyzer_core import COUNT_MODES, ConfigError, RatioRule, RulePlan, compile_config_text, get_rule_plan
+
+MISSING = -1
+MAX_CHECKS = 64  # 检查位图为 64 位
+
+_FIXED_COLUMNS = {"config": "H", "mode": "B", "passed": "Q", "failed": "Q"}
+_FIXED_SUFFIX = {"H": "u16", "B": "u8", "Q": "u64"}
+
+
+def _check_name(rule):
+    return rule.check_name if isinstance(rule, RatioRule) else rule.name
+
+
+def _percentile(sorted_values, q):
+    """线性插值百分位 (q 为 0-100), 与 numpy.percentile 的默认方法一致。"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class CorpusStore:
+    """按列追加和查询分析结果。append() 的数据先缓存在内存中, flush() (或 close()) 时写盘。"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.join(path, "sections"), exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {"version": 1, "rows": 0, "sections": [], "configs": [], "count_modes": list(COUNT_MODES)}
+        self._section_index = {name: i for i, name in enumerate(self.meta["sections"])}
+        self._config_index = {cfg["fingerprint"]: i for i, cfg in enumerate(self.meta["configs"])}
+        self._columns = None  # 已读入的列 (查询时才加载)
+        self._pending = []  # 未写盘的行: (各章节字数 dict, 配置编号, 模式编号, 通过位图, 不通过位图, 文档元数据)
+
+    def __len__(self):
+        return self.meta["rows"] + len(self._pending)
+
+    @property
+    def sections(self):
+        return list(self.meta["sections"])
+
+    # ---- 写入 ----
+
+    def _config_id(self, plan):
+        config_id = self._config_index.get(plan.fingerprint)
+        if config_id is None:
+            if len(plan.rules) > MAX_CHECKS:
+                raise ValueError(f"配置中的检查项超过 {MAX_CHECKS} 个, 无法写入检查位图。")
+            config_id = len(self.meta["configs"])
+            self.meta["configs"].append({"fingerprint": plan.fingerprint,
+                                         "checks": [_check_name(rule) for rule in plan.rules],
+                                         "config": plan.config})
+            self._config_index[plan.fingerprint] = config_id
+        return config_id
+
+    def append(self, result, config_data=None, source=None):
+        """追加一个 PatentAnalyzer.analyze() 结果; config_data 为分析时使用的配置。
+
+        检查位图按结果中的字数由 RulePlan.check_vector 重新计算 (不解析检查结果的文字)。
+        """
+        plan = get_rule_plan(config_data)
+        actual_counts = {name: data["字数"] for name, data in result.get("各部分", {}).items()}
+        actual_counts["总字数"] = result["总字数"]
+        passed, failed = plan.check_vector(plan.count_vector(actual_counts))
+        mode = result.get("统计模式", "chinese")
+        count_modes = self.meta["count_modes"]
+        if mode not in count_modes:
+            count_modes.append(mode)
+        doc = {"文件名": result.get("文件名"), "source": source, "time": round(time.time(), 3)}
+        self._pending.append((actual_counts, self._config_id(plan), count_modes.index(mode), passed, failed, doc))
+        self._columns = None
+
+    def flush(self):
+        if not self._pending:
+            return
+        rows = self.meta["rows"]
+        pending = self._pending
+        for counts, *_ in pending:
+            for name in counts:
+                if name not in self._section_index:
+                    # 新章节: 之前的行补 MISSING
+                    self._section_index[name] = len(self.meta["sections"])
+                    self.meta["sections"].append(name)
+                    column = array("q", [MISSING]) * rows
+                    with open(self._section_path(self._section_index[name]), "wb") as f:
+                        column.tofile(f)
+
+        for name, index in self._section_index.items():
+            column = array("q", (counts.get(name, MISSING) for counts, *_ in pending))
+            self._append_file(self._section_path(index), column, rows)
+        for position, (key, typecode) in enumerate(_FIXED_COLUMNS.items(), start=1):
+            column = array(typecode, (row[position] for row in pending))
+            self._append_file(self._fixed_path(key), column, rows)
+        docs = "".join(json.dumps(row[-1], ensure_ascii=False) + "\n" for row in pending).encode("utf-8")
+        docs_bytes = self.meta.get("docs_bytes", 0)
+        with open(os.path.join(self.path, "docs.jsonl"), "ab") as f:
+            if f.tell() != docs_bytes:
+                f.truncate(docs_bytes)
+                f.seek(docs_bytes)
+            f.write(docs)
+        self.meta["docs_bytes"] = docs_bytes + len(docs)
+
+        self.meta["rows"] = rows + len(pending)
+        self._pending = []
+        self._write_meta()
+        self._columns = None
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def _section_path(self, index):
+        return os.path.join(self.path, "sections", f"{index}.i64")
+
+    def _fixed_path(self, key):
+        return os.path.join(self.path, f"{key}.{_FIXED_SUFFIX[_FIXED_COLUMNS[key]]}")
+
+    @staticmethod
+    def _append_file(path, column, rows):
+        """追加到列文件; 先截掉上次写入中断留下的多余数据。"""
+        with open(path, "ab") as f:
+            expected = rows * column.itemsize
+            if f.tell() != expected:
+                f.truncate(expected)
+                f.seek(expected)
+            column.tofile(f)
+
+    def _write_meta(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, meta_path)
+
+    # ---- 查询 ----
+
+    def _load_columns(self):
+        if self._pending:
+            self.flush()
+        if self._columns is None:
+            rows = self.meta["rows"]
+            columns = {key: self._read_column(self._fixed_path(key), typecode, rows)
+                       for key, typecode in _FIXED_COLUMNS.items()}
+            columns["sections"] = {name: self._read_column(self._section_path(index), "q", rows)
+                                   for name, index in self._section_index.items()}
+            self._columns = columns
+        return self._columns
+
+    @staticmethod
+    def _read_column(path, typecode, rows):
+        column = array(typecode)
+        if rows:
+            with open(path, "rb") as f:
+                column.fromfile(f, rows)
+        return column
+
+    def column(self, name):
+        """整列 (array, 未识别为 MISSING); 不存在的章节返回 None。"""
+        return self._load_columns()["sections"].get(name)
+
+    def config_ids(self, config=None):
+        """配置 (配置字典、RulePlan、指纹或指纹前缀) 对应的配置编号集合。"""
+        if config is None:
+            return set(range(len(self.meta["configs"])))
+        if isinstance(config, dict):
+            config = get_rule_plan(config).fingerprint
+        fingerprint = getattr(config, "fingerprint", config)
+        return {i for i, cfg in enumerate(self.meta["configs"]) if cfg["fingerprint"].startswith(fingerprint)}
+
+    def check_bits(self, check_name):
+        """检查项在各配置中对应的位: {配置编号: 位}。"""
+        return {i: 1 << cfg["checks"].index(check_name)
+                for i, cfg in enumerate(self.meta["configs"]) if check_name in cfg["checks"]}
+
+    def select(self, config=None, count_mode=None, failed=None, passed=None):
+        """返回满足条件的行选择器 (与行数等长的 0/1 bytearray), 没有任何条件时返回 None。
+
+        config 见 config_ids(); failed / passed 为检查项名称, 选出该项不通过 / 通过的行。
+        """
+        columns = self._load_columns()
+        selector = None
+        if config is not None:
+            ids = self.config_ids(config)
+            lookup = bytes(1 if i in ids else 0 for i in range(len(self.meta["configs"])))
+            selector = bytearray(lookup[c] for c in columns["config"])
+        if count_mode is not None:
+            modes = self.meta["count_modes"]
+            wanted = modes.index(count_mode) if count_mode in modes else -1
+            mode_selector = bytearray(m == wanted for m in columns["mode"])
+            selector = mode_selector if selector is None else bytearray(a & b for a, b in zip(selector, mode_selector))
+        for check_name, key in ((failed, "failed"), (passed, "passed")):
+            if check_name is None:
+                continue
+            bits = self.check_bits(check_name)
+            check_selector = bytearray(
+                bool(mask & bits.get(c, 0)) for c, mask in zip(columns["config"], columns[key])
+            )
+            selector = check_selector if selector is None else bytearray(
+                a & b for a, b in zip(selector, check_selector))
+        return selector
+
+    def values(self, section, **filters):
+        """章节 (或 "总字数") 在所选行中的字数列表, 不含未识别的行。"""
+        column = self.column(section)
+        if column is None:
+            return []
+        selector = self.select(**filters)
+        selected = column if selector is None else compress(column, selector)
+        return [v for v in selected if v != MISSING]
+
+    def ratio_values(self, numerator, denominator, **filters):
+        """两个章节的字数比例 (两者都已识别且分母大于 0 的行)。"""
+        top, bottom = self.column(numerator), self.column(denominator)
+        if top is None or bottom is None:
+            return []
+        pairs = zip(top, bottom)
+        selector = self.select(**filters)
+        if selector is not None:
+            pairs = compress(pairs, selector)
+        return [t / b for t, b in pairs if t != MISSING and b > 0]
+
+    def percentiles(self, section, qs, **filters):
+        """{q: 百分位} (线性插值); 没有数据时各值为 None。"""
+        values = sorted(self.values(section, **filters))
+        return {q: _percentile(values, q) for q in qs}
+
+    def percentile(self, section, q, **filters):
+        return self.percentiles(section, (q,), **filters)[q]
+
+    def ratio_percentiles(self, numerator, denominator, qs, **filters):
+        values = sorted(self.ratio_values(numerator, denominator, **filters))
+        return {q: _percentile(values, q) for q in qs}
+
+    def describe(self, section, **filters):
+        values = sorted(self.values(section, **filters))
+        if not values:
+            return {"count": 0}
+        return {"count": len(values), "min": values[0], "max": values[-1], "mean": sum(values) / len(values),
+                "p50": _percentile(values, 50), "p95": _percentile(values, 95)}
+
+    def failure_rates(self, **filters):
+        """各检查项的 {"evaluated": 有结论的行数, "failed": 不通过行数, "rate": 不通过比例}, 按失败率降序。
+
+        同名检查项跨配置合并统计; 未识别 (或仅作信息) 的行不计入 evaluated。
+        """
+        columns = self._load_columns()
+        triples = zip(columns["config"], columns["passed"], columns["failed"])
+        selector = self.select(**filters)
+        if selector is not None:
+            triples = compress(triples, selector)
+        # 不同的 (配置, 位图) 组合很少, 先计数再按位展开
+        stats = {}
+        for (config_id, passed, failed), n in Counter(triples).items():
+            for bit_index, name in enumerate(self.meta["configs"][config_id]["checks"]):
+                bit = 1 << bit_index
+                if (passed | failed) & bit:
+                    entry = stats.setdefault(name, [0, 0])
+                    entry[0] += n
+                    if failed & bit:
+                        entry[1] += n
+        rates = {name: {"evaluated": evaluated, "failed": failed_count, "rate": failed_count / evaluated}
+                 for name, (evaluated, failed_count) in stats.items()}
+        return dict(sorted(rates.items(), key=lambda item: -item[1]["rate"]))
+
+    def rescore(self, requirements=None, **filters):
+        """按另一份配置 requirements (配置字典或 RulePlan) 重新检查所选行, 返回 RuleCheckMatrix, 其第 i 行
+        对应所选的第 i 个文档 (与 documents(select(**filters)) 的顺序相同)。
+
+        注意 "说明书" 列存的是写入时按原配置聚合后的字数; 新配置设置了 sub_sections 时,
+        识别到子章节的行会由子章节列重新聚合。
+        """
+        plan = requirements if isinstance(requirements, RulePlan) else get_rule_plan(requirements)
+        columns = self._load_columns()["sections"]
+        selector = self.select(**filters)
+        if selector is None:
+            return plan.check_columns(columns, rows=self.meta["rows"])
+        columns = {name: array("q", compress(column, selector)) for name, column in columns.items()}
+        return plan.check_columns(columns, rows=sum(selector))
+
+    def documents(self, selector=None):
+        """逐行读取文档元数据 (docs.jsonl), 可用 select() 的结果筛选。"""
+        rows = self.meta["rows"]
+        with open(os.path.join(self.path, "docs.jsonl"), encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                if i >= rows:
+                    break
+                if selector is None or selector[i]:
+                    yield json.loads(line)
+
+
+def _format_number(value):
+    return "N/A" if value is None else f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查询按列存储的字数统计库 (由 batch_analyze.py --corpus 生成)。")
+    parser.add_argument("corpus", help="统计库目录")
+    parser.add_argument("--percentile", nargs="+", metavar=("章节", "Q"), help="章节字数的百分位, 如: 具体实施方式 50 95")
+    parser.add_argument("--ratio", nargs=2, metavar=("分子章节", "分母章节"), help="两个章节字数比例的分布")
+    parser.add_argument("--failure-rates", action="store_true", help="各检查项的失败率")
+    parser.add_argument("--config", help="只统计该配置指纹 (前缀) 的行")
+    parser.add_argument("-m", "--count-mode", choices=COUNT_MODES, help="只统计该统计模式的行")
+    parser.add_argument("--failed", help="只统计该检查项不通过的行")
+    parser.add_argument("--rescore", metavar="配置文件", help="按新的字数要求配置 (YAML 或 JSON) 重新检查, 输出各检查项失败率")
+    parser.add_argument("--show-failed", type=int, default=0, metavar="N", help="与 --rescore 一起使用: 列出前 N 个不通过的文档")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(os.path.join(args.corpus, "meta.json")):
+        parser.error(f"'{args.corpus}' 不是统计库目录。")
+    store = CorpusStore(args.corpus)
+    filters = {"config": args.config, "count_mode": args.count_mode, "failed": args.failed}
+    print(f"{len(store)} 个文档, {len(store.meta['configs'])} 份配置")
+
+    if args.percentile:
+        section, qs = args.percentile[0], [float(q) for q in args.percentile[1:]] or [50.0, 95.0]
+        for q, value in store.percentiles(section, qs, **filters).items():
+            print(f"{section} P{q:g}: {_format_number(value)}")
+    if args.ratio:
+        values = store.ratio_percentiles(*args.ratio, (5, 50, 95), **filters)
+        print(f"{args.ratio[0]}/{args.ratio[1]} 比例 P5/P50/P95: " + " / ".join(_format_number(v) for v in values.values()))
+    if args.failure_rates:
+        for name, entry in store.failure_rates(**filters).items():
+            print(f"{name}: 不通过 {entry['failed']}/{entry['evaluated']} ({entry['rate']:.1%})")
+    if args.rescore:
+        try:
+            with open(args.rescore, "rb") as f:
+                _, plan = compile_config_text(f.read())
+        except ConfigError as e:
+            parser.error(f"配置文件 '{args.rescore}' 无效: {e}")
+        except Exception as e:  # OSError, yaml.YAMLError (yaml 只在解析 YAML 时才导入)
+            parser.error(f"无法加载配置文件 '{args.rescore}': {e}")
+        start = time.perf_counter()
+        matrix = store.rescore(plan, **filters)
+        failed_rows = matrix.failed_rows()
+        print(f"按 {args.rescore} 重新检查 {matrix.rows} 个文档 ({time.perf_counter() - start:.2f} s): "
+              f"{len(failed_rows)} 个有不通过项")
+        for name, entry in matrix.failure_rates().items():
+            print(f"  {name}: 不通过 {entry['failed']}/{entry['evaluated']} ({entry['rate']:.1%})")
+        if args.show_failed and failed_rows:
+            wanted = set(failed_rows[:args.show_failed])
+            for row, doc in enumerate(store.documents(store.select(**filters))):
+                if row in wanted:
+                    messages = [item["message"] for item in matrix.check_items(row) if item["status_bool"] is False]
+                    print(f"{doc.get('source') or doc.get('文件名')}:")
+                    for message in messages:
+                        print(f"  ✗ {message}")
+                if row >= failed_rows[min(args.show_failed, len(failed_rows)) - 1]:
+                    break
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""gunicorn 配置: gunicorn -c gunicorn.conf.py wsgi:app
+
+分析本身在每个 worker 的分析进程池中执行 (PATENT_JOB_WORKERS), Web worker 只负责收发请求,
+因此默认 1 个 worker 加多个线程即可用满 CPU。需要多个 worker 时请同时设置
+PATENT_RESULT_STORE_DIR (结果存储在各 worker 间共享) 和 PATENT_SECRET_KEY;
+/api/jobs/<id> 的任务状态只在提交任务的 worker 中可见, 多 worker 时需要按连接保持会话 (sticky)。
+
+环境变量:
+    PATENT_BIND         监听地址 (默认 0.0.0.0:8000)
+    PATENT_WEB_WORKERS  worker 进程数 (默认 1)
+    PATENT_WEB_THREADS  每个 worker 的线程数 (默认 8)
+    PATENT_ACCESS_LOG   访问日志文件 (默认 "-" 即标准输出, 设为空字符串关闭)
+"""
+import logging
+import os
+
+bind = os.environ.get("PATENT_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("PATENT_WEB_WORKERS", 1))
+threads = int(os.environ.get("PATENT_WEB_THREADS", 8))
+worker_class = "gthread"
+# 在主进程中导入应用并预热 (编译规则、导入解析库), fork 后各 worker 共享内存页
+preload_app = True
+# 同步等待分析结果的请求最长可达任务超时时间
+timeout = int(float(os.environ.get("PATENT_JOB_TIMEOUT_SECONDS", 120))) + 30
+graceful_timeout = 30
+accesslog = os.environ.get("PATENT_ACCESS_LOG", "-") or None
+
+
+def on_starting(server):
+    if workers > 1 and not os.environ.get("PATENT_RESULT_STORE_DIR"):
+        logging.getLogger("flask.app").warning(
+            "PATENT_WEB_WORKERS=%d 但未设置 PATENT_RESULT_STORE_DIR: 结果页可能在其他 worker 中找不到。", workers)
+
+
+def post_fork(server, worker):
+    from app import warm_up_worker
+    warm_up_worker()
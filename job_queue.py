@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""后台分析任务队列。
+
+分析在有界的工作进程池中执行, 请求线程只负责提交任务和查询状态:
+- 排队与执行中的任务总数超过上限时拒绝新任务 (QueueFullError, Web 层返回 429);
+- 每个任务有执行超时, 从任务开始执行时计时 (排队时间不计入): 支持 SIGALRM 的平台上在工作进程内
+  中断分析, 其他平台 (以及线程池) 上任务超时后被标记为 timeout, 但分析无法中断, 仍占用工作线程/进程,
+  直到真正结束才释放排队名额, 因此队列上限反映的是实际负载; 超时后才算完的结果仍写入结果缓存 (on_done);
+- 可选的排队超时: 排队超过 queue_timeout 秒仍未开始执行的任务被取消并标记为 timeout;
+- 已结束的任务保留一段时间供轮询, 之后自动清理;
+- 分析进程异常退出 (例如被 OOM killer 杀死) 时进程池整体失效: 受影响的任务标记为失败,
+  进程池被丢弃, 下一个任务提交时重新创建。
+"""
+import logging
+import math
+import os
+import secrets
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from patent_analyzer_core import create_analyzer, get_rule_plan
+
+logger = logging.getLogger('flask.app')
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_TIMEOUT = "timeout"
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED, JOB_TIMEOUT)
+
+
+class QueueFullError(Exception):
+    """排队中的任务已达上限。"""
+
+
+# 等待任务结束时查询状态的间隔 (秒), 用于记录任务开始执行的时间并判定超时
+WAIT_POLL_SECONDS = 0.5
+# 预热时每个任务在工作进程中停留的时间 (秒): 任务很快结束时同一个进程可能接连取走几个预热任务
+WARM_UP_HOLD_SECONDS = 0.1
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("分析超时")
+
+
+def run_analysis(document, filename, config_data, count_mode, timeout=None):
+    """在工作进程中分析一个文档, 返回可序列化的结果记录 (不向外抛出异常)。"""
+    use_alarm = bool(timeout) and hasattr(signal, "SIGALRM") and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(max(1, math.ceil(timeout)))
+    start = time.perf_counter()
+    try:
+        analyzer = create_analyzer(document, config_data=config_data, count_mode=count_mode, filename=filename)
+        return {"ok": True, "result": analyzer.analyze(), "elapsed_s": time.perf_counter() - start}
+    except TimeoutError as e:
+        return {"ok": False, "timeout": True, "error": str(e), "error_type": "TimeoutError",
+                "elapsed_s": time.perf_counter() - start}
+    except Exception as e:
+        return {"ok": False, "error": str(e), "error_type": type(e).__name__,
+                "elapsed_s": time.perf_counter() - start}
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+
+def _warm_up_worker(hold_seconds=0.0):
+    get_rule_plan(None)
+    time.sleep(hold_seconds) # 占住本进程, 其余预热任务才会分到 (或启动) 别的工作进程
+    return os.getpid()
+
+
+class _Job:
+    __slots__ = ("job_id", "filename", "status", "submitted_at", "started_at", "finished_at", "record", "future",
+                 "on_done", "finished", "notify", "document_path")
+
+    def __init__(self, job_id, filename, on_done=None, notify=None):
+        self.job_id = job_id
+        self.filename = filename
+        self.status = JOB_QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.record = None
+        self.future = None
+        self.on_done = on_done
+        self.finished = threading.Event()
+        self.notify = notify
+        self.document_path = None
+
+
+class JobManager:
+    """提交分析任务、查询任务状态的线程安全管理器。
+
+    executor 为 "process" (默认) 时分析在独立进程中并行执行; "thread" 时在本进程的线程池
+    中执行, 受 GIL 限制, 主要用于调试和对比测试。进程池在第一次提交任务时才创建。
+    job_timeout 限制单个任务的执行时间, queue_timeout (默认不限) 限制任务排队等待的时间。
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, job_timeout=120, finished_ttl=3600, executor="process",
+                 queue_timeout=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.job_timeout = job_timeout
+        self.queue_timeout = queue_timeout
+        self.finished_ttl = finished_ttl
+        self.executor_kind = executor
+        self._executor = None
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.executor_kind == "thread":
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+                else:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """丢弃已失效的进程池 (有工作进程异常退出), 下次提交任务时重新创建。"""
+        with self._lock:
+            if self._executor is not executor:
+                return  # 其他线程已经处理过
+            self._executor = None
+        logger.error("分析进程异常退出, 进程池已失效, 将重新创建")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self):
+        """预先启动全部工作进程 (进程池默认在提交任务时才逐个启动), 返回工作进程数 (线程池时为 1)。"""
+        executor = self._get_executor()
+        hold_seconds = 0.0 if self.executor_kind == "thread" else WARM_UP_HOLD_SECONDS
+        futures = [executor.submit(_warm_up_worker, hold_seconds) for _ in range(self.max_workers)]
+        return len({future.result() for future in futures})
+
+    def _purge_finished(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.finished_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _finish(self, job, status, record):
+        """任务结束 (调用方持有锁)。返回是否是第一次结束, 以免重复计数。
+
+        排队名额 (_pending) 不在这里释放: 被判定超时的任务可能仍在执行, 名额在 future
+        真正结束 (_on_future_done) 或被取消时才释放。
+        """
+        if job.status in FINISHED_STATUSES:
+            return False
+        job.status = status
+        job.record = record
+        job.finished_at = time.time()
+        job.finished.set()
+        if job.notify is not None:
+            job.notify.put(job.job_id)
+        if status == JOB_DONE:
+            self.completed += 1
+        elif status == JOB_TIMEOUT:
+            self.timed_out += 1
+        else:
+            self.failed += 1
+        return True
+
+    def _on_future_done(self, job, executor, future):
+        if job.document_path is not None:
+            try:
+                os.remove(job.document_path)
+            except OSError as e:
+                logger.warning(f"删除任务 {job.job_id} 的临时文档失败: {e}")
+        if future.cancelled():
+            return  # 取消任务的一方 (_check_timeout) 已释放名额并结束任务
+        exc = future.exception()
+        if isinstance(exc, BrokenProcessPool):
+            # 进程池中任一进程异常退出时, 池中所有未完成的任务都以 BrokenProcessPool 结束
+            self._discard_executor(executor)
+            record = {"ok": False, "error": "分析进程异常退出 (可能是内存不足)", "error_type": "BrokenProcessPool"}
+        elif exc is not None:
+            record = {"ok": False, "error": str(exc), "error_type": type(exc).__name__}
+        else:
+            record = future.result()
+        if record.get("ok"):
+            status = JOB_DONE
+        elif record.get("timeout"):
+            status = JOB_TIMEOUT
+        else:
+            status = JOB_FAILED
+        # 先调用 on_done 再结束任务: 等待者 (wait/get) 拿到的结果字典可能随即被修改,
+        # 不能与回调 (例如写入结果缓存时的序列化) 同时进行。
+        # 已被判定超时的任务也调用 on_done, 结果写入缓存后重试即可直接命中
+        if status == JOB_DONE and job.on_done is not None:
+            try:
+                job.on_done(record["result"])
+            except Exception as e:
+                logger.error(f"任务 {job.job_id} 的完成回调失败: {e}", exc_info=True)
+        with self._lock:
+            self._pending -= 1
+            self._finish(job, status, record)
+
+    def submit(self, document, filename, config_data=None, count_mode="chinese", on_done=None, notify=None,
+               delete_document=False):
+        """提交一个分析任务并立即返回任务 ID; 队列已满时抛出 QueueFullError。
+
+        document 为文档内容 (bytes) 或文档路径; delete_document 为 True 时 document 是交给任务的临时文件,
+        提交成功后由任务在结束 (或被取消) 时删除, 提交失败时仍归调用方处理。
+        on_done(result) 在分析成功后于后台线程中调用, 调用返回后任务才显示为结束, 等待者才能拿到结果。
+        notify 为可选的 queue.Queue, 任务结束 (无论成败) 时放入任务 ID, 便于同时等待多个任务。
+        """
+        job = _Job(secrets.token_urlsafe(9), filename, on_done, notify)
+        if delete_document:
+            job.document_path = document
+        with self._lock:
+            self._purge_finished(time.time())
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"排队中的分析任务已达上限 ({self.max_pending})，请稍后重试。")
+            self._pending += 1
+            self._jobs[job.job_id] = job
+        args = (run_analysis, document, filename, config_data, count_mode, self.job_timeout)
+        try:
+            executor = self._get_executor()
+            try:
+                job.future = executor.submit(*args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                executor = self._get_executor()
+                job.future = executor.submit(*args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                del self._jobs[job.job_id]
+            raise
+        job.future.add_done_callback(lambda future: self._on_future_done(job, executor, future))
+        return job.job_id
+
+    def add_finished(self, filename, result, notify=None):
+        """登记一个无需计算的已完成任务 (例如命中结果缓存), 返回任务 ID。"""
+        job = _Job(secrets.token_urlsafe(9), filename)
+        job.status = JOB_DONE
+        job.finished_at = time.time()
+        job.record = {"ok": True, "result": result, "elapsed_s": 0.0, "cached": True}
+        job.finished.set()
+        with self._lock:
+            self._purge_finished(job.finished_at)
+            self._jobs[job.job_id] = job
+        if notify is not None:
+            notify.put(job.job_id)
+        return job.job_id
+
+    def _execution_limit(self):
+        """本进程判定执行超时的时限 (秒)。
+
+        进程池的任务在被送入进程间队列时就显示为执行中 (最多比实际开始早一个任务的时间),
+        而工作进程内的 SIGALRM 会准时中断分析, 因此这里只作兜底, 时限放宽到两倍。
+        """
+        if self.executor_kind != "thread" and hasattr(signal, "SIGALRM"):
+            return self.job_timeout * 2
+        return self.job_timeout
+
+    def _check_timeout(self, job, now):
+        """更新任务的执行状态, 排队或执行超时的任务标记为 timeout (调用方持有锁)。"""
+        if job.status in FINISHED_STATUSES:
+            return
+        if job.status == JOB_QUEUED and job.future is not None and job.future.running():
+            job.status = JOB_RUNNING
+            job.started_at = now
+        if job.status == JOB_QUEUED:
+            if (self.queue_timeout and now - job.submitted_at > self.queue_timeout and job.future is not None
+                    and job.future.cancel()):
+                self._pending -= 1
+                self._finish(job, JOB_TIMEOUT, {"ok": False, "timeout": True, "error": "排队等待超时",
+                                                "error_type": "QueueTimeoutError"})
+        elif self.job_timeout and now - job.started_at > self._execution_limit():
+            # 已开始执行的 future 无法取消, 名额在分析真正结束时释放
+            self._finish(job, JOB_TIMEOUT, {"ok": False, "timeout": True, "error": "分析超时", "error_type": "TimeoutError"})
+
+    def get(self, job_id):
+        """返回任务状态字典; 任务不存在 (或已被清理) 时返回 None。"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._check_timeout(job, time.time())
+            status = {"job_id": job.job_id, "filename": job.filename, "status": job.status,
+                      "submitted_at": job.submitted_at, "started_at": job.started_at, "finished_at": job.finished_at}
+            record = job.record
+        if record is not None:
+            status.update(record)
+        return status
+
+    def pop(self, job_id):
+        """取走一个已结束的任务: 返回其状态字典并不再保留; 任务不存在或尚未结束时返回 None。"""
+        status = self.get(job_id)
+        if status is None or status["status"] not in FINISHED_STATUSES:
+            return None
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        return status
+
+    def cancel(self, job_id):
+        """放弃一个未结束的任务 (例如请求方已断开), 任务不再保留在任务表中。
+
+        尚未开始执行的任务被取消并立即释放名额; 已在执行的任务无法中断, 继续执行到结束
+        (名额届时释放, 结果照常交给 on_done)。返回任务是否在开始前被取消。
+        """
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None or job.status in FINISHED_STATUSES or job.future is None:
+                return False
+            # 取消时 future 的回调在本线程中同步执行, _on_future_done 对已取消的 future 不取锁
+            if not job.future.cancel():
+                return False
+            self._pending -= 1
+            return True
+
+    def wait(self, job_id, timeout=None):
+        """阻塞等待任务结束并返回任务状态。
+
+        timeout 为最长等待秒数; 默认一直等到任务结束或被判定超时 (排队时间不计入执行超时)。
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = WAIT_POLL_SECONDS if deadline is None else min(WAIT_POLL_SECONDS, deadline - time.monotonic())
+            if remaining <= 0 or job.finished.wait(remaining):
+                break
+            self.get(job_id)  # 记录开始执行的时间并判定超时
+        return self.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executor": self.executor_kind,
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "tracked_jobs": len(self._jobs),
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""轻量的分阶段计时与 Prometheus 文本格式指标。
+
+- PatentAnalyzer 通过 stage_timings() 记录加载、章节提取、计数、检查各阶段耗时,
+  写入结果的 "阶段耗时"。分析可能在工作进程中执行, 因此分析器本身不碰指标注册表,
+  由 Web 进程在拿到结果后调用 observe_analysis() 汇总到直方图。
+- 指标关闭 (环境变量 PATENT_METRICS=0) 时 stage_timings() 返回 None,
+  分析器的每个阶段只多一次空上下文管理器的开销。
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+_enabled = os.environ.get("PATENT_METRICS", "1").lower() not in ("0", "false", "off", "no")
+
+STAGES = ("load", "extract", "count", "check", "report")
+_NULL_STAGE = nullcontext()
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+class StageTimings(dict):
+    """阶段名 -> 累计秒数。同一阶段可以多次进入, 耗时累加。"""
+
+    def stage(self, name):
+        return _StageContext(self, name)
+
+
+class _StageContext:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+def stage_timings():
+    """指标开启时返回新的 StageTimings, 否则返回 None。"""
+    return StageTimings() if _enabled else None
+
+
+def timed_stage(timings, name):
+    """timings 为 None 时返回共享的空上下文管理器。"""
+    return _NULL_STAGE if timings is None else timings.stage(name)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Histogram:
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [各桶计数..., 总和, 次数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *labelvalues):
+        series = self._series.get(labelvalues)
+        return series[-1] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labelvalues, list(series)) for labelvalues, series in self._series.items())
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                yield (self.name + "_bucket",
+                       _format_labels(self.labelnames, labelvalues, ("le", _format_value(float(bound)))), cumulative)
+            yield self.name + "_bucket", _format_labels(self.labelnames, labelvalues, ("le", "+Inf")), series[-1]
+            yield self.name + "_sum", _format_labels(self.labelnames, labelvalues), series[-2]
+            yield self.name + "_count", _format_labels(self.labelnames, labelvalues), series[-1]
+
+
+class CallbackMetric:
+    """抓取时才调用 func 取值的指标 (例如读取缓存或任务队列已有的统计);
+    func 返回数值, 或 {标签值元组: 数值}。kind 为 "gauge" 或 "counter"。"""
+
+    def __init__(self, name, documentation, func, labelnames=(), kind="gauge"):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.func = func
+
+    def samples(self):
+        value = self.func()
+        if isinstance(value, dict):
+            for labelvalues, v in sorted(value.items()):
+                yield self.name, _format_labels(self.labelnames, labelvalues), v
+        else:
+            yield self.name, "", value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=Histogram.DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, func, labelnames=(), kind="gauge"):
+        return self._register(CallbackMetric(name, documentation, func, labelnames, kind))
+
+    def render(self):
+        """Prometheus 文本格式 (text/plain; version=0.0.4)。"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram("patent_analysis_stage_seconds", "各分析阶段耗时 (秒)", ("stage",))
+ANALYSIS_SECONDS = REGISTRY.histogram("patent_analysis_seconds", "单个文档分析总耗时 (秒)")
+DOCUMENT_CHARS = REGISTRY.histogram("patent_document_chars", "文档总字数 (按所选统计模式)",
+                                    buckets=(1000, 5000, 10000, 20000, 50000, 100000, 500000, 1000000, 5000000))
+REQUEST_SECONDS = REGISTRY.histogram("patent_http_request_seconds", "HTTP 请求处理耗时 (秒)", ("endpoint", "method"))
+
+
+def observe_stages(timings):
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+def observe_analysis(result):
+    """把一个新算出的分析结果 (含 "阶段耗时") 计入指标。"""
+    if not _enabled:
+        return
+    timings = result.get("阶段耗时") or {}
+    observe_stages(timings)
+    if timings:
+        ANALYSIS_SECONDS.observe(sum(timings.values()))
+    if isinstance(result.get("总字数"), int):
+        DOCUMENT_CHARS.observe(result["总字数"])
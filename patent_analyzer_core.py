@@ -1,12 +1,25 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import io
+import math
+import operator
 import os
 import re
+import copy
+import json
 import logging
-from docx import Document
+import threading
+from array import array
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import accumulate
 import unicodedata
-import yaml
 from pathlib import Path
+# docx / yaml / zipfile / ElementTree 只在真正读取 .docx 或解析 YAML 配置时才导入,
+# 只分析 .txt 的命令行调用 (如 git pre-commit 钩子) 不必承担它们的导入开销
+
+from metrics import stage_timings, timed_stage
 
 # 配置日志 (可以根据 Flask 应用的日志配置调整或移除)
 # logging.basicConfig( # Flask app 会处理日志配置
@@ -38,6 +51,21 @@ DEFAULT_REQUIREMENTS = {
     "总字数": {"min": 9000, "max": 12000},
 }
 
+def merge_config(config_data=None):
+    """以默认配置为基础合并用户配置 (同名章节的字典逐键覆盖), 返回新的字典。
+
+    合并结果与 DEFAULT_REQUIREMENTS 不共享任何可变对象, 不会污染默认配置。
+    """
+    config = copy.deepcopy(DEFAULT_REQUIREMENTS)
+    if config_data and isinstance(config_data, dict):
+        for key, value in config_data.items():
+            if key in config and isinstance(config[key], dict) and isinstance(value, dict):
+                config[key].update(copy.deepcopy(value))
+            else:
+                config[key] = copy.deepcopy(value)
+    return config
+
+
 # 常见章节名称及其可能的正则表达式模式 (与之前脚本一致)
 COMMON_SECTIONS_PATTERNS = {
     "权利要求书": [r"^\s*权\s*利\s*要\s*求\s*书\s*$", r"^\s*权\s*利\s*要\s*求\s*$"],
@@ -51,287 +79,1416 @@ COMMON_SECTIONS_PATTERNS = {
     "说明书": [r"^\s*说\s*明\s*书\s*$"]
 }
 
+# 字数统计模式; 未知模式按 "all" 处理 (与 count_chars 原有的 else 分支一致)
+COUNT_MODES = ("chinese", "word", "all")
+
+# 一次扫描同时得到三种模式的字数
+CharCounts = namedtuple("CharCounts", COUNT_MODES)
+_ZERO_COUNTS = CharCounts(0, 0, 0)
+
+# 类别串中使用的字符类别码
+_CLS_HAN_EXT = ord("X")   # CJK 扩展B区: 计入 chinese, 不计入 word
+_CLS_LETTER = ord("L")    # ASCII 字母: word 模式下按连续串计为一个单词
+_CLS_DIGIT = ord("D")     # ASCII 数字: word 模式下按连续串计为一个数字
+_CLS_PUNCT = ord("P")     # Unicode 标点 (类别 P*)
+_CLS_SPACE = ord("S")     # 空白字符 (str.isspace)
+_CLS_OTHER = ord("O")     # 其余字符: 仅计入 all
+
+# 基本区与扩展A区汉字在中文专利里占绝大多数, 先用一个正则整段替换为占位符,
+# 剩下的少量字符再查表分类。占位符本身归为 "其他", 且能隔开前后的字母/数字串。
+_HAN_RUN_RE = re.compile("[\u4e00-\u9fff\u3400-\u4dbf]+")
+_HAN_PLACEHOLDER = "\x00"
+_WORD_RUN_RE = re.compile("L+|D+")
+
+
+def _classify_codepoint(codepoint):
+    char = chr(codepoint)
+    if 0x20000 <= codepoint <= 0x2a6df:
+        return _CLS_HAN_EXT
+    if "a" <= char <= "z" or "A" <= char <= "Z":
+        return _CLS_LETTER
+    if "0" <= char <= "9":
+        return _CLS_DIGIT
+    if char.isspace():
+        return _CLS_SPACE
+    if unicodedata.category(char).startswith("P"):
+        return _CLS_PUNCT
+    return _CLS_OTHER
+
+
+class _CharClassTable(dict):
+    """码位 -> 类别码 的查找表, 供 str.translate 使用。
+
+    常用区段在导入时预先计算, 其余码位在第一次出现时分类并写回表中。
+    """
+
+    def __missing__(self, codepoint):
+        cls = _classify_codepoint(codepoint)
+        self[codepoint] = cls
+        return cls
+
+
+_CHAR_CLASS_TABLE = _CharClassTable()
+for _start, _end in ((0x0000, 0x0100),   # ASCII / Latin-1
+                     (0x2000, 0x2070),   # 通用标点
+                     (0x3000, 0x3040),   # CJK 符号和标点
+                     (0xfe30, 0xfe50),   # CJK 兼容形式
+                     (0xff00, 0xfff0)):  # 全角/半角形式
+    for _cp in range(_start, _end):
+        _CHAR_CLASS_TABLE[_cp] = _classify_codepoint(_cp)
+del _start, _end, _cp
+
+
+def count_chars_all_modes(text):
+    """一次分类扫描, 返回 text 在 chinese / word / all 三种模式下的字数 (CharCounts)。
+
+    结果与 PatentAnalyzer.count_chars 在各模式下的逐字符判断完全一致:
+    - chinese: 基本区、扩展A区及扩展B区汉字
+    - word: 基本区与扩展A区汉字 + 英文单词数 + 数字串数 + 标点数
+    - all: 所有非空白字符
+    """
+    if not text:
+        return _ZERO_COUNTS
+    rest, han_runs = _HAN_RUN_RE.subn(_HAN_PLACEHOLDER, text)
+    han = len(text) - len(rest) + han_runs
+    classes = rest.translate(_CHAR_CLASS_TABLE)
+    word_runs = len(_WORD_RUN_RE.findall(classes)) if ("L" in classes or "D" in classes) else 0
+    return CharCounts(
+        han + classes.count("X"),
+        han + classes.count("P") + word_runs,
+        len(text) - classes.count("S"),
+    )
+
+
+def resolve_count_mode(count_mode):
+    """将统计模式映射到 CharCounts 的字段名 (未知模式按 "all" 处理)。"""
+    return count_mode if count_mode in ("chinese", "word") else "all"
+
+
+class ParagraphCountIndex:
+    """段落级字数索引: 每段在三种模式下的字数及其前缀和, 每个文档只构建一次。
+
+    段落之间以换行拼接, 换行在任何模式下都不计数, 也不会连接前后的英文单词或数字,
+    因此任意连续段落区间拼接后的字数恰好等于各段字数之和, 可用前缀和 O(1) 得到。
+    """
+
+    def __init__(self, paragraph_counts):
+        self.paragraph_counts = list(paragraph_counts)
+        self._prefix_sums = {
+            mode: list(accumulate((counts[i] for counts in self.paragraph_counts), initial=0))
+            for i, mode in enumerate(COUNT_MODES)
+        }
+
+    @classmethod
+    def from_paragraphs(cls, paragraphs):
+        return cls(count_chars_all_modes(p) for p in paragraphs)
+
+    def __len__(self):
+        return len(self.paragraph_counts)
+
+    def range_count(self, start, end, count_mode="chinese"):
+        """段落区间 [start, end) 拼接后的字数。"""
+        prefix = self._prefix_sums[resolve_count_mode(count_mode)]
+        return prefix[end] - prefix[start]
+
+    def total(self, count_mode="chinese"):
+        return self._prefix_sums[resolve_count_mode(count_mode)][-1]
+
+    def counts(self, count_mode="chinese"):
+        """每段的字数列表 (按段落顺序)。"""
+        field = COUNT_MODES.index(resolve_count_mode(count_mode))
+        return [counts[field] for counts in self.paragraph_counts]
+
+
+# 标题匹配时优先尝试的主章节, 其余章节按 COMMON_SECTIONS_PATTERNS 中的顺序
+MAIN_SECTION_KEYS = ("权利要求书", "说明书摘要", "说明书")
+# 去掉全部空白后超过该长度的段落不可能是内置写法的章节标题, 跳过内置模式的匹配
+# (内置模式允许字间任意空白, 只有非空白字符的个数有上限)
+HEADING_MAX_LENGTH = 50
+_REGEX_META_CHARS = set(".^$*+?{}[]\\|()")
+
+
+def _pattern_first_chars(pattern):
+    """推导 pattern 在去掉首尾空白的文本上匹配时, 首字符可能的取值。
+
+    只处理 "^", 前导 "\\s*" 之后紧跟一个普通字面字符的简单模式 (内置模式均是如此);
+    无法确定时返回 None, 表示不能用首字符预筛。
+    """
+    rest = pattern
+    if rest.startswith("^"):
+        rest = rest[1:]
+    while rest[:3] in ("\\s*", "\\s+", "\\s?"):
+        rest = rest[3:]
+    if not rest or rest[0] in _REGEX_META_CHARS or "|" in rest:
+        return None
+    if rest[1:2] in ("*", "?") or rest[1:3] == "{0":
+        return None
+    first = rest[0]
+    if first.lower() != first.upper():  # 忽略大小写时字母还可能匹配其他大小写变体, 不做预筛
+        return None
+    return {first}
+
+
+class HeadingMatcher:
+    """章节标题识别器: 按优先顺序依次尝试各章节的标题模式, 第一个整段匹配的模式决定章节。
+
+    sections 为 (章节名, 模式列表) 的有序序列, 排在前面的模式优先。相邻的内置模式合并编译成
+    一个带命名分组的正则; uncapped_patterns 中的模式 (配置中的 heading_patterns) 各自单独编译,
+    含义与逐个 re.fullmatch 完全相同 (反向引用、行内标志等不受合并影响)。
+    匹配前先做两项常数时间的预筛: 首字符集合与长度上限, 绝大多数正文段落在此即被排除。
+    长度上限按去掉全部空白后的长度计, 且只适用于内置模式。
+    """
+
+    def __init__(self, sections, max_length=HEADING_MAX_LENGTH, uncapped_patterns=frozenset()):
+        sections = tuple((name, tuple(patterns)) for name, patterns in sections)
+        # 识别器的全部输入; key 相同的两个识别器对任何文本的结果都相同
+        self.key = (sections, max_length, frozenset(uncapped_patterns))
+        self.max_length = max_length
+        # 按优先顺序排列的 (正则, 首字符集合, 是否受长度上限约束, 章节名或 分组名 -> 章节名)
+        self._matchers = []
+        run = []
+        for section_name, patterns in sections:
+            for pattern in patterns:
+                if pattern in uncapped_patterns:
+                    self._add_combined(run)
+                    run = []
+                    self._matchers.append((self._compile(pattern), _pattern_first_chars(pattern), False,
+                                           section_name))
+                else:
+                    run.append((section_name, pattern))
+        self._add_combined(run)
+
+    @staticmethod
+    def _compile(pattern):
+        try:
+            return re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"章节标题模式 '{pattern}' 无法编译: {e}") from e
+
+    def _add_combined(self, run):
+        """把相邻的内置模式合并成一个正则; 首字符集合为各模式首字符的并集 (任一无法确定时为 None)。"""
+        if not run:
+            return
+        alternatives = []
+        group_sections = {}
+        first_chars = set()
+        for section_name, pattern in run:
+            group_name = f"_h{len(group_sections)}"
+            group_sections[group_name] = section_name
+            alternatives.append(f"(?P<{group_name}>(?:{pattern}))")
+            pattern_first_chars = _pattern_first_chars(pattern)
+            if first_chars is not None:
+                first_chars = first_chars | pattern_first_chars if pattern_first_chars else None
+        self._matchers.append((self._compile("|".join(alternatives)),
+                               frozenset(first_chars) if first_chars is not None else None, True, group_sections))
+
+    def match(self, text):
+        """返回 text 对应的章节名; 不是章节标题时返回 None。"""
+        if not text:
+            return None
+        text = text.strip()
+        if not text:
+            return None
+        first_char = text[0]
+        over_length = len(text) > self.max_length
+        for regex, first_chars, capped, sections in self._matchers:
+            if first_chars is not None and first_char not in first_chars:
+                continue
+            if capped and over_length:
+                # 首字符通过预筛后才数空白
+                if len("".join(text.split())) > self.max_length:
+                    continue
+                over_length = False
+            m = regex.fullmatch(text)
+            if m is not None:
+                return sections if isinstance(sections, str) else sections[m.lastgroup]
+        return None
+
+
+@lru_cache(maxsize=32)
+def _compiled_heading_matcher(sections, uncapped_patterns=frozenset()):
+    return HeadingMatcher(sections, uncapped_patterns=uncapped_patterns)
+
+
+def get_heading_matcher(config=None):
+    """按配置获取 (并缓存) 章节标题识别器。
+
+    内置的 COMMON_SECTIONS_PATTERNS 之外, 配置中任一章节可通过 heading_patterns
+    (字符串或字符串列表) 追加自己的标题模式; 新章节名会排在内置章节之后。
+    追加的模式不受 HEADING_MAX_LENGTH 的限制。
+    """
+    user_patterns = set()
+    section_patterns = {key: list(COMMON_SECTIONS_PATTERNS[key]) for key in MAIN_SECTION_KEYS}
+    for key, patterns in COMMON_SECTIONS_PATTERNS.items():
+        section_patterns.setdefault(key, list(patterns))
+    for key, req in (config or {}).items():
+        extra_patterns = req.get("heading_patterns") if isinstance(req, dict) else None
+        if not extra_patterns:
+            continue
+        if isinstance(extra_patterns, str):
+            extra_patterns = [extra_patterns]
+        if not isinstance(extra_patterns, list) or not all(isinstance(p, str) for p in extra_patterns):
+            raise ValueError(f"配置项 '{key}' 的 heading_patterns 必须是字符串或字符串列表。")
+        section_patterns.setdefault(key, []).extend(extra_patterns)
+        user_patterns.update(extra_patterns)
+    return _compiled_heading_matcher(tuple((key, tuple(patterns)) for key, patterns in section_patterns.items()),
+                                     frozenset(user_patterns))
+
+
+class ConfigError(ValueError):
+    """字数要求配置无效 (编译规则计划时的校验错误)。"""
+
+
+# 编译后的检查规则。RangeRule: 字数范围 (min/max 均为 None 时仅作信息展示);
+# RatioRule: 本章节与参考章节的字数比例, extra_min 为比例检查附带的最小字数 (为假值时不检查)
+RangeRule = namedtuple("RangeRule", "name min max expected_str missing_status missing_message spec")
+RatioRule = namedtuple("RatioRule", "name check_name reference ratio tolerance low high extra_min expected_str")
+
+_RULE_RANGE = 0
+_RULE_RATIO = 1
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _compile_rule(name, req):
+    if not isinstance(req, dict):
+        raise ConfigError(f"配置项 '{name}' 必须是字典 (如 min/max/ratio)，实际为: {req!r}")
+    for key in ("min", "max", "ratio", "tolerance"):
+        if req.get(key) is not None and not _is_number(req[key]):
+            raise ConfigError(f"配置项 '{name}' 的 {key} 必须是数字，实际为: {req[key]!r}")
+    # 只有 "说明书" 的 sub_sections 参与聚合
+    aggregated = name == "说明书" and "sub_sections" in req
+    if aggregated:
+        sub_sections = req["sub_sections"]
+        if not isinstance(sub_sections, list) or not all(isinstance(s, str) for s in sub_sections):
+            raise ConfigError(f"配置项 '{name}' 的 sub_sections 必须是章节名列表。")
+
+    if "ratio" in req:
+        reference = req.get("reference")
+        if not isinstance(reference, str) or not reference:
+            raise ConfigError(f"配置项 '{name}' 设置了 ratio，但缺少参考章节 reference。")
+        ratio = req["ratio"]
+        tolerance = req.get("tolerance", 0.1)
+        if ratio is None or tolerance is None:
+            raise ConfigError(f"配置项 '{name}' 的 ratio/tolerance 不能为空。")
+        low, high = ratio * (1 - tolerance), ratio * (1 + tolerance)
+        return RatioRule(name, f"{name}/{reference} 比例", reference, ratio, tolerance, low, high, req.get("min"),
+                         f"{ratio:.2f} (±{tolerance*100:.0f}%, 即 {low:.2f}-{high:.2f})")
+
+    if aggregated:
+        missing_status, missing_message = "未识别子章节", f"{name}: 未能识别或聚合其子章节。"
+    else:
+        missing_status, missing_message = "未识别", f"{name}: 未在文档中识别到该部分。"
+    min_val, max_val = req.get("min"), req.get("max")
+    if min_val is not None and max_val is not None:
+        expected_str = f"{min_val}-{max_val}字"
+    elif min_val is not None:
+        expected_str = f"至少{min_val}字"
+    elif max_val is not None:
+        expected_str = f"不超过{max_val}字"
+    else:
+        expected_str = "无特定范围要求"
+    # spec: 未识别时 expected_str 展示原始配置 (与之前的检查结果一致)
+    return RangeRule(name, min_val, max_val, expected_str, missing_status, missing_message, str(req))
+
+
+class RulePlan:
+    """由一份配置编译出的不可变字数检查计划。
+
+    配置只在编译时合并与校验一次; 之后每个文档只需按 sections 的顺序给出字数向量
+    (未识别的章节为 None), check_vector 在一个紧凑循环里得到通过/不通过位图,
+    需要展示时再由 check_items 生成与之前逐项解释配置时完全相同的检查结果。
+    大量文档一起检查时用 check_columns, 按列 (每条规则一遍) 计算。
+    config 为合并后的配置, 由所有使用该计划的分析共享, 不要修改。
+    """
+
+    __slots__ = ("config", "rules", "sections", "aggregate_parts", "heading_matcher", "fingerprint", "_ops")
+
+    def __init__(self, config):
+        rules = [_compile_rule(name, req) for name, req in config.items()]
+
+        spec_req = config.get("说明书")
+        self.aggregate_parts = (tuple(spec_req["sub_sections"])
+                                if isinstance(spec_req, dict) and "sub_sections" in spec_req else None)
+
+        sections = {"总字数": 0}
+        for rule in rules:
+            sections.setdefault(rule.name, len(sections))
+            if isinstance(rule, RatioRule):
+                sections.setdefault(rule.reference, len(sections))
+        self.sections = tuple(sections)
+
+        ops = []
+        for rule in rules:
+            if isinstance(rule, RatioRule):
+                ops.append((_RULE_RATIO, sections[rule.name], sections[rule.reference],
+                            rule.low, rule.high, rule.extra_min))
+            else:
+                ops.append((_RULE_RANGE, sections[rule.name], 0, rule.min, rule.max,
+                            rule.min is None and rule.max is None))
+        self.config = config
+        self.rules = tuple(rules)
+        self._ops = tuple(ops)
+        try:
+            self.heading_matcher = get_heading_matcher(config)
+        except ValueError as e:
+            raise ConfigError(str(e)) from e
+        import hashlib # 只在编译规则计划时用到 (每份配置一次)
+        self.fingerprint = hashlib.sha256(
+            json.dumps(config, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        ).hexdigest()
+
+    def count_vector(self, actual_counts):
+        """按 sections 顺序取出字数, 未识别的章节为 None。"""
+        return tuple(actual_counts.get(name) for name in self.sections)
+
+    def check_vector(self, counts):
+        """返回 (通过位图, 不通过位图), 第 i 位对应 rules[i]; 两者都未置位表示未识别或仅作信息。"""
+        passed = failed = 0
+        bit = 1
+        for kind, i, j, low, high, extra in self._ops:
+            value = counts[i]
+            if value is not None:
+                if kind == _RULE_RANGE:
+                    if not extra:  # extra 为真表示无 min/max, 仅作信息
+                        if (low is None or value >= low) and (high is None or value <= high):
+                            passed |= bit
+                        else:
+                            failed |= bit
+                else:
+                    reference = counts[j]
+                    if reference is not None and reference > 0:
+                        if low <= value / reference <= high and not (extra and value < extra):
+                            passed |= bit
+                        else:
+                            failed |= bit
+            bit <<= 1
+        return passed, failed
+
+    def check_columns(self, columns, rows=None):
+        """一次检查 N 个文档: columns 为 {章节名: 长度为 N 的整数字数序列 (负数表示未识别)}, 返回 RuleCheckMatrix。
+
+        columns 中的 "说明书" 应是该章节标题本身的字数; 配置了 sub_sections 时按与 analyze()
+        相同的规则逐行聚合 (识别到任一子章节时取子章节之和)。缺少的章节视为全部未识别。
+        每条规则只对整列做一遍比较, 结果直接存成位集, 不为每个文档构造字典或检查项。
+        """
+        if rows is None:
+            rows = len(next(iter(columns.values()), ()))
+        missing = array("q", [-1]) * rows
+        effective = {name: columns.get(name, missing) for name in self.sections}
+        parts = [columns[name] for name in self.aggregate_parts or () if name in columns]
+        if parts and "说明书" in effective:
+            # 未识别为 -1: 各子章节直接相加, 再加回未识别的个数; 一个子章节都没有时保留标题本身的字数
+            sums = list(parts[0])
+            missing_parts = list(map((0).__gt__, parts[0]))
+            for part in parts[1:]:
+                sums = list(map(operator.add, sums, part))
+                missing_parts = list(map(operator.add, missing_parts, map((0).__gt__, part)))
+            n = len(parts)
+            effective["说明书"] = array("q", [total + m if m < n else heading for total, m, heading
+                                             in zip(sums, missing_parts, effective["说明书"])])
+
+        passed, failed = [], []
+        present = {} # 章节名 -> 已识别的文档位集
+        for rule in self.rules:
+            column = effective[rule.name]
+            if isinstance(rule, RatioRule):
+                reference = effective[rule.reference]
+                low, high, extra = rule.low, rule.high, rule.extra_min or 0
+                evaluated = _bitset(v >= 0 and r > 0 for v, r in zip(column, reference))
+                ok = _bitset(v >= 0 and r > 0 and low <= v / r <= high and v >= extra
+                             for v, r in zip(column, reference))
+            elif rule.min is None and rule.max is None: # 仅作信息
+                passed.append(0)
+                failed.append(0)
+                continue
+            else:
+                low = 0 if rule.min is None else max(rule.min, 0) # 下限不小于 0, 未识别 (-1) 自然不通过
+                high = math.inf if rule.max is None else rule.max
+                evaluated = present.get(rule.name)
+                if evaluated is None:
+                    evaluated = present[rule.name] = _bitset(v >= 0 for v in column)
+                ok = _bitset(low <= v <= high for v in column)
+            passed.append(ok)
+            failed.append(evaluated & ~ok)
+        return RuleCheckMatrix(self, rows, passed, failed, effective)
+
+    def failed_names(self, failed_mask):
+        return [rule.check_name if isinstance(rule, RatioRule) else rule.name
+                for i, rule in enumerate(self.rules) if failed_mask >> i & 1]
+
+    def check_items(self, actual_counts):
+        """生成检查结果列表 (每项含 name/actual/expected_str/status_bool/status_str/message)。"""
+        counts = self.count_vector(actual_counts)
+        passed, failed = self.check_vector(counts)
+        items = []
+        for i, (rule, (_, target, reference, *_)) in enumerate(zip(self.rules, self._ops)):
+            bit = 1 << i
+            status_bool = True if passed & bit else False if failed & bit else None
+            if isinstance(rule, RatioRule):
+                items.append(self._ratio_item(rule, counts[target], counts[reference], status_bool))
+            else:
+                items.append(self._range_item(rule, counts[target], status_bool))
+        return items
+
+    @staticmethod
+    def _range_item(rule, value, status_bool):
+        item = {"name": rule.name, "actual": "N/A", "expected_str": "", "status_bool": None, "status_str": "", "message": ""}
+        if value is None:
+            item["status_str"] = rule.missing_status
+            item["message"] = rule.missing_message
+            item["expected_str"] = rule.spec
+            return item
+        item["actual"] = value
+        item["expected_str"] = rule.expected_str
+        item["status_bool"] = status_bool
+        if rule.min is None and rule.max is None:
+            item["status_str"] = "信息"
+        message = f"{rule.name}: {value}字 (要求: {rule.expected_str})"
+        if status_bool is False:
+            if rule.min is not None and value < rule.min:
+                message += f" (字数不足，差 {rule.min - value} 字)"
+            elif rule.max is not None and value > rule.max:
+                message += f" (字数过多，多 {value - rule.max} 字)"
+        item["message"] = message
+        return item
+
+    @staticmethod
+    def _ratio_item(rule, value, reference, status_bool):
+        item = {"name": rule.check_name, "actual": "N/A", "expected_str": "", "status_bool": None, "status_str": "", "message": ""}
+        if value is not None and reference is not None and reference > 0:
+            item["status_bool"] = status_bool
+            item["actual"] = f"{value / reference:.2f}"
+            item["expected_str"] = rule.expected_str
+            item["message"] = f"{rule.check_name}: {item['actual']} (目标: {rule.expected_str})"
+            if rule.extra_min and value < rule.extra_min:
+                item["message"] += f"；且 '{rule.name}' 字数 {value} 未达到最小要求 {rule.extra_min}"
+        elif value is None:
+            item["status_str"] = "未识别目标章节"
+            item["message"] = f"进行比例计算时未识别到章节 '{rule.name}'"
+        else:
+            item["status_str"] = "未识别参考章节或其字数为0"
+            item["message"] = f"进行比例计算时未识别到参考章节 '{rule.reference}' 或其字数为0"
+        return item
+
+
+_BIT_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def _bitset(flags):
+    """布尔序列 -> 位集 (int, 第 i 位对应第 i 个元素)。"""
+    return int(bytes(flags)[::-1].translate(_BIT_CHARS) or b"0", 2)
+
+
+def _bit_positions(bits):
+    """位集中置位的下标 (升序)。"""
+    digits = bin(bits)[:1:-1]
+    position = digits.find("1")
+    while position >= 0:
+        yield position
+        position = digits.find("1", position + 1)
+
+
+class RuleCheckMatrix:
+    """RulePlan.check_columns 的结果: N 个文档 × rules 的通过/不通过位矩阵。
+
+    passed[k] / failed[k] 为第 k 条规则的位集 (int, 第 i 位对应第 i 个文档), 两者都未置位
+    表示未识别或仅作信息。统计只用位运算; 文字形式的检查结果由 check_items 按需生成。
+    """
+
+    def __init__(self, plan, rows, passed, failed, columns):
+        self.plan = plan
+        self.rows = rows
+        self.passed = passed
+        self.failed = failed
+        self.columns = columns # 检查时使用的各章节字数 (说明书已聚合)
+
+    def any_failed(self):
+        """至少有一项不通过的文档位集。"""
+        bits = 0
+        for failed in self.failed:
+            bits |= failed
+        return bits
+
+    def failed_rows(self):
+        return list(_bit_positions(self.any_failed()))
+
+    def failure_rates(self):
+        """各检查项的 {"evaluated", "failed", "rate"} (与 CorpusStore.failure_rates 格式相同), 按失败率降序。"""
+        rates = {}
+        for rule, passed, failed in zip(self.plan.rules, self.passed, self.failed):
+            evaluated = bin(passed | failed).count("1")
+            if evaluated:
+                failed_count = bin(failed).count("1")
+                name = rule.check_name if isinstance(rule, RatioRule) else rule.name
+                rates[name] = {"evaluated": evaluated, "failed": failed_count, "rate": failed_count / evaluated}
+        return dict(sorted(rates.items(), key=lambda item: -item[1]["rate"]))
+
+    def row_masks(self):
+        """逐文档的 (通过位图, 不通过位图) 两个 array("Q"), 与 check_vector 的结果一致。"""
+        masks = []
+        for bitsets in (self.passed, self.failed):
+            column = array("Q", [0]) * self.rows
+            for k, bits in enumerate(bitsets):
+                bit = 1 << k
+                for row in _bit_positions(bits):
+                    column[row] |= bit
+            masks.append(column)
+        return tuple(masks)
+
+    def check_items(self, row):
+        """第 row 个文档的检查结果列表 (与 RulePlan.check_items 相同)。"""
+        plan = self.plan
+        counts = tuple(None if column[row] < 0 else column[row]
+                       for column in (self.columns[name] for name in plan.sections))
+        items = []
+        for k, (rule, (_, target, reference, *_)) in enumerate(zip(plan.rules, plan._ops)):
+            status_bool = True if self.passed[k] >> row & 1 else False if self.failed[k] >> row & 1 else None
+            if isinstance(rule, RatioRule):
+                items.append(plan._ratio_item(rule, counts[target], counts[reference], status_bool))
+            else:
+                items.append(plan._range_item(rule, counts[target], status_bool))
+        return items
+
+
+@lru_cache(maxsize=64)
+def _compiled_rule_plan(config_json):
+    return RulePlan(merge_config(json.loads(config_json)))
+
+
+def _check_config_keys(value, path="配置"):
+    """配置中 (任意层级) 的键都必须是字符串: json.dumps 会把 1 和 "1" 变成同一个缓存键。"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise ConfigError(f"{path}中的键 {key!r} 不是字符串 (YAML 中可加引号, 如 \"{key}\")。")
+            _check_config_keys(item, f"配置项 '{key}'")
+    elif isinstance(value, list):
+        for item in value:
+            _check_config_keys(item, path)
+
+
+def get_rule_plan(config_data=None):
+    """按用户配置获取 (并缓存) 编译后的规则计划; 配置无效时抛出 ConfigError。"""
+    if not (config_data and isinstance(config_data, dict)):
+        config_data = None
+    _check_config_keys(config_data)
+    # 保持键的顺序: 检查结果和标题匹配的顺序都取决于配置中的章节顺序
+    return _compiled_rule_plan(json.dumps(config_data, ensure_ascii=False, default=str))
+
+
+# (是否为 str, sha256(配置文本)) -> (config_data, plan); 只保存解析结果, 不保存 (可能很大的) 上传文本本身
+_PARSED_CONFIG_TEXTS = OrderedDict()
+_PARSED_CONFIG_TEXTS_MAX = 64
+_parsed_config_texts_lock = threading.Lock()
+
+
+def _parse_config_text(text):
+    config_data = None
+    if (text.lstrip()[:1] in ("{", b"{")):
+        try: # JSON 是 YAML 的子集, 结果相同, 但不必导入 yaml
+            config_data = json.loads(text)
+        except ValueError:
+            pass
+    if config_data is None:
+        import yaml
+        config_data = yaml.safe_load(text)
+    if not isinstance(config_data, dict):
+        raise ConfigError("配置内容不是有效的YAML字典。")
+    return config_data, get_rule_plan(config_data)
+
+
+def compile_config_text(text):
+    """解析 YAML (或 JSON) 配置文本 (str 或 bytes) 并编译规则计划, 返回 (config_data, plan)。
+
+    以文本的 sha256 为缓存键, 同一份文本只解析、校验一次; 网页文本框默认填入的就是默认配置,
+    绝大多数请求都会命中缓存。返回的 config_data 是副本, 可以自由修改。
+    YAML 语法错误抛出 yaml.YAMLError, 内容无效抛出 ConfigError。
+    """
+    import hashlib
+    is_str = isinstance(text, str)
+    key = (is_str, hashlib.sha256(text.encode("utf-8", "surrogatepass") if is_str else text).digest())
+    with _parsed_config_texts_lock:
+        parsed = _PARSED_CONFIG_TEXTS.get(key)
+        if parsed is not None:
+            _PARSED_CONFIG_TEXTS.move_to_end(key)
+    if parsed is None:
+        parsed = _parse_config_text(text)
+        with _parsed_config_texts_lock:
+            _PARSED_CONFIG_TEXTS[key] = parsed
+            while len(_PARSED_CONFIG_TEXTS) > _PARSED_CONFIG_TEXTS_MAX:
+                _PARSED_CONFIG_TEXTS.popitem(last=False)
+    config_data, plan = parsed
+    return copy.deepcopy(config_data), plan
+
+
+# WordprocessingML 中与段落文本相关的元素 (与 python-docx 的 Paragraph.text 取值规则一致)
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_BODY = _W_NS + "body"
+_W_P = _W_NS + "p"
+_W_R = _W_NS + "r"
+_W_HYPERLINK = _W_NS + "hyperlink"
+_W_BR = _W_NS + "br"
+_W_BR_TYPE = _W_NS + "type"
+_W_RUN_TEXT = {
+    _W_NS + "t": None,  # 取元素文本
+    _W_NS + "tab": "\t",
+    _W_NS + "ptab": "\t",
+    _W_NS + "cr": "\n",
+    _W_NS + "noBreakHyphen": "-",
+}
+_OFFICE_DOCUMENT_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+_PACKAGE_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _docx_main_part_name(archive):
+    """从 _rels/.rels 中找出主文档部件 (通常是 word/document.xml)。"""
+    from xml.etree import ElementTree
+    try:
+        rels = ElementTree.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in rels.iter(_PACKAGE_RELS_NS + "Relationship"):
+        if rel.get("Type") == _OFFICE_DOCUMENT_REL_TYPE and rel.get("TargetMode") != "External":
+            return rel.get("Target", "").lstrip("/")
+    return "word/document.xml"
+
+
+def _docx_run_text(run):
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == _W_BR:
+            # 仅文本换行 (默认类型) 对应 "\n", 分页/分栏符不产生文本
+            if child.get(_W_BR_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag in _W_RUN_TEXT:
+            parts.append(_W_RUN_TEXT[tag] or child.text or "")
+    return "".join(parts)
+
+
+def _docx_paragraph_text(paragraph):
+    parts = []
+    for child in paragraph:
+        if child.tag == _W_R:
+            parts.append(_docx_run_text(child))
+        elif child.tag == _W_HYPERLINK:
+            parts.extend(_docx_run_text(run) for run in child if run.tag == _W_R)
+    return "".join(parts)
+
+
+def iter_docx_paragraphs(source):
+    """流式读取 .docx 正文段落文本, 不构建 python-docx 对象模型。
+
+    直接从压缩包中增量解析主文档 XML, 每读完一个正文 (w:body 的直接子元素) 段落就产出
+    其文本并释放已解析的元素, 内存占用与单个段落大小相当。产出的文本 (包括空段落)
+    与 python-docx 的 [p.text for p in Document(source).paragraphs] 一致。
+    """
+    import zipfile
+    from xml.etree import ElementTree
+    with zipfile.ZipFile(source) as archive:
+        with archive.open(_docx_main_part_name(archive)) as xml_stream:
+            depth = 0
+            body = None
+            for event, elem in ElementTree.iterparse(xml_stream, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and elem.tag == _W_BODY:
+                        body = elem
+                    continue
+                depth -= 1
+                if depth == 2 and body is not None:  # w:body 的直接子元素解析完毕
+                    if elem.tag == _W_P:
+                        yield _docx_paragraph_text(elem)
+                    body.clear()
+
+
+def read_docx_paragraphs_python_docx(source):
+    """通过 python-docx 读取正文段落文本 (流式读取失败时的后备方案)。"""
+    from docx import Document
+    return [p.text for p in Document(source).paragraphs]
+
+
+class ParagraphCache:
+    """段落内容 -> (三种模式的字数, 标题识别结果) 的 LRU 缓存, 供同一文档的多个修订版本复用。
+
+    标题识别结果取决于标题识别器, 因此一个缓存只对应一个识别器 (即一份配置)。
+    """
+
+    def __init__(self, heading_matcher, max_entries=200000):
+        self.heading_matcher = heading_matcher
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def classify(self, paragraphs):
+        """返回 (各段字数 CharCounts 列表, 各段标题对应的章节名列表 (非标题为 None))。
+
+        只有缓存中没有的段落才会计数和匹配标题。
+        """
+        entries = self._entries
+        match_heading = self.heading_matcher.match
+        counts, headings = [], []
+        hits = 0
+        for text in paragraphs:
+            entry = entries.get(text)
+            if entry is None:
+                entry = entries[text] = (count_chars_all_modes(text), match_heading(text))
+            else:
+                entries.move_to_end(text)
+                hits += 1
+            counts.append(entry[0])
+            headings.append(entry[1])
+        self.hits += hits
+        self.misses += len(paragraphs) - hits
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return counts, headings
+
+
+def build_sections(potential_headings, paragraph_total):
+    """由按出现顺序排列的标题 ({"name", "index", "text"}) 划分章节段落区间。
+
+    每个章节的内容为标题之后到下一个标题之前的段落; 同名章节重复出现时后者覆盖前者。
+    没有识别到任何标题时, 整个文档作为 "全文内容"。
+    """
+    extracted_data = {}
+    if not potential_headings and paragraph_total: # No standard headings found
+        logger.warning("未能识别任何标准章节标题。将整个文档视为'全文内容'。")
+        extracted_data["全文内容"] = {
+            "start_index": 0, "title_text": "全文内容 (未识别明确章节)",
+            "content_start": 0, "content_end": paragraph_total
+        }
+        return extracted_data
+
+    for i, current_heading in enumerate(potential_headings):
+        section_name = current_heading["name"]
+        title_paragraph_text = current_heading["text"] # The text of the heading itself
+        # Content starts AFTER the heading (摘要等章节的标题同样不计入内容)
+        content_start_index = current_heading["index"] + 1
+        if i + 1 < len(potential_headings):
+            content_end_index = potential_headings[i + 1]["index"]
+        else: # Last heading
+            content_end_index = paragraph_total
+
+        # If a section is re-identified (e.g. '摘要' after '说明书摘要'), we might overwrite.
+        # COMMON_SECTIONS_PATTERNS order and specificity is key.
+        if section_name in extracted_data:
+            logger.warning("章节 '%s' (标题: '%s') 被多次识别或其模式与之前匹配的章节冲突。后匹配的将覆盖。",
+                           section_name, title_paragraph_text)
+        extracted_data[section_name] = {
+            "start_index": current_heading["index"],
+            "title_text": title_paragraph_text,
+            "content_start": content_start_index,
+            "content_end": content_end_index
+        }
+    return extracted_data
+
+
+# 权利要求书中以编号开头的段落 ("1." "2．" "3、" 等) 开始一项新的权利要求; 编号后紧跟数字的
+# ("1.5 mm ...") 是小数, 不算
+CLAIMS_SECTION = "权利要求书"
+_CLAIM_NUMBER_RE = re.compile(r"\s*(\d{1,3})\s*[\.．、](?!\d)")
+
+
+def match_claim_number(text):
+    """段落以权利要求编号开头时返回该编号, 否则返回 None。
+
+    编号是否开始一项新的权利要求还要看顺序: 权利要求书中编号从 1 起逐项加 1, 只有等于
+    上一项加 1 的编号才算 (避免 "2020．" 这类以年份或其他数字开头的段落被当成新的一项)。
+    """
+    m = _CLAIM_NUMBER_RE.match(text)
+    return int(m.group(1)) if m else None
+
+
+def build_claims(claim_starts, content_start, content_end, paragraph_index, count_mode="chinese"):
+    """由各项权利要求的 (编号, 起始段落) 计算 "各权利要求": 编号、字数、起始段落三个等长数组。
+
+    每项权利要求从编号段落起, 到下一项的编号段落 (或章节末尾) 为止; 第一个编号段落之前的
+    内容不属于任何一项。字数由段落前缀和相减得到, 不再遍历正文。
+    """
+    starts = [(number, index) for number, index in claim_starts if content_start <= index < content_end]
+    numbers, counts, first_paragraphs = [], [], []
+    for k, (number, start) in enumerate(starts):
+        end = starts[k + 1][1] if k + 1 < len(starts) else content_end
+        numbers.append(number)
+        counts.append(paragraph_index.range_count(start, end, count_mode))
+        first_paragraphs.append(start)
+    return {"编号": numbers, "字数": counts, "起始段落": first_paragraphs}
+
+
+@contextmanager
+def _open_binary(source):
+    """以可 seek 的二进制文件对象提供文档内容 (路径、字节串或文件对象)。"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    elif not hasattr(source, "read"):
+        with open(source, "rb") as f:
+            yield f
+    elif getattr(source, "seekable", lambda: False)():
+        source.seek(0)
+        yield source
+    else:
+        yield io.BytesIO(source.read())
+
+
 class PatentAnalyzer:
-    def __init__(self, file_path, config_data=None, count_mode="chinese"): # config_data is now a dict
-        self.file_path = Path(file_path)
+    def __init__(self, file_path, config_data=None, count_mode="chinese", filename=None, paragraph_cache=None,
+                 paragraphs=None): # config_data is now a dict
+        """file_path 可以是文件路径, 也可以是内存中的文档内容 (bytes / bytearray / memoryview
+        或二进制文件对象); 后者需通过 filename (或文件对象的 name 属性) 提供文件名以判断类型。
+        file_path 为路径时也可给出 filename (例如上传文件落盘后的临时文件), 结果中的文件名和
+        文件类型以 filename 为准。
+        paragraph_cache (ParagraphCache) 用于在修订版本之间复用未改动段落的计数和标题识别结果。
+        给出 paragraphs 时不再读取文件, file_path 只用作结果中的文件名 (见 from_paragraphs)。"""
+        self.source = None # 内存中的文档内容, 为 None 时从 file_path 读取
+        if paragraphs is not None:
+            self.file_path = Path(filename or file_path)
+        elif isinstance(file_path, (bytes, bytearray, memoryview)) or hasattr(file_path, "read"):
+            self.source = file_path
+            filename = filename or getattr(file_path, "name", None)
+            if not isinstance(filename, (str, os.PathLike)):
+                raise ValueError("从内存内容分析时必须提供文件名 (用于判断文件类型)。")
+            self.file_path = Path(filename)
+        else:
+            self.file_path = Path(filename or file_path)
+            if filename is not None:
+                self.source = Path(file_path)
         self.count_mode = count_mode
-        self.config = DEFAULT_REQUIREMENTS.copy() # Start with defaults
+        self.rule_plan = get_rule_plan(config_data)
+        self.config = self.rule_plan.config # 与同一配置的其他分析共享, 只读
         self.paragraphs = []
         self.full_text_content = ""
+        self.paragraph_index = None
+        self.paragraph_headings = None
+        self.paragraph_cache = paragraph_cache
+        self.timings = stage_timings() # 各阶段耗时 (秒), 指标关闭时为 None
 
-        logger.info(f"PatentAnalyzer init: file_path='{self.file_path}', count_mode='{self.count_mode}'")
+        logger.debug("PatentAnalyzer init: file_path='%s', count_mode='%s', in_memory=%s, custom_config=%s",
+                     self.file_path, self.count_mode, not isinstance(self.source, (Path, type(None))),
+                     bool(config_data))
 
-        if not self.file_path.exists():
-            logger.error(f"文件不存在: {self.file_path}")
-            raise FileNotFoundError(f"文件不存在: {self.file_path}")
+        read_path = self.file_path if self.source is None else self.source
+        if paragraphs is None and isinstance(read_path, Path) and not read_path.exists():
+            logger.error("文件不存在: %s", read_path)
+            raise FileNotFoundError(f"文件不存在: {read_path}")
 
-        if config_data and isinstance(config_data, dict):
-            # Merge user config with default, user config takes precedence for shared keys
-            for key, value in config_data.items():
-                if key in self.config and isinstance(self.config[key], dict) and isinstance(value, dict):
-                    self.config[key].update(value)
-                else:
-                    self.config[key] = value
-            logger.info(f"已加载并合并用户提供的配置数据。")
+        self.heading_matcher = self.rule_plan.heading_matcher
+        # 按模式比较而不是按对象: 编译缓存淘汰后同一配置会得到新的识别器对象
+        if paragraph_cache is not None and paragraph_cache.heading_matcher.key != self.heading_matcher.key:
+            raise ValueError("段落缓存与当前配置的章节标题识别器不一致。")
+
+        if paragraphs is not None:
+            self.paragraphs = paragraphs if isinstance(paragraphs, list) else list(paragraphs)
+            self.full_text_content = "\n".join(self.paragraphs)
         else:
-            logger.info("未提供有效配置数据或非字典格式，将使用默认字数要求配置。")
+            with timed_stage(self.timings, "load"):
+                self._load_content()
 
+    @classmethod
+    def from_paragraphs(cls, paragraphs, filename, config_data=None, count_mode="chinese", paragraph_headings=None):
+        """由已读取的段落文本 (不含空段落) 构造分析器, 例如合订文件拆分出的单件申请。
 
-        self._load_content()
+        paragraph_headings 为各段的标题识别结果 (与 paragraphs 等长, 须由同一配置得到),
+        给出时不再重复匹配标题。
+        """
+        analyzer = cls(filename, config_data=config_data, count_mode=count_mode, paragraphs=paragraphs)
+        if paragraph_headings is not None:
+            if len(paragraph_headings) != len(analyzer.paragraphs):
+                raise ValueError("paragraph_headings 与 paragraphs 的长度不一致。")
+            analyzer.paragraph_headings = list(paragraph_headings)
+        return analyzer
 
-    def _load_content(self):
-        logger.info(f"开始加载内容，文件路径: {self.file_path}")
-        logger.info(f"文件是否存在: {self.file_path.exists()}")
-        logger.info(f"文件名: {self.file_path.name}")
-        logger.info(f"文件后缀 (来自 Path.suffix): '{self.file_path.suffix}'")
+    def _open_source(self):
+        return _open_binary(self.file_path if self.source is None else self.source)
 
+    def _load_content(self):
         ext = self.file_path.suffix.lower()
-        logger.info(f"小写后缀用于判断: '{ext}'")
+        logger.debug("开始加载内容: %s (后缀 '%s')", self.file_path, ext)
 
         try:
             if ext == ".docx":
-                doc = Document(self.file_path)
-                self.paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
+                import zipfile
+                from xml.etree import ElementTree
+                try:
+                    with self._open_source() as f:
+                        self.paragraphs = [text for text in iter_docx_paragraphs(f) if text.strip()]
+                except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+                    logger.warning("流式读取 DOCX 失败 (%s)，改用 python-docx 解析: %s", e, self.file_path)
+                    with self._open_source() as f:
+                        self.paragraphs = [text for text in read_docx_paragraphs_python_docx(f) if text.strip()]
             elif ext == ".txt":
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    self.paragraphs = [line.strip() for line in f if line.strip()]
+                with self._open_source() as binary:
+                    f = io.TextIOWrapper(binary, encoding='utf-8')
+                    try:
+                        self.paragraphs = [line.strip() for line in f if line.strip()]
+                    finally:
+                        f.detach() # 不关闭调用方传入的文件对象
             else:
-                logger.error(f"不支持的文件类型检测到: '{ext}' (原始文件名: {self.file_path.name})")
+                logger.error("不支持的文件类型检测到: '%s' (原始文件名: %s)", ext, self.file_path.name)
                 raise ValueError(f"不支持的文件类型: '{ext}'. 请提供 .txt 或 .docx 文件。")
             self.full_text_content = "\n".join(self.paragraphs)
-            logger.info(f"已加载文档: {self.file_path} (共 {len(self.paragraphs)} 段)")
+            logger.debug("已加载文档: %s (共 %d 段)", self.file_path, len(self.paragraphs))
         except Exception as e:
-            logger.error(f"加载文档 '{self.file_path}' 时失败: {e}", exc_info=True)
+            logger.error("加载文档 '%s' 时失败: %s", self.file_path, e, exc_info=True)
             raise
 
     def count_chars(self, text):
         if not text:
             return 0
-        mode = self.count_mode
-        if mode == "chinese":
-            count = 0
-            for char in text:
-                if ('\u4e00' <= char <= '\u9fff' or
-                    '\u3400' <= char <= '\u4dbf' or
-                    '\U00020000' <= char <= '\U0002a6df'):
-                    count += 1
-            return count
-        elif mode == "word":
-            chinese_count = sum(1 for char in text if '\u4e00' <= char <= '\u9fff' or
-                               '\u3400' <= char <= '\u4dbf')
-            words = re.findall(r'[a-zA-Z]+', text)
-            english_words_count = len(words)
-            numbers = re.findall(r'[0-9]+', text)
-            numbers_count = len(numbers)
-            punctuation_count = sum(1 for char in text if unicodedata.category(char).startswith('P'))
-            return chinese_count + english_words_count + numbers_count + punctuation_count
-        else:  # "all"
-            return sum(1 for char in text if not char.isspace())
-
-    def _is_section_heading(self, text, section_patterns):
-        if not text: return False
-        for pattern in section_patterns:
-            if re.fullmatch(pattern, text.strip(), re.IGNORECASE):
-                return True
-        return False
+        return getattr(count_chars_all_modes(text), resolve_count_mode(self.count_mode))
+
+    def _classify_paragraphs(self):
+        """计算 (或从段落缓存取得) 每段的字数和标题识别结果。"""
+        if self.paragraph_cache is not None:
+            counts, self.paragraph_headings = self.paragraph_cache.classify(self.paragraphs)
+            self.paragraph_index = ParagraphCountIndex(counts)
+        else:
+            match_heading = self.heading_matcher.match
+            self.paragraph_headings = [match_heading(p) for p in self.paragraphs]
 
     def extract_sections(self):
-        extracted_data = {}
         potential_headings = []
-         # Prioritize main sections for matching
-        main_section_keys = ["权利要求书", "说明书摘要", "说明书"]
-        other_section_keys = [key for key in COMMON_SECTIONS_PATTERNS.keys() if key not in main_section_keys]
-        ordered_section_keys = main_section_keys + other_section_keys
-
-
-        for i, para_text in enumerate(self.paragraphs):
-            for sec_key in ordered_section_keys: # Use the defined order for matching
-                patterns = COMMON_SECTIONS_PATTERNS.get(sec_key, [])
-                if self._is_section_heading(para_text, patterns):
-                    # Avoid re-adding if a more general pattern (like '摘要' for '说明书摘要') matched first
-                    # This needs careful ordering of COMMON_SECTIONS_PATTERNS or more complex logic
-                    # For now, assume first match is good enough for a given paragraph
-                    potential_headings.append({"name": sec_key, "index": i, "text": para_text})
-                    break # A paragraph is only one heading type
-        potential_headings.sort(key=lambda x: x["index"]) # Sort by appearance in doc
-
-        if not potential_headings and self.paragraphs: # No standard headings found
-            logger.warning("未能识别任何标准章节标题。将整个文档视为'全文内容'。")
-            extracted_data["全文内容"] = {
-                "content_paragraphs": self.paragraphs, "start_index": 0, "title_text": "全文内容 (未识别明确章节)"
-            }
-            return extracted_data
-
-        for i in range(len(potential_headings)):
-            current_heading = potential_headings[i]
-            section_name = current_heading["name"]
-            title_paragraph_text = current_heading["text"] # The text of the heading itself
-
-            # Content starts AFTER the heading, unless it's a section where the heading IS the content (e.g. an abstract title)
-            content_start_index = current_heading["index"] + 1
-            # For sections like "摘要" or "说明书摘要", the heading itself might be the only line OR content starts immediately
-            if section_name in ["说明书摘要", "摘要"]: # These sections' content usually starts on the same line or immediately after.
-                 # If the title is the only thing, content_paragraphs will be empty from slicing, which is fine.
-                 # If content follows title, it's covered.
-                 # The current logic for content_paragraphs means it will take from next line.
-                 # We might need to adjust if the title line ITSELF should be part of the content_paragraphs for these.
-                 # For now, let's assume title is separate and content follows.
-                 pass
-
-
-            if i + 1 < len(potential_headings):
-                next_heading_start_index = potential_headings[i+1]["index"]
-                section_paras = self.paragraphs[content_start_index:next_heading_start_index]
-            else: # Last heading
-                section_paras = self.paragraphs[content_start_index:]
-
-            # If a section is re-identified (e.g. '摘要' after '说明书摘要'), we might overwrite.
-            # COMMON_SECTIONS_PATTERNS order and specificity is key.
-            if section_name in extracted_data:
-                logger.warning(f"章节 '{section_name}' (标题: '{title_paragraph_text}') 被多次识别或其模式与之前匹配的章节冲突。后匹配的将覆盖。")
-            extracted_data[section_name] = {
-                "content_paragraphs": section_paras,
-                "start_index": current_heading["index"],
-                "title_text": title_paragraph_text
-            }
+        if self.paragraph_headings is None:
+            self._classify_paragraphs()
+        for i, section_name in enumerate(self.paragraph_headings): # A paragraph is only one heading type
+            if section_name is not None:
+                potential_headings.append({"name": section_name, "index": i, "text": self.paragraphs[i]})
+        extracted_data = build_sections(potential_headings, len(self.paragraphs))
+        for data in extracted_data.values():
+            data["content_paragraphs"] = self.paragraphs[data["content_start"]:data["content_end"]]
         return extracted_data
 
+    def find_claim_starts(self, start, end):
+        """段落区间 [start, end) 中各项权利要求的 (编号, 起始段落)。"""
+        claim_starts = []
+        for index in range(start, end):
+            number = match_claim_number(self.paragraphs[index])
+            if number == len(claim_starts) + 1:
+                claim_starts.append((number, index))
+        return claim_starts
+
+    def get_paragraph_index(self):
+        if self.paragraph_index is None and self.paragraph_cache is not None:
+            self._classify_paragraphs()
+        if self.paragraph_index is None:
+            self.paragraph_index = ParagraphCountIndex.from_paragraphs(self.paragraphs)
+        return self.paragraph_index
+
     def analyze(self):
-        logger.info(f"开始分析文档 '{self.file_path.name}'")
+        logger.debug("开始分析文档 '%s'", self.file_path.name)
+        timings = self.timings
+        with timed_stage(timings, "count"):
+            paragraph_index = self.get_paragraph_index()
         analysis_result = {
             "文件名": self.file_path.name,
             "统计模式": self.count_mode,
-            "总字数": self.count_chars(self.full_text_content),
+            "总字数": paragraph_index.total(self.count_mode),
             "各部分": {},
-            "检查结果": []
+            "检查结果": [],
         }
-        extracted_sections_data = self.extract_sections()
+        paragraph_counts = paragraph_index.counts(self.count_mode)
+        if paragraph_counts is not None: # 流式分析默认不保留逐段字数
+            analysis_result["段落字数"] = paragraph_counts
+        with timed_stage(timings, "extract"):
+            extracted_sections_data = self.extract_sections()
         actual_counts = {"总字数": analysis_result["总字数"]}
 
-        for section_name, data in extracted_sections_data.items():
-            content_text = "\n".join(data["content_paragraphs"])
-            char_count = self.count_chars(content_text)
-            analysis_result["各部分"][section_name] = {
-                "字数": char_count,
-                "原始内容标题": data.get("title_text", section_name),
-            }
-            actual_counts[section_name] = char_count
-            logger.debug(f"章节 '{section_name}' (标题: '{data.get('title_text', '')}'): 字数 {char_count}")
-
-
-        # Aggregation for "说明书"
-        if "说明书" in self.config and "sub_sections" in self.config["说明书"]:
-            sub_sections_total_chars = 0
-            found_sub_sections = []
-            logger.debug(f"说明书聚合检查: 配置子章节 {self.config['说明书']['sub_sections']}")
-            for sub_sec_name in self.config["说明书"]["sub_sections"]:
-                if sub_sec_name in actual_counts:
-                    sub_sections_total_chars += actual_counts[sub_sec_name]
-                    found_sub_sections.append(sub_sec_name)
-                    logger.debug(f"聚合: 添加子章节 '{sub_sec_name}' 字数 {actual_counts[sub_sec_name]}")
-                else:
-                    logger.debug(f"聚合: 未找到子章节 '{sub_sec_name}' 的字数")
+        with timed_stage(timings, "count"):
+            for section_name, data in extracted_sections_data.items():
+                content_range = [data["content_start"], data["content_end"]]
+                char_count = paragraph_index.range_count(content_range[0], content_range[1], self.count_mode)
+                analysis_result["各部分"][section_name] = {
+                    "字数": char_count,
+                    "原始内容标题": data.get("title_text", section_name),
+                    "段落范围": content_range,
+                }
+                actual_counts[section_name] = char_count
+            claims_data = extracted_sections_data.get(CLAIMS_SECTION)
+            if claims_data is not None:
+                start, end = claims_data["content_start"], claims_data["content_end"]
+                claims = build_claims(self.find_claim_starts(start, end), start, end, paragraph_index, self.count_mode)
+                if claims["编号"]:
+                    analysis_result["各权利要求"] = claims
 
+        with timed_stage(timings, "check"):
+            self._aggregate_description(analysis_result, actual_counts)
+            # Check requirements (规则已在 RulePlan 中编译好)
+            analysis_result["检查结果"] = self.rule_plan.check_items(actual_counts)
 
-            if found_sub_sections: # Only update if sub-sections were actually found and summed
-                actual_counts["说明书"] = sub_sections_total_chars # For checking requirements
-                if "说明书" not in analysis_result["各部分"]: # If "说明书" itself wasn't a heading
-                     analysis_result["各部分"]["说明书"] = {"字数": 0, "原始内容标题": "说明书 (聚合)", "包含子部分": []}
+        if timings is not None:
+            analysis_result["阶段耗时"] = dict(timings)
+        logger.debug("分析完成: '%s'", self.file_path.name)
+        return analysis_result
 
-                analysis_result["各部分"]["说明书"]["字数"] = sub_sections_total_chars
-                analysis_result["各部分"]["说明书"]["聚合字数"] = True
-                analysis_result["各部分"]["说明书"]["包含子部分"] = found_sub_sections
-                logger.info(f"说明书聚合计算完成: 总字数 {sub_sections_total_chars}, 包含 {found_sub_sections}")
-            elif "说明书" not in actual_counts : # If "说明书" is in config but no subsections found AND no main "说明书" heading found
-                logger.warning("配置了说明书聚合，但未找到任何定义的子章节，且未直接识别'说明书'章节。")
+    def _aggregate_description(self, analysis_result, actual_counts):
+        """按配置的 sub_sections 聚合 "说明书" 字数 (只有 "说明书" 支持聚合)。"""
+        aggregate_parts = self.rule_plan.aggregate_parts
+        if aggregate_parts is None:
+            return
+        found_sub_sections = [name for name in aggregate_parts if name in actual_counts]
 
+        if found_sub_sections: # Only update if sub-sections were actually found and summed
+            sub_sections_total_chars = sum(actual_counts[name] for name in found_sub_sections)
+            actual_counts["说明书"] = sub_sections_total_chars # For checking requirements
+            if "说明书" not in analysis_result["各部分"]: # If "说明书" itself wasn't a heading
+                 analysis_result["各部分"]["说明书"] = {"字数": 0, "原始内容标题": "说明书 (聚合)", "包含子部分": []}
 
-        # Check requirements
-        logger.debug(f"开始检查要求，当前配置: {self.config}")
-        for name, req in self.config.items():
-            check_item = {"name": name, "actual": "N/A", "expected_str": "", "status_bool": None, "status_str": "", "message": ""}
+            analysis_result["各部分"]["说明书"]["字数"] = sub_sections_total_chars
+            analysis_result["各部分"]["说明书"]["聚合字数"] = True
+            analysis_result["各部分"]["说明书"]["包含子部分"] = found_sub_sections
+            logger.debug("说明书聚合计算完成: 总字数 %d, 包含 %s", sub_sections_total_chars, found_sub_sections)
+        elif "说明书" not in actual_counts : # If "说明书" is in config but no subsections found AND no main "说明书" heading found
+            logger.warning("配置了说明书聚合，但未找到任何定义的子章节，且未直接识别'说明书'章节。")
 
-            is_aggregated_section = name == "说明书" and analysis_result["各部分"].get(name, {}).get("聚合字数")
+# 流式分析每次解码的字符数, 以及单行 (段落) 在内存中最多保留的字符数
+STREAM_CHUNK_CHARS = 1 << 20
+STREAM_LINE_LIMIT = 1 << 16
+# create_analyzer() 对超过该字节数的 .txt 文档使用流式分析
+STREAMING_THRESHOLD = int(os.environ.get("PATENT_STREAMING_THRESHOLD", 32 * 1024 * 1024))
 
-            if name not in actual_counts and "ratio" not in req and not is_aggregated_section :
-                 # If it's "说明书" and it's supposed to be aggregated but wasn't, it means sub-sections weren't found.
-                if name == "说明书" and "sub_sections" in req:
-                    check_item["status_str"] = "未识别子章节"
-                    check_item["message"] = f"{name}: 未能识别或聚合其子章节。"
-                else:
-                    check_item["status_str"] = "未识别"
-                    check_item["message"] = f"{name}: 未在文档中识别到该部分。"
-                check_item["expected_str"] = str(req)
-                analysis_result["检查结果"].append(check_item)
-                logger.debug(f"检查项 '{name}': {check_item['status_str']}")
-                continue
 
-            current_actual_chars = actual_counts.get(name, 0 if not is_aggregated_section else actual_counts.get(name,0) ) # Default to 0 if not found
-
-            # Ratio check
-            if "ratio" in req:
-                target_section_name_for_ratio = name # e.g., "具体实施方式"
-                ref_section_name_for_ratio = req["reference"] # e.g., "权利要求书"
-                check_item["name"] = f"{target_section_name_for_ratio}/{ref_section_name_for_ratio} 比例"
-
-                chars_target = actual_counts.get(target_section_name_for_ratio)
-                chars_ref = actual_counts.get(ref_section_name_for_ratio)
-
-                if chars_target is not None and chars_ref is not None and chars_ref > 0:
-                    ratio_val = chars_target / chars_ref
-                    target_ratio_val, tolerance_val = req["ratio"], req.get("tolerance", 0.1)
-                    min_r_val, max_r_val = target_ratio_val * (1 - tolerance_val), target_ratio_val * (1 + tolerance_val)
-                    check_item["status_bool"] = min_r_val <= ratio_val <= max_r_val
-                    check_item["actual"] = f"{ratio_val:.2f}"
-                    check_item["expected_str"] = f"{target_ratio_val:.2f} (±{tolerance_val*100:.0f}%, 即 {min_r_val:.2f}-{max_r_val:.2f})"
-                    check_item["message"] = f"{check_item['name']}: {check_item['actual']} (目标: {check_item['expected_str']})"
-                    # Check for additional min char count for the target section of ratio
-                    if req.get("min") and chars_target < req.get("min"):
-                        check_item["status_bool"] = False # Override status if min not met
-                        check_item["message"] += f"；且 '{target_section_name_for_ratio}' 字数 {chars_target} 未达到最小要求 {req['min']}"
-                elif chars_target is None:
-                    check_item["status_str"] = "未识别目标章节"
-                    check_item["message"] = f"进行比例计算时未识别到章节 '{target_section_name_for_ratio}'"
-                else: # chars_ref is None or 0
-                    check_item["status_str"] = "未识别参考章节或其字数为0"
-                    check_item["message"] = f"进行比例计算时未识别到参考章节 '{ref_section_name_for_ratio}' 或其字数为0"
-                analysis_result["检查结果"].append(check_item)
-                logger.debug(f"检查项 '{check_item['name']}': {check_item['status_bool'] if check_item['status_bool'] is not None else check_item['status_str']}")
+def _word_edge(char):
+    """字符在 word 模式下的连续串类别 ("L" 字母 / "D" 数字), 其余为 None。"""
+    if "a" <= char <= "z" or "A" <= char <= "Z":
+        return "L"
+    if "0" <= char <= "9":
+        return "D"
+    return None
+
+
+class BoundaryCountIndex:
+    """只记录章节边界处前缀和的字数索引 (接口同 ParagraphCountIndex)。
+
+    流式分析不保留每个段落, 只在每个标题段落的前后记下三种模式的累计字数,
+    章节区间的字数同样由两个前缀和相减得到。paragraph_counts 为当前统计模式下
+    的逐段字数 (array), 未保留时 counts() 返回 None。
+    """
+
+    def __init__(self, boundaries, paragraph_total, paragraph_counts=None):
+        self._boundaries = boundaries # 段落序号 -> 该段之前的累计 CharCounts
+        self.paragraph_total = paragraph_total
+        self.paragraph_counts = paragraph_counts
+
+    def __len__(self):
+        return self.paragraph_total
+
+    def range_count(self, start, end, count_mode="chinese"):
+        mode = resolve_count_mode(count_mode)
+        return getattr(self._boundaries[end], mode) - getattr(self._boundaries[start], mode)
+
+    def total(self, count_mode="chinese"):
+        return getattr(self._boundaries[self.paragraph_total], resolve_count_mode(count_mode))
+
+    def counts(self, count_mode="chinese"):
+        return None if self.paragraph_counts is None else self.paragraph_counts.tolist()
+
+
+class StreamingTextAnalyzer(PatentAnalyzer):
+    """大体积 .txt 文档的流式分析: 分块增量解码 UTF-8, 边读边识别标题、累计字数,
+    内存占用与文件大小无关 (只取决于分块大小和标题数量)。
+
+    分析结果与 PatentAnalyzer 相同, 只是默认不含逐段的 "段落字数" (其长度随段落数增长);
+    keep_paragraph_counts=True 时以紧凑数组保留当前统计模式下的逐段字数。
+    分段规则与 PatentAnalyzer 一致 (按换行分段, 去掉首尾空白后为空的行不算段落)。
+    单行超过 STREAM_LINE_LIMIT 个字符时分块计数, 这样的行不再作为标题或权利要求编号的候选。
+    """
+
+    def __init__(self, file_path, config_data=None, count_mode="chinese", filename=None,
+                 keep_paragraph_counts=False, chunk_chars=STREAM_CHUNK_CHARS):
+        self.keep_paragraph_counts = keep_paragraph_counts
+        self.chunk_chars = chunk_chars
+        self.headings = []
+        self.claim_starts = [] # 各项权利要求的 (编号, 起始段落), 扫描时随标题一起记录
+        super().__init__(file_path, config_data=config_data, count_mode=count_mode, filename=filename)
+
+    def _load_content(self):
+        ext = self.file_path.suffix.lower()
+        if ext != ".txt":
+            logger.error("流式分析只支持 .txt 文件: '%s' (原始文件名: %s)", ext, self.file_path.name)
+            raise ValueError(f"流式分析只支持 .txt 文件, 不支持: '{ext}'。")
+        logger.debug("开始流式读取: %s", self.file_path)
+        try:
+            with self._open_source() as binary:
+                f = io.TextIOWrapper(binary, encoding='utf-8')
+                try:
+                    self._scan(f)
+                finally:
+                    f.detach() # 不关闭调用方传入的文件对象
+        except Exception as e:
+            logger.error("流式读取文档 '%s' 时失败: %s", self.file_path, e, exc_info=True)
+            raise
+        logger.debug("已流式读取文档: %s (共 %d 段, %d 个标题)", self.file_path,
+                     len(self.paragraph_index), len(self.headings))
+
+    def _scan(self, f):
+        # 字数累计用三元列表, 边界处存成 CharCounts
+        self._totals = [0, 0, 0]
+        self._boundaries = {0: _ZERO_COUNTS}
+        self._paragraph_total = 0
+        self._paragraph_counts = array("q") if self.keep_paragraph_counts else None
+        self._mode_field = COUNT_MODES.index(resolve_count_mode(self.count_mode))
+        self._long_line = None # 超长行的累计状态: [三种字数, 末字符类别, 是否有内容]
+        self._in_claims = False # 当前位于权利要求书章节内
+        self._next_claim = 1 # 权利要求书中下一项应有的编号
+
+        carry = ""
+        while True:
+            chunk = f.read(self.chunk_chars)
+            if not chunk:
+                break
+            text = carry + chunk if carry else chunk
+            cut = text.rfind("\n")
+            if cut < 0:
+                carry = text
+            else:
+                block, carry = text[:cut], text[cut + 1:]
+                if self._long_line is not None:
+                    first_end = block.find("\n")
+                    if first_end < 0:
+                        self._finish_long_line(block)
+                        block = None
+                    else:
+                        self._finish_long_line(block[:first_end])
+                        block = block[first_end + 1:]
+                if block is not None:
+                    self._scan_block(block)
+            if len(carry) > STREAM_LINE_LIMIT:
+                self._extend_long_line(carry)
+                carry = ""
+        if self._long_line is not None:
+            self._finish_long_line(carry)
+        elif carry:
+            self._scan_block(carry)
+
+        self._mark_boundary()
+        self.paragraph_index = BoundaryCountIndex(self._boundaries, self._paragraph_total, self._paragraph_counts)
+        del self._totals, self._boundaries, self._paragraph_counts, self._long_line, self._in_claims, self._next_claim
+
+    def _add_counts(self, counts):
+        totals = self._totals
+        totals[0] += counts[0]
+        totals[1] += counts[1]
+        totals[2] += counts[2]
+
+    def _mark_boundary(self):
+        self._boundaries[self._paragraph_total] = CharCounts(*self._totals)
+
+    def _add_heading(self, section_name, text, counts):
+        self._mark_boundary()
+        self.headings.append({"name": section_name, "index": self._paragraph_total, "text": text})
+        self._add_paragraph(counts)
+        self._mark_boundary()
+        self._in_claims = section_name == CLAIMS_SECTION
+        self._next_claim = 1
+
+    def _add_paragraph(self, counts):
+        self._add_counts(counts)
+        if self._paragraph_counts is not None:
+            self._paragraph_counts.append(counts[self._mode_field])
+        self._paragraph_total += 1
+
+    def _scan_block(self, block):
+        """处理若干完整的行。相邻标题之间的正文整块计数: 换行与首尾空白在任何模式下都不计数,
+        也会隔开英文单词和数字, 所以整块的字数等于各段字数之和。权利要求书中每项权利要求的
+        编号段落同样是块的边界, 在该处记下前缀和。"""
+        lines = block.split("\n")
+        match_heading = self.heading_matcher.match
+        per_paragraph = self._paragraph_counts is not None
+        body_start = 0
+        paragraphs = 0
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            if not stripped:
+                continue
+            section_name = match_heading(stripped)
+            if section_name is not None:
+                if not per_paragraph:
+                    self._add_counts(count_chars_all_modes("\n".join(lines[body_start:i])))
+                    self._paragraph_total += paragraphs
+                    paragraphs = 0
+                    body_start = i + 1
+                self._add_heading(section_name, stripped, count_chars_all_modes(stripped))
                 continue
+            if self._in_claims and match_claim_number(stripped) == self._next_claim:
+                if not per_paragraph:
+                    self._add_counts(count_chars_all_modes("\n".join(lines[body_start:i])))
+                    self._paragraph_total += paragraphs
+                    paragraphs = 0
+                    body_start = i
+                self._mark_boundary()
+                self.claim_starts.append((self._next_claim, self._paragraph_total))
+                self._next_claim += 1
+            if per_paragraph:
+                self._add_paragraph(count_chars_all_modes(stripped))
+            else:
+                paragraphs += 1
+        if not per_paragraph:
+            self._add_counts(count_chars_all_modes("\n".join(lines[body_start:]) if body_start else block))
+            self._paragraph_total += paragraphs
 
+    def _extend_long_line(self, fragment):
+        """累计超长行的一个片段; 跨片段相连的字母串/数字串只算一个单词。"""
+        counts = list(count_chars_all_modes(fragment))
+        state = self._long_line
+        if state is None:
+            state = self._long_line = [[0, 0, 0], None, False]
+        elif fragment and state[1] is not None and state[1] == _word_edge(fragment[0]):
+            counts[1] -= 1
+        for k in range(3):
+            state[0][k] += counts[k]
+        if fragment:
+            state[1] = _word_edge(fragment[-1])
+            state[2] = state[2] or not fragment.isspace()
+
+    def _finish_long_line(self, fragment):
+        self._extend_long_line(fragment)
+        counts, _, has_content = self._long_line
+        self._long_line = None
+        if has_content:
+            self._add_paragraph(counts)
+
+    def extract_sections(self):
+        return build_sections(self.headings, len(self.paragraph_index))
+
+    def find_claim_starts(self, start, end):
+        return [(number, index) for number, index in self.claim_starts if start <= index < end]
+
+    def get_paragraph_index(self):
+        return self.paragraph_index
+
+
+def create_analyzer(source, config_data=None, count_mode="chinese", filename=None,
+                    streaming_threshold=None):
+    """按文档类型和大小选择分析器: 超过 streaming_threshold 字节的 .txt 文档使用流式分析。
+
+    streaming_threshold 为 None 时使用环境变量 PATENT_STREAMING_THRESHOLD (默认 32MB)。
+    """
+    if streaming_threshold is None:
+        streaming_threshold = STREAMING_THRESHOLD
+    name = filename
+    if name is None:
+        name = getattr(source, "name", None) if hasattr(source, "read") else source
+    if isinstance(name, (str, os.PathLike)) and Path(name).suffix.lower() == ".txt":
+        size = _source_size(source)
+        if size is not None and size > streaming_threshold:
+            return StreamingTextAnalyzer(source, config_data=config_data, count_mode=count_mode, filename=filename)
+    return PatentAnalyzer(source, config_data=config_data, count_mode=count_mode, filename=filename)
+
+
+def _source_size(source):
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if isinstance(source, memoryview):
+        return source.nbytes
+    if hasattr(source, "read"):
+        try:
+            return os.fstat(source.fileno()).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+    try:
+        return os.path.getsize(source)
+    except OSError:
+        return None
+
+
+# 合订文件中的一件申请: 序号 (从 1 开始)、分隔行文本 (按标题拆分时为 None)、段落及各段的标题识别结果
+BundleDocument = namedtuple("BundleDocument", ("index", "label", "paragraphs", "paragraph_headings"))
+
+
+def _iter_source_paragraphs(f, ext, name):
+    """逐段产出 .txt / .docx 文档的非空段落 (分段规则与 PatentAnalyzer 相同)。"""
+    if ext == ".txt":
+        text_stream = io.TextIOWrapper(f, encoding='utf-8')
+        try:
+            for line in text_stream:
+                line = line.strip()
+                if line:
+                    yield line
+        finally:
+            text_stream.detach() # 不关闭调用方传入的文件对象
+    elif ext == ".docx":
+        import zipfile
+        from xml.etree import ElementTree
+        produced = False
+        try:
+            for text in iter_docx_paragraphs(f):
+                if text.strip():
+                    produced = True
+                    yield text
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+            if produced:
+                raise
+            logger.warning("流式读取 DOCX 失败 (%s)，改用 python-docx 解析: %s", e, name)
+            f.seek(0)
+            yield from (text for text in read_docx_paragraphs_python_docx(f) if text.strip())
+    else:
+        raise ValueError(f"不支持的文件类型: '{ext}'. 请提供 .txt 或 .docx 文件。")
+
+
+def iter_bundle_documents(source, filename=None, config_data=None, separator=None):
+    """把多件申请首尾相接的合订文件 (.txt / .docx) 拆分成单件申请, 逐件产出 BundleDocument。
+
+    只顺序读一遍文件, 同一时刻只在内存中保留当前这一件申请的段落。拆分方式:
+    - separator 为 None 时按重复出现的一级标题 (MAIN_SECTION_KEYS) 拆分: 当前申请中已出现过的
+      一级章节再次出现, 即从该标题起视为下一件申请。第一件申请在首个标题之前有 k 段 (如发明名称)
+      时, 重复标题之前的 k 段正文也归入下一件申请。各件申请的格式应一致, 否则请使用分隔行;
+    - 否则 separator 为分隔行的正则, 去掉首尾空白后能 search 到的段落即为分隔行, 它本身不计入
+      任何申请, 其文本作为后一件申请的 label。第一个分隔行之前的内容 (如有) 是第一件申请。
+    没有段落的申请 (如连续两个分隔行之间) 被跳过。
+    """
+    name = filename
+    if name is None:
+        name = getattr(source, "name", None) if hasattr(source, "read") else source
+    if not isinstance(name, (str, os.PathLike)):
+        raise ValueError("从内存内容拆分时必须提供文件名 (用于判断文件类型)。")
+    ext = Path(name).suffix.lower()
+    try:
+        separator_re = re.compile(separator) if separator else None
+    except re.error as e:
+        raise ValueError(f"分隔行正则无法编译: {e}") from e
+    match_heading = get_rule_plan(config_data).heading_matcher.match
+
+    index = 1
+    label = None
+    paragraphs, headings, seen_sections = [], [], set()
+    preamble = None # 第一件申请首个标题之前的段落数
+    last_heading = -1 # 当前申请中最后一个标题段落的位置
+    with _open_binary(source) as f:
+        for text in _iter_source_paragraphs(f, ext, name):
+            if separator_re is not None and separator_re.search(text.strip()):
+                if paragraphs:
+                    yield BundleDocument(index, label, paragraphs, headings)
+                    index += 1
+                paragraphs, headings = [], []
+                label = text.strip()
+                continue
+            section_name = match_heading(text)
+            if separator_re is None and section_name is not None:
+                if preamble is None:
+                    preamble = len(paragraphs)
+                if section_name in MAIN_SECTION_KEYS:
+                    if section_name in seen_sections:
+                        carry = preamble if len(paragraphs) - preamble > last_heading + 1 else 0
+                        split_at = len(paragraphs) - carry
+                        yield BundleDocument(index, label, paragraphs[:split_at], headings[:split_at])
+                        index += 1
+                        paragraphs, headings, seen_sections = paragraphs[split_at:], headings[split_at:], set()
+                    seen_sections.add(section_name)
+                last_heading = len(paragraphs)
+            paragraphs.append(text)
+            headings.append(section_name)
+    if paragraphs:
+        yield BundleDocument(index, label, paragraphs, headings)
 
-            # Absolute count check
-            check_item["actual"] = current_actual_chars
-            min_val_req, max_val_req = req.get("min"), req.get("max")
-            message_suffix = ""
-
-            if min_val_req is not None and max_val_req is not None:
-                check_item["status_bool"] = min_val_req <= current_actual_chars <= max_val_req
-                check_item["expected_str"] = f"{min_val_req}-{max_val_req}字"
-            elif min_val_req is not None:
-                check_item["status_bool"] = current_actual_chars >= min_val_req
-                check_item["expected_str"] = f"至少{min_val_req}字"
-            elif max_val_req is not None:
-                check_item["status_bool"] = current_actual_chars <= max_val_req
-                check_item["expected_str"] = f"不超过{max_val_req}字"
-            else: # No specific min/max requirement for this section in config
-                check_item["status_str"] = "信息" # Mark as informational
-                check_item["expected_str"] = "无特定范围要求"
-                # No status_bool needed as it's just info
-
-            check_item["message"] = f"{name}: {current_actual_chars}字 (要求: {check_item['expected_str']})"
-
-            if check_item["status_bool"] == False: # Check for explicit False
-                if min_val_req is not None and current_actual_chars < min_val_req:
-                    message_suffix = f" (字数不足，差 {min_val_req - current_actual_chars} 字)"
-                elif max_val_req is not None and current_actual_chars > max_val_req:
-                    message_suffix = f" (字数过多，多 {current_actual_chars - max_val_req} 字)"
-            check_item["message"] += message_suffix
-            analysis_result["检查结果"].append(check_item)
-            logger.debug(f"检查项 '{name}': {check_item['status_bool'] if check_item['status_bool'] is not None else check_item['status_str']}")
-
-        logger.info(f"分析完成 for '{self.file_path.name}'")
-        return analysis_result
 
+@lru_cache(maxsize=1)
 def get_default_config_yaml_str():
+    import yaml
     return yaml.dump(DEFAULT_REQUIREMENTS, default_flow_style=False, allow_unicode=True, sort_keys=False)
\ No newline at end of file
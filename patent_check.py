@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""轻量的字数检查命令行, 适合 git pre-commit 钩子等短时调用。
+
+只导入 patent_analyzer_core (不导入 Flask); python-docx / yaml 只在遇到 .docx 文件
+或 YAML 配置时才导入, 未指定配置时直接使用内置默认配置。
+任一文档有检查项不通过时退出码为 1, 文件无法读取或配置无效时为 2。
+
+用法示例:
+    python patent_check.py 申请文件.txt [更多文件...] [-c 配置.yaml|配置.json] [-m chinese] [-q]
+
+pre-commit 钩子示例 (.git/hooks/pre-commit):
+    git diff --cached --name-only --diff-filter=ACM -- '*.txt' '*.docx' | xargs -r python patent_check.py -q
+"""
+import argparse
+import logging
+import sys
+
+from patent_analyzer_core import COUNT_MODES, ConfigError, compile_config_text, create_analyzer
+
+
+def load_config(path):
+    with open(path, "rb") as f:
+        text = f.read()
+    try:
+        config_data, _ = compile_config_text(text)
+    except ConfigError:
+        raise
+    except Exception as e:  # yaml.YAMLError (yaml 只在这里才被导入)
+        raise ConfigError(f"YAML 解析失败: {e}") from e
+    return config_data
+
+
+def check_file(path, config_data, count_mode, fail_on_missing=False):
+    """返回 (是否通过, 不通过项的输出行, 总字数)。"""
+    result = create_analyzer(path, config_data=config_data, count_mode=count_mode).analyze()
+    lines = []
+    passed = True
+    for item in result["检查结果"]:
+        if item["status_bool"] is False or (fail_on_missing and item["status_bool"] is None
+                                            and item["status_str"] != "信息"):
+            passed = False
+            lines.append(f"  ✗ {item['message']}")
+    return passed, lines, result["总字数"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检查专利申请文件各部分字数是否符合要求。")
+    parser.add_argument("files", nargs="+", help=".txt / .docx 文件")
+    parser.add_argument("-c", "--config", help="字数要求配置文件 (YAML 或 JSON, 默认使用内置配置)")
+    parser.add_argument("-m", "--count-mode", choices=COUNT_MODES, default="chinese", help="字数统计模式")
+    parser.add_argument("--fail-on-missing", action="store_true", help="未识别到要求的章节也视为不通过")
+    parser.add_argument("-q", "--quiet", action="store_true", help="只输出不通过的文件")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出分析过程中的警告")
+    args = parser.parse_args(argv)
+    logging.getLogger('flask.app').setLevel(logging.WARNING if args.verbose else logging.ERROR)
+
+    config_data = None
+    if args.config:
+        try:
+            config_data = load_config(args.config)
+        except (OSError, ConfigError) as e:
+            print(f"无法加载配置文件 '{args.config}': {e}", file=sys.stderr)
+            return 2
+
+    exit_code = 0
+    for path in args.files:
+        try:
+            passed, lines, total = check_file(path, config_data, args.count_mode, args.fail_on_missing)
+        except Exception as e:
+            print(f"{path}: 无法分析 ({type(e).__name__}: {e})", file=sys.stderr)
+            exit_code = 2
+            continue
+        if not passed:
+            exit_code = max(exit_code, 1)
+        if not passed or not args.quiet:
+            print(f"{path}: {'通过' if passed else '不通过'} (总字数 {total})")
+            for line in lines:
+                print(line)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""按内容寻址的分析结果缓存。
+
+缓存键由三部分组成: 文档内容的 SHA-256、合并后配置的规范化哈希、字数统计模式;
+另外混入分析代码本身的指纹, 分析逻辑一旦修改, 旧的磁盘缓存自动失效。
+
+两级存储:
+- 内存层: 按序列化后字节数限制容量的 LRU;
+- 磁盘层 (可选): 目录下每个结果一个 JSON 文件, 进程重启后仍然有效。
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import patent_analyzer_core
+from patent_analyzer_core import get_rule_plan
+
+logger = logging.getLogger('flask.app')
+
+_ANALYZER_FINGERPRINT = hashlib.sha256(Path(patent_analyzer_core.__file__).read_bytes()).hexdigest()[:16]
+
+
+def config_fingerprint(config_data):
+    """合并后配置的规范化哈希 (键排序, 与 YAML 书写顺序和格式无关), 随规则计划一起缓存。"""
+    return get_rule_plan(config_data).fingerprint
+
+
+def make_cache_key(document_sha256, config_data, count_mode):
+    return f"{document_sha256}:{config_fingerprint(config_data)}:{count_mode}:{_ANALYZER_FINGERPRINT}"
+
+
+class AnalysisResultCache:
+    """PatentAnalyzer.analyze() 结果的两级缓存, 线程安全。
+
+    结果以 JSON 字节串保存, 每次命中都反序列化出一份新的字典, 调用方可以随意修改。
+    """
+
+    def __init__(self, max_memory_bytes=64 * 1024 * 1024, disk_dir=None):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.disk_dir / name[:2] / f"{name}.json"
+
+    def _remember(self, key, payload):
+        """放入内存层并按容量淘汰最久未使用的条目 (调用方持有锁)。"""
+        if len(payload) > self.max_memory_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._entries[key] = payload
+        self._memory_bytes += len(payload)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return json.loads(payload)
+
+        if self.disk_dir:
+            try:
+                payload = self._disk_path(key).read_bytes()
+            except OSError:
+                payload = None
+            if payload is not None:
+                try:
+                    result = json.loads(payload)
+                except ValueError:
+                    logger.warning(f"结果缓存文件损坏，已忽略: {self._disk_path(key)}")
+                else:
+                    with self._lock:
+                        self._remember(key, payload)
+                        self.hits += 1
+                        self.disk_hits += 1
+                    return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._remember(key, payload)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = None
+            try:
+                path.parent.mkdir(exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)  # 原子替换, 并发写同一键也不会读到半个文件
+            except OSError as e:
+                logger.warning(f"写入磁盘结果缓存失败: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "disk_dir": str(self.disk_dir) if self.disk_dir else None,
+            }
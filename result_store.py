@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""服务端分析结果存储。
+
+完整的分析结果 (含纯文本报告和应用的配置) 保存在服务端, 会话里只放一个短的结果 ID,
+结果页也可以通过 /results/<ID> 直接分享给同事打开, 无需重新分析。
+
+条目按最近访问时间滑动过期 (TTL), 并按序列化后的字节数限制总内存占用,
+超出时淘汰最久未访问的条目。
+
+ResultStore 保存在进程内存中, 只适用于单个 Web 进程; 多个 worker 进程时使用
+DirectoryResultStore (PATENT_RESULT_STORE_DIR), 结果 ID 在哪个进程打开都有效。
+"""
+import json
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+_RESULT_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class ResultStore:
+    """线程安全的内存结果存储。
+
+    结果以 JSON 字节串保存, 每次读取都反序列化出新的字典。
+    """
+
+    def __init__(self, ttl_seconds=6 * 3600, max_memory_bytes=64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self._entries = OrderedDict()  # result_id -> (expires_at, payload), 按最近访问排序
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def new_result_id():
+        return secrets.token_urlsafe(9)
+
+    def _drop(self, result_id):
+        _, payload = self._entries.pop(result_id)
+        self._memory_bytes -= len(payload)
+
+    def _purge_expired(self, now):
+        """删除过期条目 (调用方持有锁)。最近访问的在末尾, 从头部开始检查即可。"""
+        while self._entries:
+            result_id, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._drop(result_id)
+            self.expirations += 1
+
+    def save(self, result, result_id=None):
+        """保存结果并返回其 ID; 单个结果超过内存上限时抛出 ValueError。"""
+        payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        if len(payload) > self.max_memory_bytes:
+            raise ValueError(f"分析结果过大 ({len(payload)} 字节)，超过结果存储上限。")
+        result_id = result_id or self.new_result_id()
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            if result_id in self._entries:
+                self._drop(result_id)
+            self._entries[result_id] = (now + self.ttl_seconds, payload)
+            self._memory_bytes += len(payload)
+            while self._memory_bytes > self.max_memory_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return result_id
+
+    def load(self, result_id):
+        """读取结果并刷新其过期时间; 不存在或已过期时返回 None。"""
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(result_id)
+            if entry is None:
+                return None
+            payload = entry[1]
+            self._entries[result_id] = (now + self.ttl_seconds, payload)
+            self._entries.move_to_end(result_id)
+        return json.loads(payload)
+
+    def stats(self):
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class DirectoryResultStore:
+    """保存在共享目录中的结果存储, 供多个 Web 工作进程 (如 gunicorn 的多个 worker) 共用。
+
+    接口与 ResultStore 相同。每个结果一个 JSON 文件, 先写临时文件再原子替换;
+    读取时更新文件修改时间, 修改时间早于 TTL 的文件视为过期并被清理。
+    """
+
+    _PURGE_INTERVAL = 60.0
+
+    def __init__(self, directory, ttl_seconds=6 * 3600, max_memory_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes  # 单个结果的大小上限
+        os.makedirs(directory, exist_ok=True)
+        self._last_purge = 0.0
+        self.expirations = 0
+
+    new_result_id = staticmethod(ResultStore.new_result_id)
+
+    def _path(self, result_id):
+        if not _RESULT_ID_RE.fullmatch(result_id or ""):
+            return None
+        return os.path.join(self.directory, result_id + ".json")
+
+    def _purge_expired(self, now):
+        if now - self._last_purge < self._PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        cutoff = now - self.ttl_seconds
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    self.expirations += 1
+            except OSError:  # 其他进程同时清理或读取
+                continue
+
+    def save(self, result, result_id=None):
+        payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        if len(payload) > self.max_memory_bytes:
+            raise ValueError(f"分析结果过大 ({len(payload)} 字节)，超过结果存储上限。")
+        result_id = result_id or self.new_result_id()
+        path = self._path(result_id)
+        if path is None:
+            raise ValueError(f"无效的结果 ID: {result_id!r}")
+        self._purge_expired(time.time())
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return result_id
+
+    def load(self, result_id):
+        path = self._path(result_id)
+        if path is None:
+            return None
+        now = time.time()
+        try:
+            if now - os.stat(path).st_mtime > self.ttl_seconds:
+                return None
+            with open(path, "rb") as f:
+                payload = f.read()
+            os.utime(path, (now, now))
+        except OSError:
+            return None
+        return json.loads(payload)
+
+    def stats(self):
+        self._purge_expired(time.time())
+        entries = total_bytes = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    total_bytes += entry.stat().st_size
+                except OSError:
+                    continue
+                entries += 1
+        return {
+            "entries": entries,
+            "disk_bytes": total_bytes,
+            "directory": self.directory,
+            "ttl_seconds": self.ttl_seconds,
+            "expirations": self.expirations,
+        }
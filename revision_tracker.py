@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""同一份申请文件多个修订版本的增量分析。
+
+每个修订版本通常只改动少数段落。RevisionTracker 在版本之间保留一个段落缓存
+(段落内容 -> 三种模式的字数与标题识别结果), 分析新版本时只有改动过的段落需要重新计数
+和匹配标题, 其余工作只是按段落重新划分章节边界。结果中的 "修订变化" 给出与上一版本相比
+各部分字数的变化和检查结果的翻转。
+
+用法示例:
+    python revision_tracker.py 初稿.docx 二稿.docx 三稿.docx [-c 配置.yaml] [-m chinese]
+"""
+import argparse
+import logging
+import sys
+
+from patent_analyzer_core import PatentAnalyzer, ParagraphCache, COUNT_MODES, get_rule_plan, compile_config_text
+
+
+def _count_change(before, after):
+    return {"之前": before, "之后": after, "变化": (after or 0) - (before or 0)}
+
+
+def diff_results(previous, current):
+    """比较两个版本的分析结果, 返回字数变化和状态发生变化的检查项。
+
+    "各部分" 只列出字数有变化 (含新出现或消失) 的章节; 章节不存在时对应的值为 None。
+    "检查变化" 列出 status_bool 不同的检查项 (True/False/None 之间的任何变化)。
+    """
+    before_sections = previous.get("各部分", {}) if previous else {}
+    after_sections = current.get("各部分", {})
+    section_changes = {}
+    for name in list(before_sections) + [n for n in after_sections if n not in before_sections]:
+        before = before_sections.get(name, {}).get("字数")
+        after = after_sections.get(name, {}).get("字数")
+        if before != after:
+            section_changes[name] = _count_change(before, after)
+
+    before_checks = {item["name"]: item for item in (previous.get("检查结果", []) if previous else [])}
+    check_changes = []
+    for item in current.get("检查结果", []):
+        before = before_checks.get(item["name"])
+        before_status = before["status_bool"] if before else None
+        if previous is not None and before_status != item["status_bool"]:
+            check_changes.append({"name": item["name"], "之前": before_status, "之后": item["status_bool"],
+                                  "message": item["message"]})
+
+    return {
+        "上一版本文件名": previous.get("文件名") if previous else None,
+        "总字数": _count_change(previous.get("总字数") if previous else None, current.get("总字数")),
+        "各部分": section_changes,
+        "检查变化": check_changes,
+    }
+
+
+class RevisionTracker:
+    """依次分析同一文档的各个修订版本 (一个实例对应一份配置和一种统计模式)。"""
+
+    def __init__(self, config_data=None, count_mode="chinese", max_cached_paragraphs=200000):
+        self.config_data = config_data
+        self.count_mode = count_mode
+        self.paragraph_cache = ParagraphCache(get_rule_plan(config_data).heading_matcher, max_cached_paragraphs)
+        self.revision = 0
+        self.previous = None
+
+    def analyze(self, source, filename=None):
+        """分析一个新版本 (参数同 PatentAnalyzer), 返回带 "修订变化" 的分析结果。"""
+        hits, misses = self.paragraph_cache.hits, self.paragraph_cache.misses
+        analyzer = PatentAnalyzer(source, config_data=self.config_data, count_mode=self.count_mode,
+                                  filename=filename, paragraph_cache=self.paragraph_cache)
+        result = analyzer.analyze()
+        self.revision += 1
+        changes = {"版本": self.revision}
+        changes.update(diff_results(self.previous, result))
+        changes["复用段落数"] = self.paragraph_cache.hits - hits
+        changes["重新计算段落数"] = self.paragraph_cache.misses - misses
+        self.previous = result
+        return dict(result, 修订变化=changes)
+
+    def reset(self):
+        """开始跟踪另一份文档 (保留段落缓存)。"""
+        self.revision = 0
+        self.previous = None
+
+
+def _format_status(status):
+    return {True: "符合", False: "不符合", None: "未识别/信息"}[status]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按顺序分析同一文档的多个修订版本，输出各版本之间的变化。")
+    parser.add_argument("revisions", nargs="+", help="按时间顺序排列的修订版本 (.txt/.docx)")
+    parser.add_argument("-c", "--config", help="YAML 字数要求配置文件 (默认使用内置配置)")
+    parser.add_argument("-m", "--count-mode", choices=COUNT_MODES, default="chinese", help="字数统计模式")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    config_data = None
+    if args.config:
+        with open(args.config, "rb") as f:
+            config_data, _ = compile_config_text(f.read())
+
+    tracker = RevisionTracker(config_data, args.count_mode)
+    for path in args.revisions:
+        changes = tracker.analyze(path)["修订变化"]
+        total = changes["总字数"]
+        print(f"[版本 {changes['版本']}] {path}: 总字数 {total['之后']} ({total['变化']:+d})，"
+              f"重新计算 {changes['重新计算段落数']} 段，复用 {changes['复用段落数']} 段")
+        for name, change in changes["各部分"].items():
+            print(f"  {name}: {change['之前']} -> {change['之后']} ({change['变化']:+d})")
+        for item in changes["检查变化"]:
+            print(f"  检查 {item['name']}: {_format_status(item['之前'])} -> {_format_status(item['之后'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
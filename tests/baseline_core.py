@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""对比测试用的基准实现: 最初版本 patent_analyzer_core.PatentAnalyzer 的计数、章节识别与检查逻辑。
+
+逐字符按模式分支计数、逐段逐模式 re.fullmatch 识别标题、按段落拼接文本再计数, 与优化前完全相同,
+仅去掉了日志输出; 另外合并配置时先深拷贝默认配置 (原实现会改写模块级的 DEFAULT_REQUIREMENTS)。
+不要为了让测试通过而修改这里的逻辑。
+"""
+import copy
+import re
+import unicodedata
+from pathlib import Path
+
+from docx import Document
+
+DEFAULT_REQUIREMENTS = {
+    "摘要": {"max": 300},
+    "权利要求书": {"min": 1500, "max": 2000},
+    "说明书摘要": {"max": 300},
+    "说明书": {
+        "sub_sections": ["技术领域", "背景技术", "发明内容", "具体实施方式", "有益效果", "附图说明"],
+        "min": 6000,
+        "max": 10000
+    },
+    "技术领域": {"min": 50, "max": 300},
+    "背景技术": {"min": 300, "max": 1000},
+    "发明内容": {"min": 500, "max": 1500},
+    "具体实施方式": {"ratio": 2.0, "reference": "权利要求书", "tolerance": 0.3, "min": 3000},
+    "有益效果": {"min": 300, "max": 800},
+    "附图说明": {"min": 50, "max": 500},
+    "总字数": {"min": 9000, "max": 12000},
+}
+
+COMMON_SECTIONS_PATTERNS = {
+    "权利要求书": [r"^\s*权\s*利\s*要\s*求\s*书\s*$", r"^\s*权\s*利\s*要\s*求\s*$"],
+    "说明书摘要": [r"^\s*说\s*明\s*书\s*摘\s*要\s*$", r"^\s*摘\s*要\s*$"],
+    "技术领域": [r"^\s*技\s*术\s*领\s*域\s*$", r"^\s*一、\s*技\s*术\s*领\s*域\s*$", r"^\s*1\.\s*技\s*术\s*领\s*域\s*"],
+    "背景技术": [r"^\s*背\s*景\s*技\s*术\s*$", r"^\s*二、\s*背\s*景\s*技\s*术\s*$", r"^\s*2\.\s*背\s*景\s*技\s*术\s*"],
+    "发明内容": [r"^\s*发\s*明\s*内\s*容\s*$", r"^\s*三、\s*发\s*明\s*内\s*容\s*$", r"^\s*3\.\s*发\s*明\s*内\s*容\s*"],
+    "具体实施方式": [r"^\s*具\s*体\s*实\s*施\s*方\s*式\s*$", r"^\s*四、\s*具\s*体\s*实\s*施\s*方\s*式\s*$", r"^\s*4\.\s*具\s*体\s*实\s*施\s*方\s*式\s*"],
+    "有益效果": [r"^\s*有\s*益\s*效\s*果\s*$", r"^\s*五、\s*有\s*益\s*效\s*果\s*$", r"^\s*5\.\s*有\s*益\s*效\s*果\s*"],
+    "附图说明": [r"^\s*附\s*图\s*说\s*明\s*$", r"^\s*六、\s*附\s*图\s*说\s*明\s*$", r"^\s*6\.\s*附\s*图\s*说\s*明\s*"],
+    "说明书": [r"^\s*说\s*明\s*书\s*$"]
+}
+
+
+def count_chars(text, mode):
+    """原 PatentAnalyzer.count_chars: 每种模式各自逐字符判断。"""
+    if not text:
+        return 0
+    if mode == "chinese":
+        count = 0
+        for char in text:
+            if ('\u4e00' <= char <= '\u9fff' or
+                '\u3400' <= char <= '\u4dbf' or
+                '\U00020000' <= char <= '\U0002a6df'):
+                count += 1
+        return count
+    elif mode == "word":
+        chinese_count = sum(1 for char in text if '\u4e00' <= char <= '\u9fff' or
+                           '\u3400' <= char <= '\u4dbf')
+        words = re.findall(r'[a-zA-Z]+', text)
+        english_words_count = len(words)
+        numbers = re.findall(r'[0-9]+', text)
+        numbers_count = len(numbers)
+        punctuation_count = sum(1 for char in text if unicodedata.category(char).startswith('P'))
+        return chinese_count + english_words_count + numbers_count + punctuation_count
+    else:  # "all"
+        return sum(1 for char in text if not char.isspace())
+
+
+class BaselinePatentAnalyzer:
+    def __init__(self, file_path, config_data=None, count_mode="chinese"):
+        self.file_path = Path(file_path)
+        self.count_mode = count_mode
+        self.config = copy.deepcopy(DEFAULT_REQUIREMENTS)
+        if config_data and isinstance(config_data, dict):
+            for key, value in config_data.items():
+                if key in self.config and isinstance(self.config[key], dict) and isinstance(value, dict):
+                    self.config[key].update(value)
+                else:
+                    self.config[key] = value
+        self._load_content()
+
+    def _load_content(self):
+        ext = self.file_path.suffix.lower()
+        if ext == ".docx":
+            doc = Document(self.file_path)
+            self.paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
+        elif ext == ".txt":
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                self.paragraphs = [line.strip() for line in f if line.strip()]
+        else:
+            raise ValueError(f"不支持的文件类型: '{ext}'. 请提供 .txt 或 .docx 文件。")
+        self.full_text_content = "\n".join(self.paragraphs)
+
+    def count_chars(self, text):
+        return count_chars(text, self.count_mode)
+
+    def _is_section_heading(self, text, section_patterns):
+        if not text: return False
+        for pattern in section_patterns:
+            if re.fullmatch(pattern, text.strip(), re.IGNORECASE):
+                return True
+        return False
+
+    def extract_sections(self):
+        extracted_data = {}
+        potential_headings = []
+        main_section_keys = ["权利要求书", "说明书摘要", "说明书"]
+        other_section_keys = [key for key in COMMON_SECTIONS_PATTERNS.keys() if key not in main_section_keys]
+        ordered_section_keys = main_section_keys + other_section_keys
+
+        for i, para_text in enumerate(self.paragraphs):
+            for sec_key in ordered_section_keys:
+                patterns = COMMON_SECTIONS_PATTERNS.get(sec_key, [])
+                if self._is_section_heading(para_text, patterns):
+                    potential_headings.append({"name": sec_key, "index": i, "text": para_text})
+                    break
+        potential_headings.sort(key=lambda x: x["index"])
+
+        if not potential_headings and self.paragraphs:
+            extracted_data["全文内容"] = {
+                "content_paragraphs": self.paragraphs, "start_index": 0, "title_text": "全文内容 (未识别明确章节)"
+            }
+            return extracted_data
+
+        for i in range(len(potential_headings)):
+            current_heading = potential_headings[i]
+            section_name = current_heading["name"]
+            content_start_index = current_heading["index"] + 1
+            if i + 1 < len(potential_headings):
+                section_paras = self.paragraphs[content_start_index:potential_headings[i + 1]["index"]]
+            else:
+                section_paras = self.paragraphs[content_start_index:]
+            extracted_data[section_name] = {
+                "content_paragraphs": section_paras,
+                "start_index": current_heading["index"],
+                "title_text": current_heading["text"]
+            }
+        return extracted_data
+
+    def analyze(self):
+        analysis_result = {
+            "文件名": self.file_path.name,
+            "统计模式": self.count_mode,
+            "总字数": self.count_chars(self.full_text_content),
+            "各部分": {},
+            "检查结果": []
+        }
+        extracted_sections_data = self.extract_sections()
+        actual_counts = {"总字数": analysis_result["总字数"]}
+
+        for section_name, data in extracted_sections_data.items():
+            char_count = self.count_chars("\n".join(data["content_paragraphs"]))
+            analysis_result["各部分"][section_name] = {
+                "字数": char_count,
+                "原始内容标题": data.get("title_text", section_name),
+            }
+            actual_counts[section_name] = char_count
+
+        if "说明书" in self.config and "sub_sections" in self.config["说明书"]:
+            sub_sections_total_chars = 0
+            found_sub_sections = []
+            for sub_sec_name in self.config["说明书"]["sub_sections"]:
+                if sub_sec_name in actual_counts:
+                    sub_sections_total_chars += actual_counts[sub_sec_name]
+                    found_sub_sections.append(sub_sec_name)
+            if found_sub_sections:
+                actual_counts["说明书"] = sub_sections_total_chars
+                if "说明书" not in analysis_result["各部分"]:
+                    analysis_result["各部分"]["说明书"] = {"字数": 0, "原始内容标题": "说明书 (聚合)", "包含子部分": []}
+                analysis_result["各部分"]["说明书"]["字数"] = sub_sections_total_chars
+                analysis_result["各部分"]["说明书"]["聚合字数"] = True
+                analysis_result["各部分"]["说明书"]["包含子部分"] = found_sub_sections
+
+        for name, req in self.config.items():
+            check_item = {"name": name, "actual": "N/A", "expected_str": "", "status_bool": None, "status_str": "", "message": ""}
+            is_aggregated_section = name == "说明书" and analysis_result["各部分"].get(name, {}).get("聚合字数")
+
+            if name not in actual_counts and "ratio" not in req and not is_aggregated_section:
+                if name == "说明书" and "sub_sections" in req:
+                    check_item["status_str"] = "未识别子章节"
+                    check_item["message"] = f"{name}: 未能识别或聚合其子章节。"
+                else:
+                    check_item["status_str"] = "未识别"
+                    check_item["message"] = f"{name}: 未在文档中识别到该部分。"
+                check_item["expected_str"] = str(req)
+                analysis_result["检查结果"].append(check_item)
+                continue
+
+            current_actual_chars = actual_counts.get(name, 0 if not is_aggregated_section else actual_counts.get(name, 0))
+
+            if "ratio" in req:
+                target_section_name_for_ratio = name
+                ref_section_name_for_ratio = req["reference"]
+                check_item["name"] = f"{target_section_name_for_ratio}/{ref_section_name_for_ratio} 比例"
+                chars_target = actual_counts.get(target_section_name_for_ratio)
+                chars_ref = actual_counts.get(ref_section_name_for_ratio)
+                if chars_target is not None and chars_ref is not None and chars_ref > 0:
+                    ratio_val = chars_target / chars_ref
+                    target_ratio_val, tolerance_val = req["ratio"], req.get("tolerance", 0.1)
+                    min_r_val, max_r_val = target_ratio_val * (1 - tolerance_val), target_ratio_val * (1 + tolerance_val)
+                    check_item["status_bool"] = min_r_val <= ratio_val <= max_r_val
+                    check_item["actual"] = f"{ratio_val:.2f}"
+                    check_item["expected_str"] = f"{target_ratio_val:.2f} (±{tolerance_val*100:.0f}%, 即 {min_r_val:.2f}-{max_r_val:.2f})"
+                    check_item["message"] = f"{check_item['name']}: {check_item['actual']} (目标: {check_item['expected_str']})"
+                    if req.get("min") and chars_target < req.get("min"):
+                        check_item["status_bool"] = False
+                        check_item["message"] += f"；且 '{target_section_name_for_ratio}' 字数 {chars_target} 未达到最小要求 {req['min']}"
+                elif chars_target is None:
+                    check_item["status_str"] = "未识别目标章节"
+                    check_item["message"] = f"进行比例计算时未识别到章节 '{target_section_name_for_ratio}'"
+                else:
+                    check_item["status_str"] = "未识别参考章节或其字数为0"
+                    check_item["message"] = f"进行比例计算时未识别到参考章节 '{ref_section_name_for_ratio}' 或其字数为0"
+                analysis_result["检查结果"].append(check_item)
+                continue
+
+            check_item["actual"] = current_actual_chars
+            min_val_req, max_val_req = req.get("min"), req.get("max")
+            message_suffix = ""
+            if min_val_req is not None and max_val_req is not None:
+                check_item["status_bool"] = min_val_req <= current_actual_chars <= max_val_req
+                check_item["expected_str"] = f"{min_val_req}-{max_val_req}字"
+            elif min_val_req is not None:
+                check_item["status_bool"] = current_actual_chars >= min_val_req
+                check_item["expected_str"] = f"至少{min_val_req}字"
+            elif max_val_req is not None:
+                check_item["status_bool"] = current_actual_chars <= max_val_req
+                check_item["expected_str"] = f"不超过{max_val_req}字"
+            else:
+                check_item["status_str"] = "信息"
+                check_item["expected_str"] = "无特定范围要求"
+
+            check_item["message"] = f"{name}: {current_actual_chars}字 (要求: {check_item['expected_str']})"
+            if check_item["status_bool"] == False:
+                if min_val_req is not None and current_actual_chars < min_val_req:
+                    message_suffix = f" (字数不足，差 {min_val_req - current_actual_chars} 字)"
+                elif max_val_req is not None and current_actual_chars > max_val_req:
+                    message_suffix = f" (字数过多，多 {current_actual_chars - max_val_req} 字)"
+            check_item["message"] += message_suffix
+            analysis_result["检查结果"].append(check_item)
+
+        return analysis_result
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+# 未识别章节等警告在对比测试中属于预期内容, 不输出
+logging.getLogger("flask.app").setLevel(logging.ERROR)
+
+# Web 层测试的基础配置: 线程池执行分析 (结果与进程池相同, 启动快), 缓存和结果存储都在内存中
+WEB_TEST_CONFIG = {
+    "TESTING": True,
+    "MAX_CONTENT_LENGTH": 16 * 1024 * 1024,
+    "UPLOAD_SPILL_THRESHOLD": 4 * 1024 * 1024,
+    "RESULT_CACHE_MAX_BYTES": 64 * 1024 * 1024,
+    "RESULT_CACHE_DIR": None,
+    "RESULT_STORE_TTL_SECONDS": 3600,
+    "RESULT_STORE_MAX_BYTES": 64 * 1024 * 1024,
+    "RESULT_STORE_DIR": None,
+    "JOB_WORKERS": 2,
+    "JOB_QUEUE_LIMIT": None,
+    "JOB_TIMEOUT_SECONDS": 30,
+    "JOB_QUEUE_TIMEOUT_SECONDS": None,
+    "JOB_EXECUTOR": "thread",
+    "BATCH_MAX_IN_FLIGHT": None,
+}
+
+
+@pytest.fixture
+def make_web_app(tmp_path):
+    """返回 make(**overrides): 按 WEB_TEST_CONFIG 与 overrides 重建应用 (create_app), 返回 app 模块。"""
+    import app as app_module
+
+    def make(**overrides):
+        config = dict(WEB_TEST_CONFIG, UPLOAD_SPILL_DIR=str(tmp_path / "spill"), **overrides)
+        os.makedirs(config["UPLOAD_SPILL_DIR"], exist_ok=True)
+        app_module.create_app(config)
+        return app_module
+
+    yield make
+    app_module.job_manager.shutdown()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""各测试模块共用的文档构造与结果比较工具。"""
+import random
+
+import baseline_core
+from synthetic_patents import generate_paragraphs, write_docx, write_txt
+
+WRITERS = {"txt": write_txt, "docx": write_docx}
+
+CUSTOM_CONFIG = {
+    "权利要求书": {"min": 10, "max": 500},
+    "具体实施方式": {"ratio": 1.5, "reference": "背景技术", "tolerance": 0.5},
+    "附图说明": {},
+    "总字数": {"min": 100},
+    "附录": {"max": 50},
+}
+CONFIGS = {"default": None, "custom": CUSTOM_CONFIG}
+
+# 随机文本的字符来源: 各模式判断的边界码位、英文与数字、各类空白和标点、扩展区汉字、组合字符等
+_BOUNDARY_CHARS = [chr(cp) for cp in (
+    0x33FF, 0x3400, 0x4DBF, 0x4DC0, 0x4DFF, 0x4E00, 0x9FFF, 0xA000,
+    0x1FFFF, 0x20000, 0x2A6DF, 0x2A6E0, 0x2A700, 0x30000,
+)]
+_SPACES = list(" \t\u3000\xa0\u2002\u2028\u200b\x0b\x0c\x1c\x85")
+_PUNCT = list("，。、；：？！“”‘’（）【】《》—…·,.;:?!\"'()[]{}-_/\\@#%&*～｀«»¡¿")
+_LETTERS = list("abcxyzABCXYZéßøΩжａｂＡ")
+_DIGITS = list("0123456789０１\u0663")
+_OTHERS = list("\u0301\u200d\U0001f600①Ⅻ$+<=>^|~¥€™°")
+_HAN = [chr(cp) for cp in range(0x4E00, 0x4E00 + 2000, 3)] + [chr(cp) for cp in range(0x3400, 0x3400 + 50)]
+
+
+def random_text(rng, length):
+    pools = (_HAN, _HAN, _LETTERS, _DIGITS, _PUNCT, _SPACES, _BOUNDARY_CHARS, _OTHERS)
+    return "".join(rng.choice(rng.choice(pools)) for _ in range(length))
+
+
+def messy_body(rng):
+    """一段混有英文、数字、小数、标点、扩展区汉字和各类空白的正文。"""
+    pieces = []
+    for _ in range(rng.randint(1, 6)):
+        kind = rng.random()
+        if kind < 0.5:
+            pieces.append("".join(rng.choices(_HAN, k=rng.randint(3, 40))))
+        elif kind < 0.65:
+            pieces.append(" ".join(rng.choice(("motor", "GPIO", "PCB", "Wi-Fi", "x", "LED")) for _ in range(3)))
+        elif kind < 0.8:
+            pieces.append(f"{rng.randint(0, 999)}.{rng.randint(0, 99)}mm")
+        else:
+            pieces.append(random_text(rng, rng.randint(1, 20)))
+        pieces.append(rng.choice(("，", "。", ",", " ", "\t", "", "；")))
+    return "".join(pieces).replace("\n", " ").replace("\r", " ")
+
+
+def spaced(rng, heading):
+    """标题字间随机插入空白 (内置模式允许), 偶尔加上首尾空白。"""
+    text = "".join(char + rng.choice(("", "", " ", "　", "  ")) for char in heading).strip()
+    return rng.choice(("", " ", "　")) + text + rng.choice(("", " "))
+
+
+def messy_paragraphs(seed):
+    """随机构造的文档段落: 标题写法、顺序随机, 可能重复 (摘要/说明书摘要)、缺失或完全没有标题。"""
+    rng = random.Random(seed)
+    headings = ["说明书摘要", "摘要", "权利要求书", "权利要求", "说明书", "技术领域", "一、技术领域", "1. 技术领域",
+                "背景技术", "二、背景技术", "发明内容", "3.发明内容", "具体实施方式", "四、具体实施方式",
+                "有益效果", "附图说明", "6. 附图说明"]
+    paragraphs = [messy_body(rng) for _ in range(rng.randint(0, 2))]
+    if rng.random() < 0.1:  # 没有任何标题
+        return paragraphs + [messy_body(rng) for _ in range(rng.randint(1, 10))]
+    for _ in range(rng.randint(1, 12)):
+        heading = rng.choice(headings)
+        paragraphs.append(spaced(rng, heading))
+        if heading.startswith("权利要求"):
+            for number in range(1, rng.randint(1, 8)):
+                separator = rng.choice((".", "．", "、", ". ", " 、"))
+                paragraphs.append(f"{rng.choice(('', ' '))}{number}{separator}{messy_body(rng)}")
+                if rng.random() < 0.3:
+                    paragraphs.append(rng.choice(("1.5 mm的间隙。", "2020．年产" + messy_body(rng), "其中所述" + messy_body(rng))))
+        else:
+            paragraphs.extend(messy_body(rng) for _ in range(rng.randint(0, 6)))
+    return paragraphs
+
+
+# .docx 中不能保存的控制字符 (制表符除外)
+_DOCX_UNSAFE = {cp: " " for cp in range(0x20) if cp != 0x09}
+
+
+def write_document(paragraphs, path, fmt):
+    if fmt == "docx":
+        paragraphs = [text.translate(_DOCX_UNSAFE) for text in paragraphs]
+    WRITERS[fmt](paragraphs, str(path))
+    return path
+
+
+def baseline_view(result):
+    """只保留最初版本结果中就有的字段 (新增的段落字数、各权利要求、阶段耗时、段落范围等去掉)。"""
+    sections = {name: {key: value for key, value in data.items() if key != "段落范围"}
+                for name, data in result["各部分"].items()}
+    return {"文件名": result["文件名"], "统计模式": result["统计模式"], "总字数": result["总字数"],
+            "各部分": sections, "检查结果": result["检查结果"]}
+
+
+def without(result, *keys):
+    return {key: value for key, value in result.items() if key not in keys + ("阶段耗时",)}
+
+
+def check_claims(result, paragraphs, mode):
+    """各权利要求的字数等于其段落区间拼接后按原逻辑计数。"""
+    claims = result.get("各权利要求")
+    if claims is None:
+        return
+    claims_end = result["各部分"]["权利要求书"]["段落范围"][1]
+    starts = claims["起始段落"]
+    for k, start in enumerate(starts):
+        end = starts[k + 1] if k + 1 < len(starts) else claims_end
+        assert claims["字数"][k] == baseline_core.count_chars("\n".join(paragraphs[start:end]), mode)
+
+
+def sample_document(size=5000, seed=1, variant=0):
+    """一份合成的申请文件 (.txt 内容, UTF-8 字节)。"""
+    return "\n".join(generate_paragraphs(size, seed=seed, variant=variant)).encode("utf-8")
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""create_app: 配置覆盖后重建结果缓存、结果存储和任务管理器, 各接口使用重建后的对象。"""
+import io
+
+from helpers import sample_document
+from result_store import DirectoryResultStore
+
+
+def test_create_app_rebuilds_services_from_overrides(make_web_app, tmp_path):
+    web = make_web_app()
+    old_manager, old_cache = web.job_manager, web.result_cache
+    old_manager.warm_up()
+
+    web = make_web_app(JOB_WORKERS=3, JOB_QUEUE_LIMIT=5, JOB_TIMEOUT_SECONDS=7, JOB_QUEUE_TIMEOUT_SECONDS=2,
+                       RESULT_CACHE_DIR=str(tmp_path / "cache"), RESULT_CACHE_MAX_BYTES=1234,
+                       RESULT_STORE_DIR=str(tmp_path / "results"))
+    manager = web.job_manager
+    assert manager is not old_manager and old_manager._executor is None  # 旧的执行器已关闭
+    assert (manager.max_workers, manager.max_pending, manager.job_timeout, manager.queue_timeout) == (3, 5, 7, 2)
+    assert web.result_cache is not old_cache
+    assert web.result_cache.stats()["disk_dir"] == str(tmp_path / "cache")
+    assert web.result_cache.max_memory_bytes == 1234
+    assert isinstance(web.result_store, DirectoryResultStore)
+
+    # 路由与指标回调使用重建后的对象
+    client = web.app.test_client()
+    location = client.post("/", data={"patent_file": (io.BytesIO(sample_document()), "a.txt")}).headers["Location"]
+    assert client.get(location).status_code == 200
+    assert any((tmp_path / "results").iterdir())
+    assert client.get("/api/jobs/stats").get_json()["completed"] == 1
+    assert client.get("/cache/stats").get_json()["misses"] == 1
+    assert 'patent_jobs_total{outcome="completed"} 1' in client.get("/metrics").get_data(as_text=True)
+
+
+def test_create_app_without_config_keeps_services(make_web_app):
+    web = make_web_app()
+    manager, cache, store = web.job_manager, web.result_cache, web.result_store
+    assert web.create_app() is web.app
+    assert (web.job_manager, web.result_cache, web.result_store) == (manager, cache, store)
+
+
+def test_warm_up_worker_starts_the_analysis_processes(make_web_app):
+    web = make_web_app(JOB_EXECUTOR="process", JOB_WORKERS=2)
+    assert web.job_manager.warm_up() == 2
+    web.warm_up_worker()
+    assert web.job_manager.wait(web.job_manager.submit(sample_document(), "a.txt"))["status"] == "done"
+
+
+def test_wsgi_entry_exposes_the_app():
+    import wsgi
+    import app as app_module
+    assert wsgi.app is app_module.app
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""批量分析命令行 (batch_analyze.py): 输入展开、逐行 JSON 输出、失败记录与退出码。"""
+import json
+
+import pytest
+
+import batch_analyze
+from helpers import sample_document, without
+from patent_analyzer_core import PatentAnalyzer
+
+
+def _write_inputs(tmp_path, count=4):
+    folder = tmp_path / "drafts"
+    (folder / "sub").mkdir(parents=True)
+    paths = []
+    for k in range(count):
+        path = folder / ("sub" if k % 2 else "") / f"doc{k}.txt"
+        path.write_bytes(sample_document(3000 + 500 * k, seed=k))
+        paths.append(path)
+    (folder / "notes.md").write_text("不分析", encoding="utf-8")
+    return folder, paths
+
+
+def _read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_collect_input_files_expands_and_deduplicates(tmp_path):
+    folder, paths = _write_inputs(tmp_path)
+    files = batch_analyze.collect_input_files([str(paths[1]), str(folder), str(tmp_path / "drafts" / "**" / "*.txt"),
+                                               str(tmp_path / "missing.txt")])
+    assert files[0] == str(paths[1])
+    assert sorted(files) == sorted(str(path) for path in paths)
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_each_document_is_one_json_line(tmp_path, workers, capsys):
+    folder, paths = _write_inputs(tmp_path)
+    output = tmp_path / "results.jsonl"
+    assert batch_analyze.main([str(folder), "--workers", str(workers), "--output", str(output)]) == 0
+    records = {record["path"]: record for record in _read_records(output)}
+    assert sorted(records) == sorted(str(path) for path in paths)
+    for path in paths:
+        record = records[str(path)]
+        assert record["ok"] and record["bytes"] == path.stat().st_size
+        assert without(record["result"]) == without(PatentAnalyzer(str(path)).analyze())
+    assert "完成 4 个文档 (成功 4, 失败 0)" in capsys.readouterr().err
+
+
+def test_failed_document_does_not_stop_the_batch(tmp_path, capsys):
+    folder, paths = _write_inputs(tmp_path, count=2)
+    broken = folder / "broken.docx"
+    broken.write_bytes(b"not a zip file")
+    output = tmp_path / "results.jsonl"
+    assert batch_analyze.main([str(folder), "--workers", "2", "--output", str(output)]) == 1
+    records = {record["path"]: record for record in _read_records(output)}
+    assert not records[str(broken)]["ok"] and records[str(broken)]["error"]
+    assert all(records[str(path)]["ok"] for path in paths)
+    err = capsys.readouterr().err
+    assert "失败 1" in err and f"{broken}: " in err
+
+
+def test_count_mode_and_config_are_passed_to_workers(tmp_path):
+    folder, paths = _write_inputs(tmp_path, count=2)
+    config = tmp_path / "rules.yaml"
+    config.write_text("权利要求书:\n  min: 10\n  max: 20\n", encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+    batch_analyze.main([str(folder), "-w", "2", "-m", "all", "-c", str(config), "-o", str(output)])
+    for record in _read_records(output):
+        expected = PatentAnalyzer(record["path"], config_data={"权利要求书": {"min": 10, "max": 20}},
+                                  count_mode="all").analyze()
+        assert without(record["result"]) == without(expected)
+
+
+def test_invalid_arguments_exit_with_usage_error(tmp_path, capsys):
+    folder, _paths = _write_inputs(tmp_path, count=1)
+    config = tmp_path / "rules.yaml"
+    config.write_text("权利要求书: [1, 2\n", encoding="utf-8")
+    for argv in ([str(folder), "-c", str(config)], [str(folder), "--workers", "0"],
+                 [str(folder), "--separator", "^=+"], [str(folder), "--bundle", "--separator", "("]):
+        with pytest.raises(SystemExit) as excinfo:
+            batch_analyze.main(argv)
+        assert excinfo.value.code == 2
+    assert batch_analyze.main([str(tmp_path / "empty")]) == 1
+    assert "未找到任何" in capsys.readouterr().err
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""多文件批量接口 /api/analyze/batch: NDJSON / CSV 输出, 客户端中途断开时的清理。"""
+import csv
+import io
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import job_queue
+from helpers import sample_document
+from patent_analyzer_core import PatentAnalyzer
+
+
+@pytest.fixture
+def gate():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_disconnect_cancels_outstanding_jobs(make_web_app, monkeypatch, gate):
+    web = make_web_app(JOB_WORKERS=1, BATCH_MAX_IN_FLIGHT=3)
+
+    def blocked(document, **kwargs):
+        return SimpleNamespace(analyze=lambda: gate.wait(10) and {"总字数": 0})
+
+    monkeypatch.setattr(job_queue, "create_analyzer", blocked)
+    client = web.app.test_client()
+    files = [(io.BytesIO(b"a" * 10), "0.txt"), (io.BytesIO(b"b" * 10), "1.txt"), (io.BytesIO(b"c"), "2.pdf")]
+    response = client.post("/api/analyze/batch", data={"patent_files": files}, buffered=False)
+    first = json.loads(next(response.response))
+    assert first["index"] == 2 and first["status"] == "rejected"
+    # 此时 0 号在分析中, 1 号在排队; 客户端断开
+    response.close()
+    stats = web.job_manager.stats()
+    assert stats["tracked_jobs"] == 0
+    assert stats["pending"] == 1  # 排队的任务已取消, 分析中的任务继续执行到结束
+    gate.set()
+    deadline = time.monotonic() + 5
+    while web.job_manager.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert web.job_manager.stats()["pending"] == 0
+
+
+def batch_files():
+    documents = [sample_document(4000 + 1000 * k, seed=k) for k in range(5)]
+    files = [(io.BytesIO(document), f"doc{k}.txt") for k, document in enumerate(documents)]
+    files.insert(2, (io.BytesIO(b""), "empty.txt"))
+    return documents, files
+
+
+def test_ndjson_batch(make_web_app):
+    web = make_web_app(BATCH_MAX_IN_FLIGHT=2)
+    documents, files = batch_files()
+    response = web.app.test_client().post("/api/analyze/batch", data={"patent_files": files, "count_mode": "word"})
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    records = {record["index"]: record for record in map(json.loads, response.get_data(as_text=True).splitlines())}
+    assert sorted(records) == list(range(6))
+    assert records[2]["status"] == "rejected" and "为空" in records[2]["error"]
+    for index, document in zip((0, 1, 3, 4, 5), documents):
+        expected = PatentAnalyzer(document, filename="x.txt", count_mode="word").analyze()
+        assert records[index]["status"] == "done"
+        assert records[index]["result"]["总字数"] == expected["总字数"]
+        assert records[index]["result"]["各部分"] == expected["各部分"]
+    assert web.job_manager.stats()["tracked_jobs"] == 0
+
+
+def test_csv_batch(make_web_app):
+    web = make_web_app()
+    documents, files = batch_files()
+    response = web.app.test_client().post("/api/analyze/batch?format=csv", data={"patent_files": files})
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True).lstrip("\ufeff"))))
+    assert sorted(int(row["序号"]) for row in rows) == list(range(6))
+    row = next(row for row in rows if row["序号"] == "0")
+    expected = PatentAnalyzer(documents[0], filename="doc0.txt").analyze()
+    assert row["状态"] == "done" and int(row["总字数"]) == expected["总字数"]
+    assert int(row["权利要求书"]) == expected["各部分"]["权利要求书"]["字数"]
+    assert next(row for row in rows if row["序号"] == "2")["状态"] == "rejected"
+
+
+def test_batch_request_errors(make_web_app):
+    client = make_web_app().app.test_client()
+    assert client.post("/api/analyze/batch", data={}).status_code == 400
+    response = client.post("/api/analyze/batch?format=xml", data={"patent_files": [(io.BytesIO(b"x"), "a.txt")]})
+    assert response.status_code == 400
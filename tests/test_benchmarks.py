@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""基准脚本的冒烟测试: 默认参数只跑一个小文档, 结果可与基线比较。"""
+import json
+
+import run_benchmarks
+
+
+def test_default_run_is_small_and_comparable(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_benchmarks, "bench_e2e", lambda path, fmt, repeat: {})
+    output = tmp_path / "bench.json"
+    args = ["--repeat", "1", "--data-dir", str(tmp_path / "docs"), "-o", str(output)]
+    assert run_benchmarks.main(args) == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["meta"]["variants"] == [0]
+    assert {key.split("/")[-2] for key in report["results"]} == {"50k"}
+    assert "analyze/docx/word/50k/v0" in report["results"]
+
+    assert run_benchmarks.main(args + ["--baseline", str(output), "--threshold", "100"]) == 0
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""合订文件: 拆分出的各件申请与单独成文件时的分析结果一致, 以及 batch_analyze.py --bundle。"""
+import json
+
+import pytest
+
+import baseline_core
+import batch_analyze
+from helpers import WRITERS, baseline_view, without, write_document
+from patent_analyzer_core import COUNT_MODES, PatentAnalyzer, iter_bundle_documents
+from synthetic_patents import generate_paragraphs
+
+
+@pytest.mark.parametrize("fmt", sorted(WRITERS))
+@pytest.mark.parametrize("separator", (None, r"^=+ *申请号"))
+def test_bundle_documents_match_separate_files(tmp_path, fmt, separator):
+    applications = [generate_paragraphs(8000 + 3000 * k, seed=k, variant=1) for k in range(4)]
+    bundle = []
+    for k, paragraphs in enumerate(applications):
+        if separator:
+            bundle.append(f"===== 申请号 CN2024{k:05d}")
+        bundle.extend(paragraphs)
+    bundle_path = write_document(bundle, tmp_path / f"bundle.{fmt}", fmt)
+
+    documents = list(iter_bundle_documents(str(bundle_path), separator=separator))
+    assert [document.index for document in documents] == [1, 2, 3, 4]
+    for document, paragraphs in zip(documents, applications):
+        path = write_document(paragraphs, tmp_path / f"single{document.index}.{fmt}", fmt)
+        if separator:
+            assert document.label == f"===== 申请号 CN2024{document.index - 1:05d}"
+        for mode in COUNT_MODES:
+            result = PatentAnalyzer.from_paragraphs(document.paragraphs, path.name, count_mode=mode,
+                                                    paragraph_headings=document.paragraph_headings).analyze()
+            assert without(result) == without(PatentAnalyzer(path, count_mode=mode).analyze())
+            assert baseline_view(result) == baseline_core.BaselinePatentAnalyzer(path, None, mode).analyze()
+
+
+def _bundle(separator_line=None, count=4):
+    applications = [generate_paragraphs(6000 + 2000 * k, seed=k, variant=1) for k in range(count)]
+    bundle = []
+    for k, paragraphs in enumerate(applications):
+        if separator_line:
+            bundle.append(separator_line.format(k))
+        bundle.extend(paragraphs)
+    return applications, bundle
+
+
+def test_empty_applications_between_separators_are_skipped():
+    applications, bundle = _bundle()
+    lines = ["=== 1", "=== 2"] + applications[0] + ["=== 3", "=== 4"] + applications[1]
+    data = "\n".join(lines).encode("utf-8")
+    documents = list(iter_bundle_documents(data, filename="bundle.txt", separator="^=+"))
+    assert [(document.index, document.label) for document in documents] == [(1, "=== 2"), (2, "=== 4")]
+    assert [document.paragraphs for document in documents] == applications[:2]
+
+
+def test_bundle_arguments_are_checked():
+    with pytest.raises(ValueError):
+        list(iter_bundle_documents(b"abc"))
+    with pytest.raises(ValueError):
+        list(iter_bundle_documents(b"abc", filename="a.txt", separator="("))
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_batch_cli_analyzes_each_application_in_order(tmp_path, workers):
+    applications, bundle = _bundle("===== 申请号 CN2024{:05d}")
+    bundle_path = write_document(bundle, tmp_path / "bundle.txt", "txt")
+    broken = tmp_path / "broken.docx"
+    broken.write_bytes(b"not a zip file")
+    output = tmp_path / "results.jsonl"
+    argv = [str(broken), str(bundle_path), "--bundle", "--separator", r"^=+ *申请号", "-w", str(workers),
+            "-o", str(output)]
+    assert batch_analyze.main(argv) == 1
+    with open(output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    *analyzed, failure = records
+    assert [(record["path"], record["application"]) for record in analyzed] == \
+        [(str(bundle_path), k) for k in range(1, len(applications) + 1)]
+    for record, paragraphs in zip(analyzed, applications):
+        expected = PatentAnalyzer.from_paragraphs(paragraphs, "bundle.txt").analyze()
+        assert record["ok"] and without(record["result"]) == without(expected)
+    # 拆分失败的文件最后产出
+    assert failure["path"] == str(broken) and failure["application"] is None and not failure["ok"]
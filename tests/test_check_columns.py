@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""批量按列检查 (RulePlan.check_columns) 与逐文档检查 (RulePlan.check_items / check_vector) 一致。"""
+import random
+
+import pytest
+
+from helpers import CONFIGS
+from patent_analyzer_core import get_rule_plan
+
+
+def _random_columns(plan, rows, seed):
+    rng = random.Random(seed)
+    sections = sorted(set(plan.sections) | set(plan.aggregate_parts or ()) | {"说明书"})
+    columns = {name: [-1 if rng.random() < 0.15 else rng.randint(0, 12000) for _ in range(rows)] for name in sections}
+    columns["总字数"] = [abs(value) for value in columns["总字数"]]
+    return columns
+
+
+def _row_counts(plan, columns, row):
+    """第 row 个文档的字数字典, 与 analyze() 相同地聚合说明书。"""
+    actual_counts = {name: column[row] for name, column in columns.items() if column[row] >= 0}
+    found = [name for name in plan.aggregate_parts or () if name in actual_counts]
+    if found:
+        actual_counts["说明书"] = sum(actual_counts[name] for name in found)
+    return actual_counts
+
+
+@pytest.mark.parametrize("config", list(CONFIGS.values()), ids=list(CONFIGS))
+def test_check_columns_matches_check_items(config):
+    plan = get_rule_plan(config)
+    rows = 500
+    columns = _random_columns(plan, rows, seed=4)
+    matrix = plan.check_columns(columns, rows=rows)
+    passed_masks, failed_masks = matrix.row_masks()
+    for row in range(rows):
+        actual_counts = _row_counts(plan, columns, row)
+        assert matrix.check_items(row) == plan.check_items(actual_counts)
+        assert (passed_masks[row], failed_masks[row]) == plan.check_vector(plan.count_vector(actual_counts))
+
+
+@pytest.mark.parametrize("config", list(CONFIGS.values()), ids=list(CONFIGS))
+def test_failure_rates_and_failed_rows_match_check_items(config):
+    plan = get_rule_plan(config)
+    rows = 300
+    columns = _random_columns(plan, rows, seed=5)
+    matrix = plan.check_columns(columns)
+    expected_rates, expected_failed_rows = {}, []
+    for row in range(rows):
+        items = plan.check_items(_row_counts(plan, columns, row))
+        for item in items:
+            if item["status_bool"] is not None:
+                entry = expected_rates.setdefault(item["name"], [0, 0])
+                entry[0] += 1
+                entry[1] += item["status_bool"] is False
+        if any(item["status_bool"] is False for item in items):
+            expected_failed_rows.append(row)
+    rates = matrix.failure_rates()
+    assert {name: [entry["evaluated"], entry["failed"]] for name, entry in rates.items()} == expected_rates
+    assert matrix.failed_rows() == expected_failed_rows
+
+
+def test_missing_columns_are_unrecognized():
+    plan = get_rule_plan(None)
+    matrix = plan.check_columns({"总字数": [100, 200]})
+    assert matrix.rows == 2
+    for row in range(2):
+        assert matrix.check_items(row) == plan.check_items({"总字数": [100, 200][row]})
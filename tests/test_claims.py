@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""各权利要求的拆分: 编号须从 1 起逐项加 1, 以年份等数字开头的段落不开始新的一项。"""
+import pytest
+
+from helpers import check_claims, write_document
+from patent_analyzer_core import COUNT_MODES, PatentAnalyzer, StreamingTextAnalyzer
+
+PARAGRAPHS = [
+    "一种散热装置",
+    "说明书摘要",
+    "本发明公开了一种散热装置。",
+    "权利要求书",
+    "1. 一种散热装置，包括壳体和风扇。",
+    "2020．年以后生产的壳体采用铝合金。",
+    "2、根据权利要求1所述的散热装置，其特征在于，所述风扇为轴流风扇。",
+    "1.5 mm的间隙。",
+    "2020、年产量不少于一万件。",
+    "3．根据权利要求2所述的散热装置，其特征在于，还包括导热硅脂。",
+    "2. 其中所述导热硅脂涂覆于壳体内壁。",
+    "说明书",
+    "技术领域",
+    "本发明涉及散热领域。",
+]
+
+
+def _analyzers(path, mode):
+    yield PatentAnalyzer(path, count_mode=mode)
+    for chunk_chars in (7, 1 << 20):
+        yield StreamingTextAnalyzer(path, count_mode=mode, chunk_chars=chunk_chars)
+
+
+@pytest.mark.parametrize("mode", COUNT_MODES)
+def test_year_and_out_of_order_numbers_do_not_start_a_claim(tmp_path, mode):
+    path = write_document(PARAGRAPHS, tmp_path / "doc.txt", "txt")
+    for analyzer in _analyzers(path, mode):
+        result = analyzer.analyze()
+        assert result["各权利要求"]["编号"] == [1, 2, 3]
+        assert result["各权利要求"]["起始段落"] == [4, 6, 9]
+        check_claims(result, PARAGRAPHS, mode)
+
+
+def test_numbering_restarts_at_each_claims_heading(tmp_path):
+    paragraphs = ["权利要求书", "1. 一种装置。", "2. 根据权利要求1所述的装置。",
+                  "说明书摘要", "3. 摘要中的编号。",
+                  "权利要求书", "1. 一种方法。", "3. 跳过了第 2 项。", "2. 根据权利要求1所述的方法。"]
+    path = write_document(paragraphs, tmp_path / "doc.txt", "txt")
+    for analyzer in _analyzers(path, "chinese"):
+        result = analyzer.analyze()
+        start, end = result["各部分"]["权利要求书"]["段落范围"]
+        expected = [index for index in range(start, end) if paragraphs[index][:2] in ("1.", "2.")]
+        assert result["各权利要求"]["起始段落"] == expected
+        assert result["各权利要求"]["编号"] == list(range(1, len(expected) + 1))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""按列存储的字数统计库: 追加与重新打开、筛选与百分位、失败率、按新配置重新检查, 以及命令行。"""
+import os
+
+import pytest
+
+import batch_analyze
+import corpus_store
+from corpus_store import MISSING, CorpusStore
+from helpers import CUSTOM_CONFIG, messy_paragraphs, sample_document
+from patent_analyzer_core import PatentAnalyzer, get_rule_plan
+from synthetic_patents import VARIANT_COUNT, generate_paragraphs
+
+CONFIG_CHOICES = (None, CUSTOM_CONFIG)
+MODES = ("chinese", "all")
+
+
+def _results():
+    """(结果, 配置) 列表: 合成文档与章节不全的杂乱文档, 两份配置, 两种统计模式。"""
+    documents = [generate_paragraphs(4000 + 1500 * k, seed=k, variant=k % VARIANT_COUNT) for k in range(6)]
+    documents += [messy_paragraphs(seed) for seed in range(6)]
+    results = []
+    for k, paragraphs in enumerate(documents):
+        config = CONFIG_CHOICES[k % 2]
+        mode = MODES[k // 2 % 2]
+        results.append((PatentAnalyzer.from_paragraphs(paragraphs, f"doc{k}.txt", config_data=config,
+                                                       count_mode=mode).analyze(), config))
+    return results
+
+
+RESULTS = _results()
+
+
+def _fill(path, results=RESULTS, flush_every=5):
+    store = CorpusStore(str(path))
+    for k, (result, config) in enumerate(results):
+        store.append(result, config, source=f"src{k}")
+        if (k + 1) % flush_every == 0:
+            store.flush()
+    store.close()
+    return CorpusStore(str(path))
+
+
+def _counts(result):
+    counts = {name: data["字数"] for name, data in result["各部分"].items()}
+    counts["总字数"] = result["总字数"]
+    return counts
+
+
+def test_columns_round_trip_through_the_directory(tmp_path):
+    store = _fill(tmp_path / "corpus")
+    assert len(store) == len(RESULTS)
+    sections = {name for result, _ in RESULTS for name in _counts(result)}
+    assert set(store.sections) == sections
+    for name in sections:
+        assert list(store.column(name)) == [_counts(result).get(name, MISSING) for result, _ in RESULTS]
+    assert store.column("不存在的章节") is None
+    documents = list(store.documents())
+    assert [doc["source"] for doc in documents] == [f"src{k}" for k in range(len(RESULTS))]
+    assert [doc["文件名"] for doc in documents] == [result["文件名"] for result, _ in RESULTS]
+
+
+def test_filters_and_percentiles(tmp_path):
+    store = _fill(tmp_path / "corpus")
+    for config in CONFIG_CHOICES:
+        for mode in MODES:
+            expected = [_counts(result).get("权利要求书") for result, result_config in RESULTS
+                        if result_config is config and result["统计模式"] == mode]
+            actual = store.values("权利要求书", config=get_rule_plan(config), count_mode=mode)
+            assert actual == [value for value in expected if value is not None]
+    fingerprint = get_rule_plan(CUSTOM_CONFIG).fingerprint
+    assert store.config_ids(fingerprint[:8]) == store.config_ids(CUSTOM_CONFIG) == \
+        store.config_ids(get_rule_plan(CUSTOM_CONFIG))
+    totals = sorted(result["总字数"] for result, _ in RESULTS)
+    assert store.percentile("总字数", 0) == totals[0] and store.percentile("总字数", 100) == totals[-1]
+    assert store.describe("总字数")["count"] == len(RESULTS)
+    assert store.describe("不存在的章节") == {"count": 0}
+
+
+def test_percentile_interpolates_like_numpy():
+    assert corpus_store._percentile([1, 2, 3, 4], 50) == 2.5
+    assert corpus_store._percentile([10, 20, 30], 25) == 15
+    assert corpus_store._percentile([7], 95) == 7
+    assert corpus_store._percentile([], 50) is None
+
+
+def test_failure_rates_match_the_check_results(tmp_path):
+    store = _fill(tmp_path / "corpus")
+    expected = {}
+    for result, _ in RESULTS:
+        for item in result["检查结果"]:
+            if item["status_bool"] is not None:
+                entry = expected.setdefault(item["name"], [0, 0])
+                entry[0] += 1
+                entry[1] += item["status_bool"] is False
+    rates = store.failure_rates()
+    assert {name: [entry["evaluated"], entry["failed"]] for name, entry in rates.items()} == expected
+    assert [entry["rate"] for entry in rates.values()] == sorted((entry["rate"] for entry in rates.values()),
+                                                                 reverse=True)
+    failing = next(name for name, entry in rates.items() if entry["failed"])
+    failed_rows = [doc["source"] for doc in store.documents(store.select(failed=failing))]
+    assert len(failed_rows) == rates[failing]["failed"]
+
+
+def test_rescore_matches_checking_each_document(tmp_path):
+    store = _fill(tmp_path / "corpus")
+    plan = get_rule_plan(CUSTOM_CONFIG)
+    matrix = store.rescore(CUSTOM_CONFIG)
+    for row, (result, config) in enumerate(RESULTS):
+        assert matrix.check_items(row) == plan.check_items(_counts(result))
+    selected = store.rescore(plan, count_mode="all")
+    rows = [result for result, _ in RESULTS if result["统计模式"] == "all"]
+    assert selected.rows == len(rows)
+    assert [selected.check_items(row) for row in range(len(rows))] == \
+        [plan.check_items(_counts(result)) for result in rows]
+
+
+def test_interrupted_write_is_ignored_on_reopen(tmp_path):
+    path = tmp_path / "corpus"
+    _fill(path, RESULTS[:4], flush_every=4)
+    # 模拟写入列文件后、更新 meta.json 之前中断
+    for name in os.listdir(path / "sections"):
+        with open(path / "sections" / name, "ab") as f:
+            f.write(b"\x01" * 12)
+    with open(path / "docs.jsonl", "ab") as f:
+        f.write(b'{"broken')
+    store = _fill(path, RESULTS[4:])
+    assert len(store) == len(RESULTS)
+    assert list(store.column("总字数")) == [result["总字数"] for result, _ in RESULTS]
+    assert len(list(store.documents())) == len(RESULTS)
+
+
+def test_batch_cli_appends_to_the_corpus(tmp_path, capsys):
+    inputs = tmp_path / "drafts"
+    inputs.mkdir()
+    for k in range(3):
+        (inputs / f"doc{k}.txt").write_bytes(sample_document(seed=k))
+    corpus = tmp_path / "corpus"
+    assert batch_analyze.main([str(inputs), "-w", "1", "--corpus", str(corpus), "-o", str(tmp_path / "out.jsonl")]) == 0
+    store = CorpusStore(str(corpus))
+    assert sorted(doc["source"] for doc in store.documents()) == sorted(str(inputs / f"doc{k}.txt") for k in range(3))
+
+    config = tmp_path / "rules.yaml"
+    config.write_text("总字数:\n  min: 1000000\n", encoding="utf-8")
+    capsys.readouterr()
+    assert corpus_store.main([str(corpus), "--percentile", "总字数", "50", "--failure-rates",
+                              "--rescore", str(config), "--show-failed", "2"]) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("3 个文档, 1 份配置")
+    assert "总字数 P50: " in out
+    assert ": 3 个有不通过项" in out
+    with pytest.raises(SystemExit):
+        corpus_store.main([str(tmp_path / "missing")])
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""流式 .docx 读取 (iter_docx_paragraphs) 产出的段落文本与 python-docx 一致。"""
+import io
+import random
+
+import pytest
+from docx import Document
+from docx.enum.text import WD_BREAK
+
+from helpers import messy_paragraphs, write_document
+from patent_analyzer_core import PatentAnalyzer, iter_docx_paragraphs, read_docx_paragraphs_python_docx
+
+
+def _rich_document(path):
+    """含多个 run、制表符、换行、空段落、表格和页眉的文档。"""
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "页眉不属于正文"
+    doc.add_heading("权利要求书", level=1)
+    paragraph = doc.add_paragraph("1. 一种装置，")
+    paragraph.add_run("包括").bold = True
+    paragraph.add_run("\t壳体")
+    paragraph.add_run().add_break(WD_BREAK.LINE)
+    paragraph.add_run("和 Wi-Fi 6E 模块。")
+    doc.add_paragraph("")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "表格中的段落不是正文段落"
+    doc.add_paragraph("说明书")
+    doc.add_paragraph("　全角空格与 ａｂｃ１２３ 混排。 ")
+    doc.save(str(path))
+    return path
+
+
+def test_rich_document_matches_python_docx(tmp_path):
+    path = _rich_document(tmp_path / "rich.docx")
+    paragraphs = list(iter_docx_paragraphs(str(path)))
+    assert paragraphs == read_docx_paragraphs_python_docx(str(path))
+    assert "表格中的段落不是正文段落" not in paragraphs and "页眉不属于正文" not in paragraphs
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_generated_documents_match_python_docx(tmp_path, seed):
+    path = write_document(messy_paragraphs(seed), tmp_path / "doc.docx", "docx")
+    with open(path, "rb") as f:
+        data = f.read()
+    expected = read_docx_paragraphs_python_docx(io.BytesIO(data))
+    assert list(iter_docx_paragraphs(io.BytesIO(data))) == expected
+    assert PatentAnalyzer(data, filename="doc.docx").paragraphs == [text for text in expected if text.strip()]
+
+
+def test_large_document_is_read_in_order(tmp_path):
+    rng = random.Random(0)
+    paragraphs = ["".join(rng.choice("专利申请文件字数检查") for _ in range(200)) for _ in range(3000)]
+    path = write_document(paragraphs, tmp_path / "big.docx", "docx")
+    reader = iter_docx_paragraphs(str(path))
+    assert next(reader) == paragraphs[0]
+    assert list(reader) == paragraphs[1:]
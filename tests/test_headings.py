@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""章节标题识别: 合并正则的结果与逐模式 re.fullmatch (最初版本的做法) 一致。"""
+import random
+
+import pytest
+
+import baseline_core
+from helpers import spaced
+from patent_analyzer_core import (COMMON_SECTIONS_PATTERNS, HEADING_MAX_LENGTH, ConfigError, PatentAnalyzer,
+                                  StreamingTextAnalyzer, get_heading_matcher, get_rule_plan)
+
+
+def baseline_heading(text):
+    """最初版本 extract_sections 中的标题判断。"""
+    analyzer = baseline_core.BaselinePatentAnalyzer.__new__(baseline_core.BaselinePatentAnalyzer)
+    for key in ["权利要求书", "说明书摘要", "说明书"] + [k for k in COMMON_SECTIONS_PATTERNS
+                                                  if k not in ("权利要求书", "说明书摘要", "说明书")]:
+        if analyzer._is_section_heading(text, COMMON_SECTIONS_PATTERNS[key]):
+            return key
+    return None
+
+
+def test_builtin_headings_match_like_baseline():
+    rng = random.Random(5)
+    matcher = get_heading_matcher()
+    headings = ["权利要求书", "摘要", "说明书", "一、技术领域", "1.技术领域", "4. 具体实施方式", "附图说明",
+                "6.附图说明及其他", "技术领域。", "权利", "ABSTRACT"]
+    samples = [spaced(rng, rng.choice(headings)) for _ in range(2000)]
+    samples += ["", " ", "　", "权利要求书" * 11, "1." + "技术领域" + "x" * 60]
+    for text in samples:
+        assert matcher.match(text) == baseline_heading(text), repr(text)
+
+
+def test_length_cap_ignores_whitespace():
+    matcher = get_heading_matcher()
+    text = "权" + " " * 12 + "利" + "　" * 40 + "要 求 书"
+    assert len(text.strip()) > HEADING_MAX_LENGTH
+    assert matcher.match(text) == baseline_heading(text) == "权利要求书"
+    # 非空白字符超过上限的段落不再尝试内置模式
+    assert matcher.match("1." + "技术领域" * 13) is None
+
+
+def test_user_patterns_are_not_length_capped(tmp_path):
+    heading = "附录：" + "实验数据与对比例的详细记录" * 5
+    config = {"附录": {"heading_patterns": [f"^{heading}$"]}}
+    assert len(heading) > HEADING_MAX_LENGTH
+    assert get_heading_matcher(config).match(heading) == "附录"
+
+    path = tmp_path / "doc.txt"
+    path.write_text("\n".join(["权利要求书", "1. 一种装置。", heading, "第一组数据。"]), encoding="utf-8")
+    for analyzer in (PatentAnalyzer(path, config_data=config), StreamingTextAnalyzer(path, config_data=config)):
+        sections = analyzer.analyze()["各部分"]
+        assert sections["附录"]["原始内容标题"] == heading
+        assert sections["附录"]["字数"] == 5
+
+
+def test_user_patterns_keep_config_priority():
+    # 追加到已有章节的模式排在该章节内置模式之后、其后各章节之前
+    matcher = get_heading_matcher({"权利要求书": {"heading_patterns": ["^附录$"]}, "附录": {"heading_patterns": "^附录$"}})
+    assert matcher.match("权利要求书") == "权利要求书"
+    assert matcher.match("附录") == "权利要求书"
+    assert matcher.match("正文") is None
+
+
+def test_user_patterns_compile_on_their_own():
+    # 反向引用和行内标志只在单独编译时有效, 合并成一个正则后会编译失败或改变含义
+    config = {"附录": {"heading_patterns": [r"^(附)\1录$", "(?i)appendix"]},
+              "权利要求书": {"heading_patterns": r"^(?P<t>权项)\s*(?P=t)?$"}}
+    matcher = get_heading_matcher(config)
+    assert matcher.match("附附录") == "附录"
+    assert matcher.match("附录") is None
+    assert matcher.match("APPENDIX") == "附录"
+    assert matcher.match("权项权项") == "权利要求书"
+    assert matcher.match("权利要求书") == "权利要求书"
+    assert PatentAnalyzer.from_paragraphs(["说明书", "正文。", "Appendix", "附加内容"], "a.txt", config_data=config
+                                          ).analyze()["各部分"]["附录"]["字数"] == 4
+
+
+def test_invalid_user_pattern_is_a_config_error():
+    with pytest.raises(ConfigError, match="附录\\("):
+        get_rule_plan({"附录": {"heading_patterns": "附录("}})
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""job_queue.JobManager: 排队上限、执行与排队超时、回调顺序、进程池恢复。
+
+多数用例把 create_analyzer 换成 "文档就是返回结果的函数", 以便精确控制分析耗时;
+用例结束时放行所有仍在等待的任务, 避免遗留线程。
+"""
+import io
+import multiprocessing
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import job_queue
+from helpers import sample_document
+from job_queue import JOB_DONE, JOB_FAILED, JOB_TIMEOUT, JobManager, QueueFullError
+from patent_analyzer_core import PatentAnalyzer
+
+
+@pytest.fixture
+def callable_documents(monkeypatch):
+    monkeypatch.setattr(job_queue, "create_analyzer", lambda document, **kwargs: SimpleNamespace(analyze=document))
+    monkeypatch.setattr(job_queue, "WAIT_POLL_SECONDS", 0.02)
+
+
+@pytest.fixture
+def gate():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def blocked_until(event, result=None):
+    def analyze():
+        event.wait(10)
+        return result or {"总字数": 0}
+    return analyze
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待超时")
+        time.sleep(0.01)
+
+
+def test_timed_out_thread_job_keeps_its_slot_until_it_ends(callable_documents, gate):
+    manager = JobManager(max_workers=1, max_pending=1, job_timeout=0.1, executor="thread")
+    late_results = []
+    job_id = manager.submit(blocked_until(gate, {"总字数": 7}), "slow.txt", on_done=late_results.append)
+    status = manager.wait(job_id)
+    assert status["status"] == JOB_TIMEOUT
+    # 线程无法中断, 分析仍在进行: 名额不释放, 新任务照样受队列上限约束
+    assert manager.stats()["pending"] == 1
+    with pytest.raises(QueueFullError):
+        manager.submit(blocked_until(gate), "next.txt")
+
+    gate.set()
+    wait_until(lambda: manager.stats()["pending"] == 0)
+    assert late_results == [{"总字数": 7}]  # 超时后才算完的结果仍交给回调 (写入结果缓存)
+    assert manager.get(job_id)["status"] == JOB_TIMEOUT
+    stats = manager.stats()
+    assert (stats["timed_out"], stats["completed"], stats["rejected"]) == (1, 0, 1)
+    manager.shutdown()
+
+
+def crash_worker():
+    os._exit(1)  # 模拟分析进程被 OOM killer 杀死
+
+
+def answer():
+    return {"总字数": 42}
+
+
+@pytest.mark.parametrize("executor", ("thread", "process"))
+def test_real_documents_are_analyzed(tmp_path, executor):
+    document = sample_document()
+    expected = PatentAnalyzer(document, filename="a.txt").analyze()
+    manager = JobManager(max_workers=2, executor=executor)
+    path = tmp_path / "b.txt"
+    path.write_bytes(document)
+    ids = [manager.submit(document, "a.txt"), manager.submit(str(path), "b.txt", delete_document=True)]
+    for job_id in ids:
+        status = manager.wait(job_id)
+        assert status["status"] == JOB_DONE and status["ok"]
+        assert status["result"]["各部分"] == expected["各部分"]
+    assert not path.exists()  # 交给任务的临时文档在任务结束时删除
+    assert manager.stats()["pending"] == 0
+    manager.shutdown()
+
+
+def test_queue_limit_rejects_new_jobs(callable_documents, gate):
+    manager = JobManager(max_workers=1, max_pending=2, executor="thread")
+    ids = [manager.submit(blocked_until(gate), f"{k}.txt") for k in range(2)]
+    with pytest.raises(QueueFullError):
+        manager.submit(blocked_until(gate), "2.txt")
+    assert manager.stats()["rejected"] == 1
+    gate.set()
+    assert [manager.wait(job_id)["status"] for job_id in ids] == [JOB_DONE, JOB_DONE]
+    assert manager.wait(manager.submit(answer, "3.txt"))["result"] == {"总字数": 42}
+    manager.shutdown()
+
+
+def test_execution_timeout_starts_when_the_job_runs(callable_documents):
+    # 第二个任务排队 0.3 秒、执行 0.3 秒: 从提交算起超过 0.5 秒的时限, 从开始执行算起则没有
+    manager = JobManager(max_workers=1, job_timeout=0.5, executor="thread")
+    ids = [manager.submit(lambda: time.sleep(0.3) or {"总字数": k}, f"{k}.txt") for k in range(2)]
+    second = manager.wait(ids[1])
+    assert second["status"] == JOB_DONE
+    assert second["started_at"] - second["submitted_at"] >= 0.2
+    manager.shutdown()
+
+
+def test_queue_timeout_cancels_jobs_that_never_start(callable_documents, gate):
+    manager = JobManager(max_workers=1, queue_timeout=0.1, executor="thread")
+    blocker = manager.submit(blocked_until(gate), "blocker.txt")
+    waiting = manager.submit(answer, "waiting.txt")
+    status = manager.wait(waiting)
+    assert status["status"] == JOB_TIMEOUT and status["error_type"] == "QueueTimeoutError"
+    assert manager.stats()["pending"] == 1  # 被取消的任务立即释放名额
+    gate.set()
+    assert manager.wait(blocker)["status"] == JOB_DONE
+    assert manager.stats()["pending"] == 0
+    manager.shutdown()
+
+
+def test_on_done_finishes_before_waiters_see_the_result(callable_documents):
+    calls = []
+
+    def on_done(result):
+        time.sleep(0.2)
+        calls.append(dict(result))
+
+    manager = JobManager(max_workers=1, executor="thread")
+    # 分析稍有耗时, 回调在工作线程中执行 (已结束的 future 会在 submit 的线程里直接调用回调)
+    status = manager.wait(manager.submit(lambda: time.sleep(0.05) or answer(), "a.txt", on_done=on_done))
+    assert status["status"] == JOB_DONE
+    assert calls == [{"总字数": 42}]
+    manager.shutdown()
+
+
+def test_finished_jobs_can_be_popped_and_expire(callable_documents):
+    manager = JobManager(max_workers=1, executor="thread", finished_ttl=0)
+    job_id = manager.submit(answer, "a.txt")
+    manager.wait(job_id)
+    assert manager.pop(job_id)["result"] == {"总字数": 42}
+    assert manager.get(job_id) is None
+    expired = manager.submit(answer, "b.txt")
+    manager.wait(expired)
+    time.sleep(0.01)
+    manager.wait(manager.submit(answer, "c.txt"))  # 提交新任务时清理过期的已结束任务
+    assert manager.get(expired) is None
+    manager.shutdown()
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="替换的分析函数需随 fork 进入工作进程")
+def test_broken_pool_fails_jobs_and_recovers(callable_documents):
+    manager = JobManager(max_workers=1, executor="process")
+    status = manager.wait(manager.submit(crash_worker, "crash.txt"))
+    assert status["status"] == JOB_FAILED and status["error_type"] == "BrokenProcessPool"
+    # 失效的进程池被丢弃, 下一个任务在新的进程池中执行
+    assert manager.wait(manager.submit(answer, "next.txt"))["result"] == {"总字数": 42}
+    assert manager.stats()["pending"] == 0
+    manager.shutdown()
+
+
+def test_api_returns_429_when_the_queue_is_full(make_web_app, monkeypatch, gate):
+    web = make_web_app(JOB_WORKERS=1, JOB_QUEUE_LIMIT=1)
+    monkeypatch.setattr(job_queue, "create_analyzer",
+                        lambda document, **kwargs: SimpleNamespace(analyze=blocked_until(gate)))
+    client = web.app.test_client()
+
+    def post(name):
+        return client.post("/api/analyze", data={"patent_file": (io.BytesIO(name.encode() * 10), name)})
+
+    accepted = post("a.txt")
+    assert accepted.status_code == 202
+    rejected = post("b.txt")
+    assert rejected.status_code == 429 and rejected.headers["Retry-After"]
+    gate.set()
+    job_id = accepted.get_json()["job_id"]
+    wait_until(lambda: client.get(f"/api/jobs/{job_id}").get_json()["status"] == JOB_DONE)
+    assert client.get("/api/jobs/no-such-job").status_code == 404
+
+
+def test_form_route_does_not_keep_jobs(make_web_app):
+    web = make_web_app()
+    client = web.app.test_client()
+    for k in range(3):
+        response = client.post("/", data={"patent_file": (io.BytesIO(sample_document(seed=k)), f"{k}.txt")})
+        assert "/results/" in response.headers["Location"]
+    assert web.job_manager.stats()["tracked_jobs"] == 0
+
+
+def test_spilled_upload_is_analyzed_by_path(make_web_app, monkeypatch):
+    web = make_web_app(UPLOAD_SPILL_THRESHOLD=1024)
+    document = sample_document(20000)
+    spill_dir = web.app.config["UPLOAD_SPILL_DIR"]
+    submitted = []
+    original_submit = web.job_manager.submit
+
+    def submit(document, *args, **kwargs):
+        submitted.append((document, kwargs.get("delete_document")))
+        return original_submit(document, *args, **kwargs)
+
+    monkeypatch.setattr(web.job_manager, "submit", submit)
+    client = web.app.test_client()
+    job_id = client.post("/api/analyze", data={"patent_file": (io.BytesIO(document), "big.txt")}).get_json()["job_id"]
+    wait_until(lambda: client.get(f"/api/jobs/{job_id}").get_json()["status"] == JOB_DONE)
+    result = client.get(f"/api/jobs/{job_id}").get_json()["result"]
+    assert result["文件名"] == "big.txt"
+    assert result["各部分"] == PatentAnalyzer(document, filename="big.txt").analyze()["各部分"]
+    (path, delete_document), = submitted
+    assert isinstance(path, str) and delete_document
+    assert os.path.dirname(path) == spill_dir
+    wait_until(lambda: not os.listdir(spill_dir))  # 接收缓冲与复制出的临时文件都已删除
+
+
+def test_cancel_drops_jobs_and_frees_queued_slots(callable_documents, gate):
+    manager = JobManager(max_workers=1, executor="thread")
+    running = manager.submit(blocked_until(gate), "running.txt")
+    wait_until(lambda: manager.get(running)["status"] == "running")
+    queued = manager.submit(answer, "queued.txt")
+    assert manager.cancel(queued) is True
+    assert manager.cancel(running) is False  # 已在执行, 无法中断
+    assert manager.get(queued) is None and manager.get(running) is None
+    assert manager.stats()["pending"] == 1
+    gate.set()
+    wait_until(lambda: manager.stats()["pending"] == 0)
+    assert manager.cancel("no-such-job") is False
+    manager.shutdown()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""分阶段计时与 Prometheus 指标: 计时上下文、直方图与文本格式、分析结果中的阶段耗时, 以及 /metrics。"""
+import io
+
+import pytest
+
+import metrics
+from helpers import sample_document
+from metrics import MetricsRegistry, StageTimings, stage_timings, timed_stage
+from patent_analyzer_core import PatentAnalyzer
+
+
+@pytest.fixture
+def metrics_disabled():
+    metrics.set_enabled(False)
+    yield
+    metrics.set_enabled(True)
+
+
+def test_stage_timings_accumulate_per_stage():
+    timings = StageTimings()
+    for _ in range(3):
+        with timed_stage(timings, "count"):
+            pass
+    with timings.stage("check"):
+        pass
+    assert set(timings) == {"count", "check"} and all(seconds >= 0 for seconds in timings.values())
+
+
+def test_disabled_timings_use_the_shared_null_context(metrics_disabled):
+    assert stage_timings() is None
+    assert timed_stage(None, "load") is timed_stage(None, "count")
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "演示", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, 'a"b')
+    assert registry.histogram("demo_seconds", "重复注册返回已有的指标") is histogram
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP demo_seconds 演示", "# TYPE demo_seconds histogram"]
+    assert lines[2:] == [
+        'demo_seconds_bucket{stage="a\\"b",le="0.1"} 2',
+        'demo_seconds_bucket{stage="a\\"b",le="1.0"} 3',
+        'demo_seconds_bucket{stage="a\\"b",le="+Inf"} 4',
+        'demo_seconds_sum{stage="a\\"b"} 3.65',
+        'demo_seconds_count{stage="a\\"b"} 4',
+    ]
+    assert histogram.count('a"b') == 4 and histogram.count("other") == 0
+
+
+def test_counter_and_callback_samples():
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "计数", ("kind",))
+    counter.inc("x")
+    counter.inc("x", amount=2)
+    registry.callback("demo_gauge", "回调", lambda: 7)
+    registry.callback("demo_by_result", "按标签回调", lambda: {("hit",): 1, ("miss",): 2}, ("result",), kind="counter")
+    text = registry.render()
+    assert 'demo_total{kind="x"} 3' in text and counter.value("x") == 3
+    assert "demo_gauge 7" in text
+    assert "# TYPE demo_by_result counter" in text
+    assert 'demo_by_result{result="hit"} 1\ndemo_by_result{result="miss"} 2' in text
+
+
+def test_analysis_result_has_stage_timings():
+    result = PatentAnalyzer(sample_document(), filename="a.txt").analyze()
+    assert set(result["阶段耗时"]) == {"load", "extract", "count", "check"}
+    count = metrics.ANALYSIS_SECONDS.count()
+    metrics.observe_analysis(result)
+    assert metrics.ANALYSIS_SECONDS.count() == count + 1
+
+
+def test_disabled_metrics_leave_no_timings(metrics_disabled):
+    result = PatentAnalyzer(sample_document(), filename="a.txt").analyze()
+    assert "阶段耗时" not in result
+    count = metrics.DOCUMENT_CHARS.count()
+    metrics.observe_analysis(result)
+    assert metrics.DOCUMENT_CHARS.count() == count
+
+
+def test_metrics_endpoint(make_web_app):
+    web = make_web_app()
+    client = web.app.test_client()
+    stage_counts = {stage: metrics.STAGE_SECONDS.count(stage) for stage in metrics.STAGES}
+    client.post("/", data={"patent_file": (io.BytesIO(sample_document()), "a.txt")})
+    assert {stage: metrics.STAGE_SECONDS.count(stage) - stage_counts[stage] for stage in metrics.STAGES} == \
+        dict.fromkeys(metrics.STAGES, 1)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'patent_jobs_total{outcome="completed"} 1' in text
+    assert "patent_jobs_pending 0" in text
+    assert "patent_result_store_entries 1" in text
+    assert 'patent_http_request_seconds_count{endpoint="index",method="POST"}' in text
+
+
+def test_metrics_endpoint_is_hidden_when_disabled(make_web_app, metrics_disabled):
+    web = make_web_app()
+    assert web.app.test_client().get("/metrics").status_code == 404
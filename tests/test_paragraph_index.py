@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""段落字数索引 (ParagraphCountIndex): 前缀和给出的区间字数等于段落拼接后重新计数。"""
+import random
+
+import baseline_core
+from helpers import messy_body, messy_paragraphs
+from patent_analyzer_core import COUNT_MODES, ParagraphCountIndex, PatentAnalyzer
+
+
+def test_paragraph_index_ranges_match_joined_text():
+    rng = random.Random(2)
+    paragraphs = [messy_body(rng) for _ in range(60)]
+    index = ParagraphCountIndex.from_paragraphs(paragraphs)
+    for mode in COUNT_MODES:
+        assert index.total(mode) == baseline_core.count_chars("\n".join(paragraphs), mode)
+        for _ in range(200):
+            start = rng.randint(0, len(paragraphs))
+            end = rng.randint(start, len(paragraphs))
+            assert index.range_count(start, end, mode) == baseline_core.count_chars("\n".join(paragraphs[start:end]), mode)
+
+
+def test_section_counts_come_from_paragraph_ranges():
+    paragraphs = messy_paragraphs(6)
+    for mode in COUNT_MODES + ("unknown",):
+        result = PatentAnalyzer.from_paragraphs(paragraphs, "a.txt", count_mode=mode).analyze()
+        index = ParagraphCountIndex.from_paragraphs(paragraphs)
+        assert result["段落字数"] == index.counts(mode)
+        assert result["总字数"] == index.total(mode)
+        for data in result["各部分"].values():
+            if "段落范围" in data and not data.get("聚合字数"):
+                start, end = data["段落范围"]
+                assert data["字数"] == index.range_count(start, end, mode)
+
+
+def test_empty_index():
+    index = ParagraphCountIndex.from_paragraphs([])
+    assert len(index) == 0 and index.counts() == []
+    assert all(index.total(mode) == 0 and index.range_count(0, 0, mode) == 0 for mode in COUNT_MODES)
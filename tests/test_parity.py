@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""优化后的实现与最初版本 (tests/baseline_core.py) 的结果对比。
+
+- 计数: count_chars_all_modes 与原先三种模式各自的逐字符循环, 覆盖全部 Unicode 码位和随机混排文本;
+- analyze: 合成文档 (全部标题写法) 与随机构造的 "杂乱" 文档, .txt/.docx, 三种统计模式, 默认与自定义配置;
+- 各权利要求的字数等于对应段落拼接后按原逻辑计数。
+
+其他功能 (流式分析、合订文件、按列检查等) 的测试在各自的 tests/test_*.py 中。运行: python -m pytest -q tests
+"""
+import random
+
+import pytest
+
+import baseline_core
+from helpers import (CONFIGS, WRITERS, baseline_view, check_claims, messy_body, messy_paragraphs, random_text,
+                     write_document)
+from patent_analyzer_core import COUNT_MODES, DEFAULT_REQUIREMENTS, PatentAnalyzer, count_chars_all_modes
+from synthetic_patents import VARIANT_COUNT, generate_paragraphs
+
+
+# ---------------------------------------------------------------- 计数
+
+def test_every_code_point_counts_like_the_per_mode_loops():
+    # 以空格隔开, 每个码位单独成词, 各块的合计等于逐字符判断之和
+    step = 128
+    for block_start in range(0, 0x110000, step):
+        text = " ".join(chr(cp) for cp in range(block_start, block_start + step))
+        counts = count_chars_all_modes(text)
+        for mode in COUNT_MODES:
+            assert getattr(counts, mode) == baseline_core.count_chars(text, mode), (hex(block_start), mode)
+
+
+def test_mixed_text_counts_like_the_per_mode_loops():
+    rng = random.Random(1)
+    samples = ["", " ", "abc123def", "áb", "1.5mm", "Wi-Fi 6E", "ａｂｃ１２３", "x　y", "\U00020000\U0002a6e0"]
+    samples += [random_text(rng, rng.randint(0, 120)) for _ in range(3000)]
+    for text in samples:
+        counts = count_chars_all_modes(text)
+        for mode in COUNT_MODES:
+            assert getattr(counts, mode) == baseline_core.count_chars(text, mode), (text, mode)
+
+
+@pytest.mark.parametrize("mode", COUNT_MODES + ("unknown",))
+def test_analyzer_count_chars_matches_baseline(mode):
+    rng = random.Random(mode)
+    analyzer = PatentAnalyzer.from_paragraphs(["占位"], "a.txt", count_mode=mode)
+    for _ in range(300):
+        text = messy_body(rng)
+        assert analyzer.count_chars(text) == baseline_core.count_chars(text, mode)
+
+
+# ---------------------------------------------------------------- analyze
+
+@pytest.mark.parametrize("fmt", sorted(WRITERS))
+@pytest.mark.parametrize("variant", range(VARIANT_COUNT))
+@pytest.mark.parametrize("size", (5000, 40000))
+def test_synthetic_documents_match_baseline(tmp_path, fmt, variant, size):
+    path = write_document(generate_paragraphs(size, seed=size, variant=variant), tmp_path / f"doc.{fmt}", fmt)
+    for mode in COUNT_MODES:
+        for config in CONFIGS.values():
+            expected = baseline_core.BaselinePatentAnalyzer(path, config, mode)
+            result = PatentAnalyzer(path, config_data=config, count_mode=mode).analyze()
+            assert baseline_view(result) == expected.analyze()
+            assert result["段落字数"] == [baseline_core.count_chars(p, mode) for p in expected.paragraphs]
+            check_claims(result, expected.paragraphs, mode)
+
+
+@pytest.mark.parametrize("fmt", sorted(WRITERS))
+@pytest.mark.parametrize("seed", range(40))
+def test_messy_documents_match_baseline(tmp_path, fmt, seed):
+    path = write_document(messy_paragraphs(seed), tmp_path / f"doc.{fmt}", fmt)
+    for mode in COUNT_MODES:
+        for config in CONFIGS.values():
+            expected = baseline_core.BaselinePatentAnalyzer(path, config, mode)
+            result = PatentAnalyzer(path, config_data=config, count_mode=mode).analyze()
+            assert baseline_view(result) == expected.analyze()
+            check_claims(result, expected.paragraphs, mode)
+
+
+def test_default_requirements_unchanged():
+    assert DEFAULT_REQUIREMENTS == baseline_core.DEFAULT_REQUIREMENTS
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""轻量检查命令行 (patent_check.py): 不加载重量级依赖, 以及退出码与输出。"""
+import json
+import subprocess
+import sys
+
+import patent_check
+from conftest import REPO_ROOT
+from helpers import sample_document, write_document
+
+HEAVY_MODULES = ("flask", "docx", "lxml", "yaml")
+# 没有章节标题的文档: 各章节未识别, 只检查总字数
+UNSTRUCTURED = ["一种散热装置，包括壳体和风扇。", "所述风扇为轴流风扇。"]
+
+
+def _loaded_modules(code):
+    script = f"import sys; {code}; sys.stderr.write(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True,
+                          check=True).stderr.split()
+
+
+def test_checking_a_text_file_loads_no_heavy_modules(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(sample_document())
+    config = tmp_path / "rules.json"
+    config.write_text(json.dumps({"总字数": {"min": 1}}), encoding="utf-8")
+    assert _loaded_modules("import patent_analyzer_core") == []
+    assert _loaded_modules(f"import patent_check; patent_check.main([{str(path)!r}, '-c', {str(config)!r}, '-q'])") == []
+
+
+def test_exit_codes_and_output(tmp_path, capsys):
+    txt = write_document(UNSTRUCTURED, tmp_path / "a.txt", "txt")
+    docx = write_document(UNSTRUCTURED, tmp_path / "a.docx", "docx")
+    lenient = tmp_path / "lenient.json"
+    lenient.write_text(json.dumps({"总字数": {"min": 1, "max": 100}}), encoding="utf-8")
+    assert patent_check.main([str(txt), str(docx), "-c", str(lenient), "-q"]) == 0
+    assert capsys.readouterr().out == ""
+    assert patent_check.main([str(txt), "-c", str(lenient)]) == 0
+    assert capsys.readouterr().out == f"{txt}: 通过 (总字数 22)\n"
+
+    assert patent_check.main([str(txt), "-c", str(lenient), "--fail-on-missing", "-q"]) == 1
+    out = capsys.readouterr().out
+    assert out.startswith(f"{txt}: 不通过 (总字数 22)\n") and "  ✗ 权利要求书" in out
+    assert patent_check.main([str(txt), "-q"]) == 1  # 默认配置要求总字数不少于 9000
+    assert "  ✗ 总字数" in capsys.readouterr().out
+
+    assert patent_check.main([str(txt), str(tmp_path / "missing.txt"), "-c", str(lenient)]) == 2
+    assert "无法分析" in capsys.readouterr().err
+
+
+def test_invalid_config_exits_with_2(tmp_path, capsys):
+    txt = write_document(UNSTRUCTURED, tmp_path / "a.txt", "txt")
+    broken = tmp_path / "broken.yaml"
+    broken.write_text("总字数: [1, 2\n", encoding="utf-8")
+    assert patent_check.main([str(txt), "-c", str(broken)]) == 2
+    assert "无法加载配置文件" in capsys.readouterr().err
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""结果缓存: 两级存储、缓存键, 以及 Web 层命中缓存时的结果与指标。"""
+import io
+import time
+
+import metrics
+from helpers import sample_document
+from result_cache import AnalysisResultCache, make_cache_key
+
+
+def post_api(client, document, name="a.txt", **form):
+    response = client.post("/api/analyze", data=dict(form, patent_file=(io.BytesIO(document), name)))
+    assert response.status_code == 202
+    return client.get(response.get_json()["status_url"]).get_json()
+
+
+def wait_done(client, status):
+    while status["status"] not in ("done", "failed", "timeout"):
+        time.sleep(0.01)
+        status = client.get(f"/api/jobs/{status['job_id']}").get_json()
+    return status
+
+
+def test_cache_hit_has_no_stale_timings_and_counts_as_hit(make_web_app):
+    web = make_web_app()
+    client = web.app.test_client()
+    document = sample_document()
+    first = wait_done(client, post_api(client, document))
+    assert first["status"] == "done" and "cached" not in first
+    assert set(first["result"]["阶段耗时"]) >= {"load", "extract", "count", "check"}
+
+    analyses = metrics.ANALYSIS_SECONDS.count()
+    stage_counts = {stage: metrics.STAGE_SECONDS.count(stage) for stage in metrics.STAGES}
+    hit = post_api(client, document, name="renamed.txt")
+    assert hit["status"] == "done" and hit["cached"] is True
+    assert hit["result"]["文件名"] == "renamed.txt"
+    assert "阶段耗时" not in hit["result"]
+    assert {key: value for key, value in hit["result"].items() if key != "文件名"} == \
+        {key: value for key, value in first["result"].items() if key not in ("文件名", "阶段耗时")}
+    # 命中只计入缓存统计, 不再计入分析阶段的直方图
+    assert web.result_cache.stats()["hits"] == 1
+    assert 'patent_result_cache_lookups_total{result="hit"} 1' in client.get("/metrics").get_data(as_text=True)
+    assert metrics.ANALYSIS_SECONDS.count() == analyses
+    assert {stage: metrics.STAGE_SECONDS.count(stage) for stage in metrics.STAGES} == stage_counts
+
+
+def test_form_result_page_on_cache_hit_only_times_the_report(make_web_app):
+    web = make_web_app()
+    client = web.app.test_client()
+    document = sample_document(seed=3)
+    for _ in range(2):
+        location = client.post("/", data={"patent_file": (io.BytesIO(document), "a.txt")}).headers["Location"]
+    result = web.result_store.load(location.rsplit("/", 1)[1])
+    assert set(result["阶段耗时"]) == {"report"}
+
+
+def test_memory_layer_returns_copies_and_evicts_by_size():
+    cache = AnalysisResultCache(max_memory_bytes=200)
+    cache.put("a", {"总字数": 1, "文本": "甲" * 20})
+    first = cache.get("a")
+    first["总字数"] = 99
+    assert cache.get("a")["总字数"] == 1  # 每次命中都是新的字典
+    cache.put("b", {"文本": "乙" * 40})
+    cache.put("c", {"文本": "丙" * 40})  # 超出容量, 淘汰最久未使用的 a
+    assert cache.get("a") is None and cache.get("c") is not None
+    cache.put("huge", {"文本": "丁" * 500})  # 单个结果超过容量时不放入内存层
+    assert cache.get("huge") is None
+    stats = cache.stats()
+    assert stats["memory_bytes"] <= 200
+    assert (stats["hits"], stats["misses"]) == (3, 2)
+
+
+def test_disk_layer_survives_restart_and_ignores_corrupt_files(tmp_path):
+    AnalysisResultCache(disk_dir=tmp_path).put("key", {"总字数": 5})
+    restarted = AnalysisResultCache(disk_dir=tmp_path)
+    assert restarted.get("key") == {"总字数": 5}
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.get("key") == {"总字数": 5} and restarted.stats()["memory_hits"] == 1
+
+    corrupt = AnalysisResultCache(disk_dir=tmp_path)
+    corrupt._disk_path("key").write_bytes(b"{not json")
+    assert corrupt.get("key") is None
+
+
+def test_cache_key_covers_config_and_mode():
+    sha = "0" * 64
+    config = {"权利要求书": {"min": 10, "max": 500}, "附录": {"max": 50}}
+    assert make_cache_key(sha, config, "chinese") == make_cache_key(sha, dict(config), "chinese")
+    assert make_cache_key(sha, config, "chinese") != make_cache_key(sha, config, "word")
+    assert make_cache_key(sha, config, "chinese") != make_cache_key(sha, {"附录": {"max": 51}}, "chinese")
+    assert make_cache_key(sha, None, "chinese") != make_cache_key("1" * 64, None, "chinese")
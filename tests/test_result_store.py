@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""服务端结果存储: 滑动过期、按字节数淘汰、共享目录存储, 以及会话中只保存结果 ID。"""
+import io
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import result_store
+from helpers import sample_document
+from result_store import DirectoryResultStore, ResultStore
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(result_store, "time", SimpleNamespace(monotonic=fake, time=fake))
+    return fake
+
+
+def test_memory_store_returns_copies():
+    store = ResultStore()
+    result_id = store.save({"总字数": 1, "各部分": {"摘要": 1}})
+    first = store.load(result_id)
+    first["各部分"]["摘要"] = 99
+    assert store.load(result_id) == {"总字数": 1, "各部分": {"摘要": 1}}
+    assert store.load("missing") is None
+
+
+def test_memory_store_expiry_slides_on_access(clock):
+    store = ResultStore(ttl_seconds=10)
+    kept, dropped = store.save({"n": 1}), store.save({"n": 2})
+    clock.now += 8
+    assert store.load(kept) == {"n": 1}
+    clock.now += 8  # kept 在 8 秒前读取过, dropped 已超过 16 秒
+    assert store.load(dropped) is None
+    assert store.load(kept) == {"n": 1}
+    assert store.stats()["entries"] == 1 and store.expirations == 1
+
+
+def test_memory_store_evicts_least_recently_used_by_size():
+    payload = {"文本": "甲" * 30}
+    size = len('{"文本": ""}'.encode("utf-8")) + 90
+    store = ResultStore(max_memory_bytes=size * 2)
+    first, second = store.save(payload), store.save(payload)
+    store.load(first)
+    third = store.save(payload)
+    assert store.load(second) is None
+    assert store.load(first) == payload and store.load(third) == payload
+    assert store.stats()["memory_bytes"] == size * 2 and store.evictions == 1
+    with pytest.raises(ValueError):
+        store.save({"文本": "甲" * 100})
+    # 以同一 ID 再次保存时替换原条目
+    store.save({"n": 1}, result_id=first)
+    assert store.load(first) == {"n": 1}
+
+
+def test_directory_store_is_shared_between_instances(tmp_path):
+    writer = DirectoryResultStore(str(tmp_path), ttl_seconds=60)
+    reader = DirectoryResultStore(str(tmp_path), ttl_seconds=60)
+    result_id = writer.save({"总字数": 3})
+    assert reader.load(result_id) == {"总字数": 3}
+    assert reader.stats()["entries"] == 1
+    assert [name for name in os.listdir(tmp_path) if not name.endswith(".json")] == []
+
+
+def test_directory_store_rejects_unsafe_ids(tmp_path):
+    store = DirectoryResultStore(str(tmp_path / "results"))
+    (tmp_path / "secret.json").write_text('{"x": 1}', encoding="utf-8")
+    assert store.load("../secret") is None
+    assert store.load("") is None
+    with pytest.raises(ValueError):
+        store.save({"x": 1}, result_id="../secret")
+
+
+def test_directory_store_expires_by_modification_time(tmp_path):
+    store = DirectoryResultStore(str(tmp_path), ttl_seconds=60)
+    old, fresh = store.save({"n": 1}), store.save({"n": 2})
+    stale = time.time() - 120
+    os.utime(tmp_path / f"{old}.json", (stale, stale))
+    assert store.load(old) is None
+    assert store.load(fresh) == {"n": 2}
+    store._last_purge = 0.0
+    assert store.stats()["entries"] == 1 and store.expirations == 1
+
+
+@pytest.mark.parametrize("use_directory", (False, True))
+def test_session_only_keeps_the_result_id(make_web_app, tmp_path, use_directory):
+    web = make_web_app(RESULT_STORE_DIR=str(tmp_path / "results") if use_directory else None)
+    client = web.app.test_client()
+    response = client.post("/", data={"patent_file": (io.BytesIO(sample_document()), "a.txt")})
+    result_id = response.headers["Location"].rsplit("/", 1)[1]
+    with client.session_transaction() as session:
+        assert session["analysis_result_id"] == result_id
+        assert set(session) <= {"analysis_result_id", "_flashes"}
+    assert web.result_store.load(result_id)["文件名"] == "a.txt"
+    assert client.get("/results").headers["Location"].endswith(f"/results/{result_id}")
+
+    # 结果链接可以分享: 另一个会话也能打开
+    page = web.app.test_client().get(f"/results/{result_id}")
+    assert page.status_code == 200 and "a.txt" in page.get_data(as_text=True)
+
+
+def test_missing_result_redirects_and_clears_session(make_web_app):
+    web = make_web_app()
+    client = web.app.test_client()
+    with client.session_transaction() as session:
+        session["analysis_result_id"] = "gone"
+    response = client.get("/results/gone")
+    assert response.status_code == 302 and response.headers["Location"].endswith("/")
+    with client.session_transaction() as session:
+        assert "analysis_result_id" not in session
+    assert client.get("/results").headers["Location"].endswith("/")
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""revision_tracker: 增量分析与整篇重新分析一致, 段落缓存在编译缓存淘汰后仍可使用。"""
+import random
+
+import pytest
+
+import baseline_core
+from helpers import baseline_view, messy_body, spaced, without, write_document
+from patent_analyzer_core import COUNT_MODES, ParagraphCache, PatentAnalyzer, get_rule_plan
+from revision_tracker import RevisionTracker
+from synthetic_patents import generate_paragraphs
+
+
+def _revise(rng, paragraphs):
+    paragraphs = list(paragraphs)
+    for _ in range(rng.randint(1, 4)):
+        position = rng.randrange(len(paragraphs) + 1)
+        action = rng.random()
+        if action < 0.4 and position < len(paragraphs):
+            paragraphs[position] = paragraphs[position] + messy_body(rng)
+        elif action < 0.6 and position < len(paragraphs):
+            del paragraphs[position]
+        elif action < 0.8:
+            paragraphs.insert(position, messy_body(rng))
+        else:
+            paragraphs.insert(position, spaced(rng, rng.choice(("技术领域", "权利要求书", "附图说明", "摘要"))))
+    return paragraphs
+
+
+@pytest.mark.parametrize("mode", COUNT_MODES)
+def test_revisions_match_fresh_analysis(tmp_path, mode):
+    rng = random.Random(mode)
+    tracker = RevisionTracker(count_mode=mode)
+    paragraphs = generate_paragraphs(20000, seed=3)
+    for revision in range(15):
+        path = write_document(paragraphs, tmp_path / f"rev{revision}.txt", "txt")
+        result = tracker.analyze(str(path))
+        assert without(result, "修订变化") == without(PatentAnalyzer(path, count_mode=mode).analyze())
+        assert baseline_view(result) == baseline_core.BaselinePatentAnalyzer(path, None, mode).analyze()
+        paragraphs = _revise(rng, paragraphs)
+
+
+def test_revision_changes_and_reuse(tmp_path):
+    tracker = RevisionTracker()
+    paragraphs = generate_paragraphs(5000, seed=1)
+    first = tracker.analyze(str(write_document(paragraphs, tmp_path / "v1.txt", "txt")))["修订变化"]
+    assert first["版本"] == 1 and first["复用段落数"] == 0
+    assert first["总字数"]["之前"] is None
+
+    paragraphs = paragraphs + ["新增的一段说明文字。"]
+    second = tracker.analyze(str(write_document(paragraphs, tmp_path / "v2.txt", "txt")))["修订变化"]
+    assert second["版本"] == 2 and second["上一版本文件名"] == "v1.txt"
+    assert second["重新计算段落数"] == 1 and second["复用段落数"] == len(paragraphs) - 1
+    assert second["总字数"]["变化"] == 9
+
+
+@pytest.mark.parametrize("config", (None, {"附录": {"max": 50, "heading_patterns": ["^附录$"]}}))
+def test_tracker_survives_compiled_cache_eviction(tmp_path, config):
+    tracker = RevisionTracker(config)
+    path = write_document(generate_paragraphs(5000, seed=2), tmp_path / "doc.txt", "txt")
+    expected = tracker.analyze(str(path))
+    # 编译缓存 (规则计划 64 项, 标题识别器 32 项) 被其他配置挤满, 跟踪器的识别器已被淘汰
+    for k in range(70):
+        get_rule_plan({f"章节{k}": {"max": k, "heading_patterns": [f"^章节{k}$"]}})
+    assert get_rule_plan(config).heading_matcher is not tracker.paragraph_cache.heading_matcher
+    result = tracker.analyze(str(path))
+    assert without(result, "修订变化") == without(expected, "修订变化")
+    assert result["修订变化"]["重新计算段落数"] == 0
+
+
+def test_paragraph_cache_rejects_other_config(tmp_path):
+    path = write_document(["权利要求书", "1. 一种装置。"], tmp_path / "doc.txt", "txt")
+    cache = ParagraphCache(get_rule_plan({"附录": {"heading_patterns": "^附录$"}}).heading_matcher)
+    with pytest.raises(ValueError):
+        PatentAnalyzer(path, paragraph_cache=cache)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""规则计划的编译与缓存: 配置文本按 sha256 缓存, 键必须是字符串。"""
+import pytest
+
+import patent_analyzer_core
+from patent_analyzer_core import ConfigError, compile_config_text, get_rule_plan
+
+CONFIG_YAML = """
+权利要求书:
+  min: 10
+  max: 500
+附录:
+  max: 50
+  heading_patterns: "^附录$"
+"""
+
+
+def test_config_text_is_parsed_once_and_not_kept():
+    text = CONFIG_YAML + "# " + "x" * 100000 + "\n"
+    config_data, plan = compile_config_text(text)
+    again, plan_again = compile_config_text(text.encode("utf-8"))
+    assert again == config_data and plan_again is plan
+    config_data["附录"]["max"] = 1  # 返回的是副本
+    assert compile_config_text(text)[0]["附录"]["max"] == 50
+    # 缓存只保存解析结果, 键是摘要而不是文本本身
+    for key, parsed in patent_analyzer_core._PARSED_CONFIG_TEXTS.items():
+        assert len(key[1]) == 32
+        assert parsed[0] is not text and not isinstance(parsed[0], (str, bytes))
+
+
+def test_config_text_cache_is_bounded():
+    for k in range(patent_analyzer_core._PARSED_CONFIG_TEXTS_MAX + 10):
+        compile_config_text(f"附录{k}:\n  max: {k}\n")
+    assert len(patent_analyzer_core._PARSED_CONFIG_TEXTS) == patent_analyzer_core._PARSED_CONFIG_TEXTS_MAX
+
+
+def test_equal_configs_share_a_plan():
+    assert get_rule_plan({"附录": {"max": 50}}) is get_rule_plan({"附录": {"max": 50}})
+    assert get_rule_plan({}) is get_rule_plan(None)
+
+
+@pytest.mark.parametrize("config", [
+    {1: {"max": 5}},
+    {"附录": {"max": 50, 2: 3}},
+    {"附录": {"heading_patterns": [{1: "x"}]}},
+])
+def test_non_string_keys_are_rejected(config):
+    with pytest.raises(ConfigError, match="不是字符串"):
+        get_rule_plan(config)
+
+
+def test_numeric_yaml_key_is_not_confused_with_string_key():
+    assert get_rule_plan({"1": {"max": 5}}).sections
+    with pytest.raises(ConfigError):
+        compile_config_text("1:\n  max: 5\n")
+    assert compile_config_text('"1":\n  max: 5\n')[1] is get_rule_plan({"1": {"max": 5}})
+
+
+def test_invalid_config_text():
+    with pytest.raises(ConfigError):
+        compile_config_text("- 只是一个列表\n")
+    with pytest.raises(ConfigError):
+        compile_config_text("附录:\n  max: 很多\n")
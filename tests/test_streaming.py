@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""流式分析 (StreamingTextAnalyzer) 与整篇读入内存的分析结果一致, 与分块大小无关。"""
+import random
+
+import pytest
+
+import baseline_core
+from helpers import baseline_view, messy_body, messy_paragraphs, sample_document, without, write_document
+from patent_analyzer_core import (COUNT_MODES, STREAM_LINE_LIMIT, PatentAnalyzer, StreamingTextAnalyzer,
+                                  create_analyzer)
+from synthetic_patents import VARIANT_COUNT, generate_paragraphs
+
+
+def _streaming_documents():
+    for seed in range(25):
+        yield f"messy{seed}", messy_paragraphs(seed)
+    for variant in range(VARIANT_COUNT):
+        yield f"synthetic_v{variant}", generate_paragraphs(30000, seed=7, variant=variant)
+
+
+STREAMING_DOCUMENTS = dict(_streaming_documents())
+
+
+@pytest.mark.parametrize("name", list(STREAMING_DOCUMENTS))
+def test_streaming_matches_in_memory(tmp_path, name):
+    paragraphs = STREAMING_DOCUMENTS[name]
+    assert all(len(p) < STREAM_LINE_LIMIT for p in paragraphs)  # 超长行不作为标题候选, 不在对比范围内
+    path = write_document(paragraphs, tmp_path / "doc.txt", "txt")
+    for mode in COUNT_MODES:
+        expected = PatentAnalyzer(path, count_mode=mode).analyze()
+        for chunk_chars in (7, 1000, 1 << 20):
+            streaming = StreamingTextAnalyzer(path, count_mode=mode, chunk_chars=chunk_chars).analyze()
+            assert without(streaming) == without(expected, "段落字数")
+        kept = StreamingTextAnalyzer(path, count_mode=mode, keep_paragraph_counts=True, chunk_chars=64).analyze()
+        assert list(kept["段落字数"]) == expected["段落字数"]
+
+
+def test_streaming_handles_crlf_and_blank_lines(tmp_path):
+    paragraphs = messy_paragraphs(3)
+    path = tmp_path / "crlf.txt"
+    path.write_bytes("\r\n\r\n".join(f"  {p}\t" for p in paragraphs).encode("utf-8"))
+    for mode in COUNT_MODES:
+        expected = baseline_core.BaselinePatentAnalyzer(path, None, mode).analyze()
+        assert baseline_view(StreamingTextAnalyzer(path, count_mode=mode, chunk_chars=5).analyze()) == expected
+        assert baseline_view(PatentAnalyzer(path, count_mode=mode).analyze()) == expected
+
+
+def test_long_lines_are_counted_in_pieces(tmp_path):
+    rng = random.Random(5)
+    paragraphs = messy_paragraphs(4)
+    long_line = "".join(messy_body(rng) for _ in range(3 * STREAM_LINE_LIMIT // 20))
+    assert len(long_line) > 2 * STREAM_LINE_LIMIT
+    paragraphs[len(paragraphs) // 2:len(paragraphs) // 2] = [long_line, long_line[:STREAM_LINE_LIMIT + 1]]
+    path = write_document(paragraphs, tmp_path / "doc.txt", "txt")
+    for mode in COUNT_MODES:
+        expected = PatentAnalyzer(path, count_mode=mode).analyze()
+        for chunk_chars in (1000, STREAM_LINE_LIMIT + 7):
+            streaming = StreamingTextAnalyzer(path, count_mode=mode, keep_paragraph_counts=True,
+                                              chunk_chars=chunk_chars).analyze()
+            assert without(streaming) == without(expected)
+
+
+def test_create_analyzer_streams_only_large_text_files(tmp_path):
+    document = sample_document()
+    path = tmp_path / "doc.txt"
+    path.write_bytes(document)
+    assert type(create_analyzer(str(path), streaming_threshold=len(document) - 1)) is StreamingTextAnalyzer
+    assert type(create_analyzer(str(path), streaming_threshold=len(document))) is PatentAnalyzer
+    assert type(create_analyzer(document, filename="a.txt", streaming_threshold=0)) is StreamingTextAnalyzer
+    docx = write_document(generate_paragraphs(5000), tmp_path / "doc.docx", "docx")
+    assert type(create_analyzer(str(docx), streaming_threshold=0)) is PatentAnalyzer
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""上传文件的内存分析: 内存内容与文件路径的分析结果一致, 接收缓冲按阈值溢出到磁盘并同时计算哈希。"""
+import hashlib
+import io
+import os
+
+import pytest
+from flask import request
+from werkzeug.datastructures import FileStorage
+
+from helpers import WRITERS, sample_document, without, write_document
+from patent_analyzer_core import PatentAnalyzer
+from synthetic_patents import generate_paragraphs
+
+
+class NonSeekable(io.RawIOBase):
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+
+@pytest.mark.parametrize("fmt", sorted(WRITERS))
+def test_in_memory_sources_match_the_file(tmp_path, fmt):
+    path = write_document(generate_paragraphs(5000, seed=2), tmp_path / f"doc.{fmt}", fmt)
+    expected = PatentAnalyzer(str(path)).analyze()
+    data = path.read_bytes()
+    name = path.name
+    sources = [data, bytearray(data), memoryview(data), NonSeekable(data)]
+    for source in sources:
+        assert without(PatentAnalyzer(source, filename=name).analyze()) == without(expected)
+    assert without(PatentAnalyzer(str(path), filename=name).analyze()) == without(expected)
+    with open(path, "rb") as f:
+        f.read(10)  # 从任意位置开始都读取整个文件
+        assert without(PatentAnalyzer(f).analyze()) == without(expected)
+        assert not f.closed  # 调用方的文件对象不被关闭
+
+
+def test_in_memory_source_needs_a_filename():
+    with pytest.raises(ValueError):
+        PatentAnalyzer(b"abc")
+    with pytest.raises(ValueError):
+        PatentAnalyzer(io.BytesIO(b"abc"))
+
+
+def _files(web, documents):
+    data = {f"f{k}": (io.BytesIO(document), f"f{k}.txt") for k, document in enumerate(documents)}
+    context = web.app.test_request_context("/", method="POST", data=data)
+    context.push()
+    return context, [request.files[f"f{k}"] for k in range(len(documents))]
+
+
+def test_small_upload_stays_in_memory_and_is_hashed(make_web_app):
+    web = make_web_app(UPLOAD_SPILL_THRESHOLD=64 * 1024)
+    document = sample_document()
+    context, (upload,) = _files(web, [document])
+    try:
+        assert not upload.stream.spilled
+        assert not os.listdir(web.app.config["UPLOAD_SPILL_DIR"])
+        assert web.upload_size_and_sha256(upload) == (len(document), hashlib.sha256(document).hexdigest())
+        assert upload.stream.read() == document  # 读完后回到开头
+    finally:
+        context.pop()
+
+
+def test_upload_over_threshold_spills_to_disk(make_web_app):
+    web = make_web_app(UPLOAD_SPILL_THRESHOLD=1024)
+    document = sample_document()
+    context, (upload,) = _files(web, [document])
+    try:
+        assert upload.stream.spilled
+        assert web.upload_size_and_sha256(upload) == (len(document), hashlib.sha256(document).hexdigest())
+    finally:
+        context.pop()
+
+
+def test_large_request_spills_every_file(make_web_app):
+    # 每个文件都小于阈值, 但整个请求体超过阈值
+    web = make_web_app(UPLOAD_SPILL_THRESHOLD=16 * 1024)
+    documents = [sample_document(4000, seed=k) for k in range(6)]
+    assert all(len(document) < 16 * 1024 for document in documents)
+    context, uploads = _files(web, documents)
+    try:
+        assert all(upload.stream.spilled for upload in uploads)
+        for upload, document in zip(uploads, documents):
+            assert web.upload_size_and_sha256(upload)[1] == hashlib.sha256(document).hexdigest()
+    finally:
+        context.pop()
+
+
+def test_hash_of_other_streams_is_computed_by_reading(make_web_app):
+    web = make_web_app()
+    upload = FileStorage(io.BytesIO(b"abcdef"), filename="a.txt")
+    upload.stream.seek(3)
+    assert web.upload_size_and_sha256(upload, chunk_size=4) == (6, hashlib.sha256(b"abcdef").hexdigest())
+    assert upload.stream.tell() == 0
+
+
+@pytest.mark.parametrize("threshold", (1024, 4 * 1024 * 1024))
+def test_form_upload_leaves_no_files_behind(make_web_app, threshold):
+    web = make_web_app(UPLOAD_SPILL_THRESHOLD=threshold)
+    document = sample_document(seed=5)
+    client = web.app.test_client()
+    location = client.post("/", data={"patent_file": (io.BytesIO(document), "a.txt")}).headers["Location"]
+    result = web.result_store.load(location.rsplit("/", 1)[1])
+    expected = PatentAnalyzer(document, filename="a.txt").analyze()
+    assert without(result, "config_source", "applied_config", "plain_text_report") == without(expected)
+    assert not os.listdir(web.app.config["UPLOAD_SPILL_DIR"])
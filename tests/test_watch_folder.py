@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""监视文件夹: 等文件写完再分析、台账跳过已处理的文件、内容未变时不重新分析, 以及结果输出。"""
+import json
+import os
+
+import pytest
+
+import watch_folder
+from corpus_store import CorpusStore
+from helpers import CUSTOM_CONFIG, sample_document, without
+from patent_analyzer_core import PatentAnalyzer
+from watch_folder import FolderWatcher, Ledger
+
+
+@pytest.fixture
+def drafts(tmp_path):
+    folder = tmp_path / "drafts"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "a.txt").write_bytes(sample_document(seed=1))
+    (folder / "sub" / "b.txt").write_bytes(sample_document(seed=2))
+    (folder / "~$a.docx").write_bytes(b"Word lock file")
+    (folder / ".hidden.txt").write_bytes(b"ignored")
+    (folder / "notes.md").write_text("忽略", encoding="utf-8")
+    return folder
+
+
+def _watcher(tmp_path, folder, **kwargs):
+    kwargs.setdefault("output_dir", str(tmp_path / "out"))
+    return FolderWatcher([str(folder)], ledger_path=str(tmp_path / "ledger.sqlite3"), workers=1,
+                         settle_seconds=2.0, **kwargs)
+
+
+def _touch(path, offset_ns):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + offset_ns))
+
+
+def test_files_are_analyzed_once_settled(tmp_path, drafts):
+    watcher = _watcher(tmp_path, drafts)
+    try:
+        assert watcher.poll_once(now=0.0) == 0  # 第一次看到, 等待文件写完
+        assert watcher.poll_once(now=1.0) == 0
+        assert watcher.poll_once(now=2.0) == 2
+        assert watcher.stats == {"analyzed": 2, "unchanged": 0, "failed": 0}
+        assert watcher.poll_once(now=10.0) == 0
+    finally:
+        watcher.close()
+    output = tmp_path / "out" / "drafts" / "sub" / "b.txt.json"
+    record = json.loads(output.read_text(encoding="utf-8"))
+    assert record["ok"] and without(record["result"]) == without(PatentAnalyzer(str(drafts / "sub" / "b.txt")).analyze())
+    assert sorted(path.name for path in (tmp_path / "out" / "drafts").rglob("*.json")) == ["a.txt.json", "b.txt.json"]
+
+
+def test_file_still_being_written_waits(tmp_path, drafts):
+    watcher = _watcher(tmp_path, drafts)
+    try:
+        watcher.poll_once(now=0.0)
+        with open(drafts / "a.txt", "ab") as f:
+            f.write("\n仍在写入。".encode("utf-8"))
+        assert watcher.poll_once(now=2.0) == 1  # 只有 b.txt
+        assert watcher.poll_once(now=3.0) == 0
+        assert watcher.poll_once(now=4.0) == 1
+    finally:
+        watcher.close()
+
+
+def test_restart_skips_processed_and_unchanged_files(tmp_path, drafts):
+    watcher = _watcher(tmp_path, drafts)
+    watcher.poll_once(now=0.0)
+    watcher.poll_once(now=2.0)
+    watcher.close()
+
+    # 只修改时间变化: 计算哈希后跳过; 内容变化: 重新分析
+    _touch(drafts / "a.txt", 10**9)
+    (drafts / "sub" / "b.txt").write_bytes(sample_document(seed=3))
+    restarted = _watcher(tmp_path, drafts)
+    try:
+        restarted.poll_once(now=0.0)
+        assert restarted.poll_once(now=2.0) == 2
+        assert restarted.stats == {"analyzed": 1, "unchanged": 1, "failed": 0}
+        assert restarted.poll_once(now=4.0) == 0
+    finally:
+        restarted.close()
+    ledger = Ledger(str(tmp_path / "ledger.sqlite3"))
+    try:
+        row = ledger.get(str(drafts / "a.txt"))
+        assert row[0] == os.stat(drafts / "a.txt").st_mtime_ns and row[4] == 1
+    finally:
+        ledger.close()
+
+
+def test_changed_config_reanalyzes_everything(tmp_path, drafts):
+    for config, expected in ((None, 2), (None, 0), (CUSTOM_CONFIG, 2)):
+        watcher = _watcher(tmp_path, drafts, config_data=config)
+        try:
+            watcher.poll_once(now=0.0)
+            assert watcher.poll_once(now=2.0) == expected
+            assert watcher.stats["analyzed"] == expected
+        finally:
+            watcher.close()
+
+
+def test_failures_are_recorded_and_batches_are_limited(tmp_path, drafts):
+    (drafts / "broken.docx").write_bytes(b"not a zip file")
+    corpus = CorpusStore(str(tmp_path / "corpus"))
+    watcher = _watcher(tmp_path, drafts, output_dir=None, corpus=corpus, batch_size=2)
+    try:
+        watcher.poll_once(now=0.0)
+        assert watcher.poll_once(now=2.0) == 2
+        assert watcher.poll_once(now=3.0) == 1
+        assert watcher.stats == {"analyzed": 2, "unchanged": 0, "failed": 1}
+    finally:
+        watcher.close()
+    assert len(CorpusStore(str(tmp_path / "corpus"))) == 2
+    ledger = Ledger(str(tmp_path / "ledger.sqlite3"))
+    try:
+        assert ledger.get(str(drafts / "broken.docx"))[4] == 0
+    finally:
+        ledger.close()
+
+
+def test_cli_once(tmp_path, drafts, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    argv = [str(drafts), "--output-dir", "out", "--settle", "0", "--interval", "0", "--once", "-w", "1"]
+    assert watch_folder.main(argv) == 0
+    assert (tmp_path / "out" / "drafts" / "a.txt.json").exists()
+    assert (tmp_path / "watch_ledger.sqlite3").exists()
+    with pytest.raises(SystemExit):
+        watch_folder.main([str(drafts)])  # 缺少输出目标
+    with pytest.raises(SystemExit):
+        watch_folder.main([str(tmp_path / "missing"), "--output-dir", "out"])
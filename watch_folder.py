@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""监视共享文件夹, 自动分析新增或修改过的 .txt/.docx 文档。
+
+- 定时轮询目录 (--interval), 文件大小和修改时间在 --settle 秒内不再变化才视为写完;
+  Word 的锁文件 (~$ 开头) 和隐藏文件被忽略。
+- SQLite 台账记录每个文件的 (路径, 修改时间, 大小, 内容 sha256, 配置指纹)。重启后
+  修改时间、大小与配置都未变的文件直接跳过; 只是修改时间变化而内容未变的文件
+  在工作进程中算完哈希即返回, 不再分析。
+- 分析在固定大小的进程池中执行 (默认 CPU 核数的一半), 每轮最多提交 --batch 个文件。
+- 结果写入 --output-dir (按原目录结构, 每个文档一个 .json) 和/或 --corpus 统计库。
+
+用法示例:
+    python watch_folder.py //share/drafts --output-dir results/ --corpus corpus/ -c 配置.yaml
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from multiprocessing import Pool
+
+import yaml
+
+import batch_analyze
+from batch_analyze import SUPPORTED_EXTENSIONS, load_config_file
+from corpus_store import CorpusStore
+from patent_analyzer_core import COUNT_MODES, get_rule_plan
+
+logger = logging.getLogger('flask.app')
+
+_HASH_CHUNK = 1 << 20
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _process_file(task):
+    """工作进程: 计算内容哈希, 与台账中的哈希相同则不再分析。"""
+    path, known_sha256 = task
+    try:
+        sha256 = file_sha256(path)
+    except OSError as e:
+        return {"path": path, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    if sha256 == known_sha256:
+        return {"path": path, "ok": True, "sha256": sha256, "unchanged": True}
+    record = batch_analyze.analyze_file(path)
+    record["sha256"] = sha256
+    return record
+
+
+class Ledger:
+    """已处理文件台账 (SQLite)。"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, sha256 TEXT, config_hash TEXT,"
+            " ok INTEGER, error TEXT, processed_at REAL)"
+        )
+        self.conn.commit()
+
+    def get(self, path):
+        """返回 (mtime_ns, size, sha256, config_hash, ok), 没有记录时返回 None。"""
+        return self.conn.execute("SELECT mtime_ns, size, sha256, config_hash, ok FROM processed WHERE path = ?",
+                                 (path,)).fetchone()
+
+    def record(self, path, mtime_ns, size, sha256, config_hash, ok, error=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO processed (path, mtime_ns, size, sha256, config_hash, ok, error, processed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, mtime_ns, size, sha256, config_hash, int(ok), error, time.time()),
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def _is_candidate(name):
+    return name.lower().endswith(SUPPORTED_EXTENSIONS) and not name.startswith(("~$", "."))
+
+
+def scan_directories(directories):
+    """返回 {绝对路径: (mtime_ns, size)}。"""
+    found = {}
+    stack = [os.path.abspath(d) for d in directories]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            logger.warning("无法读取目录 %s: %s", directory, e)
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith("."):
+                        stack.append(entry.path)
+                elif _is_candidate(entry.name) and entry.is_file():
+                    st = entry.stat()
+                    found[entry.path] = (st.st_mtime_ns, st.st_size)
+            except OSError:  # 扫描期间被删除或改名
+                continue
+    return found
+
+
+class FolderWatcher:
+    def __init__(self, directories, config_data=None, count_mode="chinese", ledger_path="watch_ledger.sqlite3",
+                 output_dir=None, corpus=None, workers=None, settle_seconds=2.0, batch_size=200):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.config_data = config_data
+        self.count_mode = count_mode
+        self.config_hash = f"{get_rule_plan(config_data).fingerprint}:{count_mode}"
+        self.ledger = Ledger(ledger_path)
+        self.output_dir = output_dir
+        self.corpus = corpus
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self._pending = {}  # 路径 -> ((mtime_ns, size), 首次看到该状态的时间)
+        self._pool = None
+        self.stats = {"analyzed": 0, "unchanged": 0, "failed": 0}
+
+    def _ready_files(self, now):
+        """本轮需要处理的文件: [(路径, (mtime_ns, size), 台账中的 sha256)]。"""
+        current = scan_directories(self.directories)
+        for path in list(self._pending):
+            if path not in current:
+                del self._pending[path]
+        ready = []
+        for path, signature in current.items():
+            row = self.ledger.get(path)
+            if row is not None and tuple(row[:2]) == signature and row[3] == self.config_hash:
+                self._pending.pop(path, None)
+                continue
+            seen = self._pending.get(path)
+            if seen is None or seen[0] != signature:
+                self._pending[path] = (signature, now)  # 新出现或仍在写入
+                continue
+            if now - seen[1] >= self.settle_seconds:
+                # 上次分析成功且配置相同时, 内容哈希未变即可跳过
+                known_sha256 = row[2] if row is not None and row[3] == self.config_hash and row[4] else None
+                ready.append((path, signature, known_sha256))
+        return ready[:self.batch_size] # 其余文件留在 _pending 中, 下一轮处理
+
+    def poll_once(self, now=None):
+        """扫描一次并处理已稳定的文件, 返回本轮处理的文件数。"""
+        ready = self._ready_files(time.monotonic() if now is None else now)
+        if not ready:
+            return 0
+        signatures = {path: signature for path, signature, _ in ready}
+        tasks = [(path, known_sha256) for path, _, known_sha256 in ready]
+        if self._pool is None:
+            self._pool = Pool(self.workers, initializer=batch_analyze._init_worker,
+                              initargs=(self.config_data, self.count_mode))
+        for record in self._pool.imap_unordered(_process_file, tasks):
+            self._handle(record, signatures[record["path"]])
+        self.ledger.commit()
+        if self.corpus is not None:
+            self.corpus.flush()
+        return len(ready)
+
+    def _handle(self, record, signature):
+        path = record["path"]
+        self._pending.pop(path, None)
+        if record.get("unchanged"):
+            self.stats["unchanged"] += 1
+        elif record["ok"]:
+            self.stats["analyzed"] += 1
+            if self.output_dir:
+                self._write_output(path, record)
+            if self.corpus is not None:
+                self.corpus.append(record["result"], self.config_data, source=path)
+            logger.info("已分析: %s (%.2f s)", path, record.get("elapsed_s", 0))
+        else:
+            self.stats["failed"] += 1
+            logger.error("分析失败: %s: %s", path, record["error"])
+        self.ledger.record(path, signature[0], signature[1], record.get("sha256"), self.config_hash,
+                           record["ok"], record.get("error"))
+
+    def _write_output(self, path, record):
+        relative = None
+        for directory in self.directories:
+            if os.path.commonpath([directory, path]) == directory:
+                relative = os.path.join(os.path.basename(directory), os.path.relpath(path, directory))
+                break
+        target = os.path.join(self.output_dir, (relative or os.path.basename(path)) + ".json")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = target + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, target)
+
+    def run(self, interval=5.0, once=False):
+        try:
+            while True:
+                start = time.monotonic()
+                processed = self.poll_once(start)
+                if once and not self._pending:
+                    break
+                # 一轮处理满 batch_size 时立即继续, 否则等到下一个轮询周期
+                if processed < self.batch_size:
+                    time.sleep(max(0.0, interval - (time.monotonic() - start)))
+        finally:
+            self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self.corpus is not None:
+            self.corpus.close()
+        self.ledger.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="监视文件夹, 自动分析新增或修改过的 .txt/.docx 文档。")
+    parser.add_argument("directories", nargs="+", help="要监视的目录 (递归)")
+    parser.add_argument("-c", "--config", help="YAML 字数要求配置文件 (默认使用内置配置)")
+    parser.add_argument("-m", "--count-mode", choices=COUNT_MODES, default="chinese", help="字数统计模式")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="工作进程数 (默认 CPU 核数的一半)")
+    parser.add_argument("--ledger", default="watch_ledger.sqlite3", help="已处理文件台账 (SQLite) 路径")
+    parser.add_argument("--output-dir", help="每个文档的分析结果 (.json) 输出目录")
+    parser.add_argument("--corpus", help="把结果追加到该目录的字数统计库 (见 corpus_store.py)")
+    parser.add_argument("--interval", type=float, default=5.0, help="轮询间隔秒数 (默认 5)")
+    parser.add_argument("--settle", type=float, default=2.0, help="文件在该秒数内无变化才视为写完 (默认 2)")
+    parser.add_argument("--batch", type=int, default=200, help="每轮最多处理的文件数 (默认 200)")
+    parser.add_argument("--once", action="store_true", help="处理完当前已有的文件后退出")
+    parser.add_argument("--log-level", default="INFO", choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if not args.output_dir and not args.corpus:
+        parser.error("至少需要指定 --output-dir 或 --corpus 之一")
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            parser.error(f"目录不存在: {directory}")
+    try:
+        config_data = load_config_file(args.config)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        parser.error(f"无法加载配置文件: {e}")
+
+    watcher = FolderWatcher(args.directories, config_data, args.count_mode, ledger_path=args.ledger,
+                            output_dir=args.output_dir, corpus=CorpusStore(args.corpus) if args.corpus else None,
+                            workers=args.workers, settle_seconds=args.settle, batch_size=args.batch)
+    logger.info("开始监视: %s (工作进程 %d, 轮询间隔 %.1f s)", ", ".join(watcher.directories), watcher.workers,
+                args.interval)
+    try:
+        watcher.run(args.interval, once=args.once)
+    except KeyboardInterrupt:
+        pass
+    logger.info("已停止: 分析 %(analyzed)d, 内容未变 %(unchanged)d, 失败 %(failed)d", watcher.stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())